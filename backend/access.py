@@ -0,0 +1,106 @@
+# backend/access.py
+"""
+Board authorization shared by the task, manager and chat routers.
+
+Membership checks read a per-worker cache of board id -> member id set, so
+the endpoints that only need a yes/no answer (task, comment and attachment
+reads and writes) no longer fetch the board document. Admin changes to a
+board's members, board or user deletion publish an invalidation over the
+pub/sub bus so every worker drops its entries; the TTL bounds staleness
+should an invalidation race with a concurrent refill.
+"""
+import os
+from typing import Any, Dict, FrozenSet
+
+from bson import ObjectId
+from fastapi import HTTPException, status
+
+from backend.cache import TTLCache
+from backend.database import boards_collection
+from backend.models import UserRole
+from backend.pubsub import bus
+
+membership_cache = TTLCache(
+    "access.membership_cache",
+    maxsize=int(os.getenv("ACCESS_CACHE_MAX_ENTRIES", "10000")),
+    ttl=float(os.getenv("ACCESS_CACHE_TTL_SECONDS", "30")),
+)
+
+def normalize_role(role) -> str:
+    """Role as its lowercase value, whether given as UserRole, "UserRole.X" or plain string"""
+    if isinstance(role, UserRole):
+        return role.value.lower()
+    s = str(role).lower()
+    if s.startswith("userrole."):
+        s = s.split(".", 1)[1]
+    return s
+
+def is_admin(user: dict) -> bool:
+    return normalize_role(user.get("role", "")) == UserRole.ADMIN.value
+
+def _remember(board: Dict[str, Any]) -> FrozenSet[str]:
+    members = frozenset(board.get("member_ids", []))
+    membership_cache.set(str(board["_id"]), members)
+    return members
+
+async def board_members(board_id: str) -> FrozenSet[str] | None:
+    """Member ids of a board, or None if there is no such board"""
+    members = membership_cache.get(board_id)
+    if members is not None:
+        return members
+    if not ObjectId.is_valid(board_id):
+        return None
+    board = await boards_collection.find_one({"_id": ObjectId(board_id)}, {"member_ids": 1})
+    return _remember(board) if board else None
+
+async def has_board_access(board_id: str, user: dict) -> bool:
+    members = await board_members(board_id)
+    return members is not None and (is_admin(user) or user["id"] in members)
+
+async def check_board_access(board_id: str, current_user: dict) -> FrozenSet[str]:
+    """Raise 404/403 unless the user may use the board; returns its member ids"""
+    members = await board_members(board_id)
+    if members is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Board not found"
+        )
+    # Admin has access to all boards; managers and members must be in the member list
+    if not is_admin(current_user) and current_user["id"] not in members:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have access to this board"
+        )
+    return members
+
+async def verify_board_access(board_id: str, current_user: dict) -> dict:
+    """Like check_board_access, for endpoints that need the current board document"""
+    board = await boards_collection.find_one({"_id": ObjectId(board_id)}) if ObjectId.is_valid(board_id) else None
+    if not board:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Board not found"
+        )
+    members = _remember(board)
+    if not is_admin(current_user) and current_user["id"] not in members:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have access to this board"
+        )
+    return board
+
+# -----------------------
+# Invalidation
+# -----------------------
+async def invalidate_boards(*board_ids: str):
+    """Drop cached membership of the given boards (all boards if none given) on every worker"""
+    await bus.publish("access.invalidate", {"boards": list(board_ids)})
+
+async def _on_invalidate(channel: str, payload: dict, origin: str):
+    if payload["boards"]:
+        for board_id in payload["boards"]:
+            membership_cache.pop(board_id)
+    else:
+        membership_cache.clear()
+
+bus.subscribe("access.invalidate", _on_invalidate)
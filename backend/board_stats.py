@@ -0,0 +1,163 @@
+# backend/board_stats.py
+"""
+Materialized per-board task statistics.
+
+``board_stats`` holds one document per board (``_id`` is the board id) with
+task counts by status, priority and assignee, plus an hourly histogram of due
+dates of open tasks from which the overdue count is read. Every task write
+applies the difference between the task's old and new state as a single
+``$inc``, so reading a board's statistics is one document lookup instead of
+counting its tasks. Boards without a built document (created before this
+existed, or after a rebuild was lost) are rebuilt from their tasks on first
+read.
+
+Check or repair the stored documents with::
+
+    python -m backend.board_stats verify [board_id ...]
+    python -m backend.board_stats rebuild [board_id ...]
+"""
+import asyncio
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Tuple
+
+from backend.database import board_stats_collection, boards_collection, tasks_collection
+from backend.models import TaskStatus
+
+UNASSIGNED = "unassigned"
+# Task fields the statistics depend on
+STATS_FIELDS = {"status": 1, "priority": 1, "assigned_to": 1, "due_date": 1}
+_GROUPS = ("status", "priority", "assignee", "due")
+
+def _key(value: Any) -> str:
+    return str(value.value if isinstance(value, Enum) else value)
+
+def _hour(moment: datetime) -> str:
+    """Histogram bucket of a (naive UTC or aware) datetime"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime("%Y%m%d%H")
+
+def contribution(task: Dict[str, Any] | None) -> Dict[str, int]:
+    """The counters one task adds to its board's statistics, as dotted paths"""
+    if task is None:
+        return {}
+    status = _key(task.get("status"))
+    paths = {
+        "total": 1,
+        f"status.{status}": 1,
+        f"priority.{_key(task.get('priority'))}": 1,
+        f"assignee.{task.get('assigned_to') or UNASSIGNED}": 1,
+    }
+    due = task.get("due_date")
+    if isinstance(due, datetime) and status != TaskStatus.COMPLETED.value:
+        paths[f"due.{_hour(due)}"] = 1
+    return paths
+
+async def apply_task_change(board_id: str, before: Dict[str, Any] | None, after: Dict[str, Any] | None):
+    """
+    Move a board's counters from task state `before` to `after` in one
+    atomic update (None for a task that did not exist / no longer exists).
+    """
+    await apply_task_changes(board_id, [(before, after)])
+
+async def apply_task_changes(board_id: str, changes: Iterable[Tuple[Dict[str, Any] | None, Dict[str, Any] | None]]):
+    """apply_task_change for many (before, after) pairs, still as one update"""
+    inc: Dict[str, int] = defaultdict(int)
+    for before, after in changes:
+        for path, n in contribution(before).items():
+            inc[path] -= n
+        for path, n in contribution(after).items():
+            inc[path] += n
+    inc = {path: n for path, n in inc.items() if n}
+    if inc:
+        await board_stats_collection.update_one({"_id": board_id}, {"$inc": inc}, upsert=True)
+
+# -----------------------
+# Rebuild and read
+# -----------------------
+def compute(tasks: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    stats: Dict[str, Any] = {"total": 0, **{group: {} for group in _GROUPS}}
+    for task in tasks:
+        for path, n in contribution(task).items():
+            if path == "total":
+                stats["total"] += n
+            else:
+                group, key = path.split(".", 1)
+                stats[group][key] = stats[group].get(key, 0) + n
+    return stats
+
+def _normalized(doc: Dict[str, Any] | None) -> Dict[str, Any]:
+    """Stored counters without the zero entries that decrements leave behind"""
+    doc = doc or {}
+    return {
+        "total": doc.get("total", 0),
+        **{group: {k: n for k, n in doc.get(group, {}).items() if n} for group in _GROUPS}
+    }
+
+async def _board_tasks(board_id: str) -> List[Dict[str, Any]]:
+    return await tasks_collection.find({"board_id": board_id}, STATS_FIELDS).to_list(None)
+
+async def rebuild(board_id: str) -> Dict[str, Any]:
+    """Recount a board from its tasks; writes racing with it are fixed by the next rebuild"""
+    stats = compute(await _board_tasks(board_id))
+    await board_stats_collection.update_one({"_id": board_id}, {"$set": {**stats, "built": True}}, upsert=True)
+    return stats
+
+async def get_board_stats(board_id: str, now: datetime | None = None) -> Dict[str, Any]:
+    doc = await board_stats_collection.find_one({"_id": board_id})
+    if doc is None or not doc.get("built"):
+        doc = await rebuild(board_id)
+    stats = _normalized(doc)
+    # Hour granularity: a task counts as overdue once the hour it was due in has passed
+    current_hour = _hour(now or datetime.utcnow())
+    completed = stats["status"].get(TaskStatus.COMPLETED.value, 0)
+    return {
+        "total_tasks": stats["total"],
+        "completed_tasks": completed,
+        "pending_tasks": stats["total"] - completed,
+        "overdue_tasks": sum(n for hour, n in stats["due"].items() if hour < current_hour),
+        "by_status": stats["status"],
+        "by_priority": stats["priority"],
+        "by_assignee": stats["assignee"],
+    }
+
+async def delete_board_stats(board_id: str):
+    await board_stats_collection.delete_one({"_id": board_id})
+
+# -----------------------
+# Command line
+# -----------------------
+async def _board_ids(args: List[str]) -> List[str]:
+    if args:
+        return args
+    return [str(board["_id"]) for board in await boards_collection.find({}, {"_id": 1}).to_list(None)]
+
+async def verify(board_ids: List[str]) -> int:
+    """Print boards whose stored counters differ from a recount; returns how many"""
+    mismatched = 0
+    for board_id in board_ids:
+        stored = _normalized(await board_stats_collection.find_one({"_id": board_id}))
+        expected = compute(await _board_tasks(board_id))
+        if stored != expected:
+            mismatched += 1
+            print(f"{board_id}: stored {stored} != recount {expected}")
+    print(f"{len(board_ids)} boards checked, {mismatched} mismatched")
+    return mismatched
+
+async def _main(argv: List[str]) -> int:
+    if not argv or argv[0] not in ("verify", "rebuild"):
+        print("Usage: python -m backend.board_stats verify|rebuild [board_id ...]")
+        return 2
+    board_ids = await _board_ids(argv[1:])
+    if argv[0] == "verify":
+        return 1 if await verify(board_ids) else 0
+    for board_id in board_ids:
+        await rebuild(board_id)
+    print(f"{len(board_ids)} boards rebuilt")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
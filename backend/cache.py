@@ -0,0 +1,80 @@
+# backend/cache.py
+"""
+Small TTL + LRU cache used for hot per-request lookups (e.g. the
+authenticated principal). Hits and misses are reported via backend.metrics.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Set
+
+from backend import metrics
+
+class TTLCache:
+    def __init__(self, name: str, maxsize: int = 10000, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # tag -> keys, so all entries for e.g. one user can be dropped at once
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self.hits = metrics.counter(f"{name}.hits")
+        self.misses = metrics.counter(f"{name}.misses")
+        self.evictions = metrics.counter(f"{name}.evictions")
+        self.invalidations = metrics.counter(f"{name}.invalidations")
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses.inc()
+                return default
+            expires, value, tag = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                self.misses.inc()
+                return default
+            self._data.move_to_end(key)
+            self.hits.inc()
+            return value
+
+    def set(self, key: Hashable, value: Any, tag: Hashable = None):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + self.ttl, value, tag)
+            if tag is not None:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._remove(next(iter(self._data)))
+                self.evictions.inc()
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+                self.invalidations.inc()
+
+    def invalidate_tag(self, tag: Hashable):
+        """Drop every entry stored with the given tag"""
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+                self.invalidations.inc()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def _remove(self, key: Hashable):
+        _, _, tag = self._data.pop(key)
+        if tag is not None:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
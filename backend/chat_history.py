@@ -0,0 +1,130 @@
+# backend/chat_history.py
+"""
+Chat history: write-behind persistence plus a per-board ring buffer.
+
+Chat messages are queued in memory and written to ``chats_collection`` in
+batches by a background flusher, so the WebSocket loop never waits on the
+database. Every worker also keeps the last ``CHAT_HISTORY_RECENT`` messages of
+each board (fed from the pub/sub bus), which is what a (re)connecting client
+receives; older history is served from the database page by page. Ring
+buffers are kept for at most ``CHAT_HISTORY_MAX_BOARDS`` boards, least
+recently used first out.
+"""
+import os
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Set
+
+from bson import ObjectId
+
+from backend.database import chats_collection
+from backend.pubsub import Bus, bus
+from backend.write_behind import BatchWriter
+
+CHAT_HISTORY_RECENT = int(os.getenv("CHAT_HISTORY_RECENT", "100"))
+CHAT_HISTORY_MAX_BOARDS = int(os.getenv("CHAT_HISTORY_MAX_BOARDS", "1000"))
+CHAT_WRITE_BATCH = int(os.getenv("CHAT_WRITE_BATCH", "500"))
+CHAT_FLUSH_INTERVAL_MS = int(os.getenv("CHAT_FLUSH_INTERVAL_MS", "250"))
+# Queued messages kept (e.g. across failed flushes) before the oldest are dropped
+CHAT_MAX_PENDING = int(os.getenv("CHAT_MAX_PENDING", "50000"))
+# Failed inserts of a message before it is dropped
+CHAT_MAX_RETRIES = int(os.getenv("CHAT_MAX_RETRIES", "5"))
+
+def to_document(board_id: str, message: dict) -> Dict[str, Any]:
+    return {
+        "_id": ObjectId(message["id"]),
+        "board_id": board_id,
+        "user_id": message["user_id"],
+        "username": message["username"],
+        "message": message["message"],
+        "timestamp": datetime.fromisoformat(message["timestamp"]),
+    }
+
+def to_message(doc: Dict[str, Any]) -> dict:
+    """Stored document -> the same shape clients receive over the socket"""
+    return {
+        "type": "chat",
+        "id": str(doc["_id"]),
+        "user_id": doc["user_id"],
+        "username": doc["username"],
+        "message": doc["message"],
+        "timestamp": doc["timestamp"].isoformat(),
+    }
+
+class ChatHistory:
+    def __init__(self, bus: Bus, recent_size: int = CHAT_HISTORY_RECENT, max_boards: int = CHAT_HISTORY_MAX_BOARDS):
+        self.recent_size = recent_size
+        self.max_boards = max_boards
+        self._recent: "OrderedDict[str, Deque[dict]]" = OrderedDict()
+        # Boards whose ring buffer has been seeded from the database
+        self._warm: Set[str] = set()
+        self.writer = BatchWriter(
+            chats_collection, "chat.history",
+            batch_size=CHAT_WRITE_BATCH,
+            flush_interval_ms=CHAT_FLUSH_INTERVAL_MS,
+            max_pending=CHAT_MAX_PENDING,
+            max_retries=CHAT_MAX_RETRIES,
+        )
+        bus.subscribe("chat.broadcast", self._on_broadcast)
+
+    # -----------------------
+    # Writes
+    # -----------------------
+    def start(self):
+        self.writer.start()
+
+    async def stop(self):
+        await self.writer.stop()
+
+    def persist(self, board_id: str, message: dict):
+        """Queue a chat message for the next batched insert (called once, by the originating worker)"""
+        self.writer.add(to_document(board_id, message))
+
+    async def flush(self):
+        await self.writer.flush()
+
+    # -----------------------
+    # Reads
+    # -----------------------
+    async def _on_broadcast(self, channel: str, payload: dict, origin: str):
+        message = payload["message"]
+        if message.get("type") == "chat" and "id" in message:
+            self._ring(payload["board_id"]).append(message)
+
+    def _ring(self, board_id: str) -> Deque[dict]:
+        ring = self._recent.get(board_id)
+        if ring is not None:
+            self._recent.move_to_end(board_id)
+            return ring
+        ring = self._recent[board_id] = deque(maxlen=self.recent_size)
+        while len(self._recent) > self.max_boards:
+            evicted, _ = self._recent.popitem(last=False)
+            self._warm.discard(evicted)
+        return ring
+
+    async def recent(self, board_id: str) -> List[dict]:
+        """Most recent messages of a board, oldest first; only the first call per board hits the database"""
+        if board_id not in self._warm:
+            cursor = chats_collection.find({"board_id": board_id}).sort("_id", -1).limit(self.recent_size)
+            stored = [to_message(doc) for doc in await cursor.to_list(None)]
+            ring = self._ring(board_id)
+            # Messages that arrived over the bus while loading may already be in the ring
+            seen = {m["id"] for m in ring}
+            merged = sorted([m for m in stored if m["id"] not in seen] + list(ring), key=lambda m: m["id"])
+            ring.clear()
+            ring.extend(merged[-self.recent_size:])
+            self._warm.add(board_id)
+            return list(ring)
+        return list(self._ring(board_id))
+
+    async def before(self, board_id: str, before: str | None, limit: int) -> List[dict]:
+        """A page of messages older than message id `before`, oldest first"""
+        await self.flush()
+        flt: Dict[str, Any] = {"board_id": board_id}
+        if before:
+            flt["_id"] = {"$lt": ObjectId(before)}
+        cursor = chats_collection.find(flt).sort("_id", -1).limit(limit)
+        docs = await cursor.to_list(None)
+        return [to_message(doc) for doc in reversed(docs)]
+
+chat_history = ChatHistory(bus)
@@ -1,10 +1,19 @@
+import copy
+import heapq
 import os
-from typing import Any, Dict, List
-from pymongo import MongoClient
+import threading
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Set, Tuple
+from pymongo import AsyncMongoClient, MongoClient, ReturnDocument
+from pymongo.errors import BulkWriteError
 from pymongo.server_api import ServerApi
 from dotenv import load_dotenv
 from bson import ObjectId
 
+from backend.journal import CollectionJournal
+from backend.query_engine import apply_update, compile_filter, equality_keys, get_path, type_rank, upsert_seed
+
 # Load environment variables from .env
 load_dotenv()
 
@@ -12,6 +21,11 @@ load_dotenv()
 MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("DB_NAME", "real_time_task_manager")
 
+# Optional on-disk persistence for the mock database (unset = memory only)
+MOCK_DB_DIR = os.getenv("MOCK_DB_DIR")
+MOCK_DB_SNAPSHOT_EVERY = int(os.getenv("MOCK_DB_SNAPSHOT_EVERY", "10000"))
+MOCK_DB_FSYNC = os.getenv("MOCK_DB_FSYNC", "false").lower() in ("1", "true", "yes")
+
 # -----------------------
 # In-memory mock collection (fallback when MongoDB is unreachable)
 # -----------------------
@@ -19,89 +33,487 @@ class _InsertResult:
     def __init__(self, inserted_id):
         self.inserted_id = inserted_id
 
+class _InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+class _UpdateResult:
+    def __init__(self, matched_count, modified_count, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
 class _DeleteResult:
     def __init__(self, deleted_count):
         self.deleted_count = deleted_count
 
-class _MockCollection:
+class _BulkWriteResult:
     def __init__(self):
-        self._docs: Dict[Any, Dict[str, Any]] = {}
+        self.inserted_count = 0
+        self.matched_count = 0
+        self.modified_count = 0
+        self.deleted_count = 0
+        self.upserted_count = 0
+        self.upserted_ids: Dict[int, Any] = {}
+
+def _project(doc: Dict[str, Any], projection: Dict[str, Any] | None) -> Dict[str, Any]:
+    """Apply a Mongo-style inclusion ({"a": 1}) or exclusion ({"a": 0}) projection"""
+    if not projection:
+        return doc
+    include = [k for k, v in projection.items() if v and k != "_id"]
+    if include:
+        ret_doc = {k: doc[k] for k in include if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            ret_doc["_id"] = doc["_id"]
+        return ret_doc
+    ret_doc = doc.copy()
+    for k, v in projection.items():
+        if not v and k in ret_doc:
+            del ret_doc[k]
+    return ret_doc
+
+class _SortKey:
+    """Comparable key for a multi-field sort specification with mixed directions"""
+    __slots__ = ("values", "directions")
+
+    def __init__(self, doc: Dict[str, Any], spec: List[Tuple[str, int]]):
+        self.values = [get_path(doc, field) for field, _ in spec]
+        self.directions = [direction for _, direction in spec]
 
-    def _matches(self, doc: Dict[str, Any], flt: Dict[str, Any]) -> bool:
-        if not flt:
-            return True
-        for k, v in flt.items():
-            if k not in doc:
-                return False
-            dv = doc[k]
-            # Support membership check for list fields (e.g., member_ids)
-            if isinstance(dv, list):
-                if v not in dv:
-                    return False
+    def __lt__(self, other: "_SortKey") -> bool:
+        for a, b, direction in zip(self.values, other.values, self.directions):
+            rank_a, rank_b = type_rank(a), type_rank(b)
+            if rank_a != rank_b:
+                less = rank_a < rank_b
+            elif rank_a == 0 or a == b:
+                # Missing and null sort as the same value, like MongoDB
+                continue
             else:
-                if dv != v:
-                    return False
-        return True
+                less = a < b
+            return less if direction > 0 else not less
+        return False
+
+class _MockCursor:
+    """Lazy cursor over a mock collection supporting sort/skip/limit like PyMongo's"""
+    def __init__(self, docs: Iterable[Dict[str, Any]], projection: Dict[str, Any] | None = None):
+        self._docs = docs
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] | None = None
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction: int = 1) -> "_MockCursor":
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction)]
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def skip(self, count: int) -> "_MockCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "_MockCursor":
+        self._limit = count
+        return self
+
+    def _ordered(self) -> Iterable[Dict[str, Any]]:
+        if not self._sort:
+            return islice(self._docs, self._skip, self._skip + self._limit if self._limit else None)
+        spec = self._sort
+        key = lambda doc: _SortKey(doc, spec)
+        if self._limit:
+            # Top-k selection: O(N log k) instead of sorting the whole result set
+            top = heapq.nsmallest(self._skip + self._limit, self._docs, key=key)
+        else:
+            top = sorted(self._docs, key=key)
+        return top[self._skip:]
+
+    def __iter__(self):
+        # Projection is applied lazily, only to the rows actually yielded
+        for doc in self._ordered():
+            yield _project(doc, self._projection)
+
+def _index_keys(value) -> List[Any] | None:
+    """Keys under which a field value is stored in a hash index (multikey for lists)"""
+    values = value if isinstance(value, list) else [value]
+    keys = []
+    for v in values:
+        try:
+            hash(v)
+        except TypeError:
+            return None
+        keys.append(v)
+    return keys
+
+class _HashIndex:
+    """Equality index over a single field: value -> set of document _ids"""
+    def __init__(self, field: str):
+        self.field = field
+        self._buckets: Dict[Any, Set[Any]] = {}
+        # Documents whose value cannot be hashed are always returned as candidates
+        self._unhashable: Set[Any] = set()
+
+    def add(self, doc: Dict[str, Any]):
+        if self.field not in doc:
+            return
+        keys = _index_keys(doc[self.field])
+        if keys is None:
+            self._unhashable.add(doc["_id"])
+            return
+        for key in keys:
+            self._buckets.setdefault(key, set()).add(doc["_id"])
+
+    def remove(self, doc: Dict[str, Any]):
+        if self.field not in doc:
+            return
+        keys = _index_keys(doc[self.field])
+        if keys is None:
+            self._unhashable.discard(doc["_id"])
+            return
+        for key in keys:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(doc["_id"])
+                if not bucket:
+                    del self._buckets[key]
 
+    def lookup(self, value) -> Set[Any] | None:
+        """Candidate _ids for an equality match, or None if value is not indexable"""
+        try:
+            bucket = self._buckets.get(value, ())
+        except TypeError:
+            return None
+        if self._unhashable:
+            return set(bucket) | self._unhashable
+        return bucket
+
+def normalize_datetimes(doc):
+    """
+    Store datetimes the way BSON (and MongoDB) keeps them, naive UTC with
+    millisecond precision, so documents replayed from the journal are equal
+    to the ones held before the restart. Works in place on dicts and lists.
+    """
+    for key, value in (doc.items() if isinstance(doc, dict) else enumerate(doc)):
+        if isinstance(value, datetime):
+            if value.tzinfo is not None:
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            if value.microsecond % 1000:
+                value = value.replace(microsecond=value.microsecond // 1000 * 1000)
+            doc[key] = value
+        elif isinstance(value, (dict, list)):
+            normalize_datetimes(value)
+
+class _MockCollection:
+    def __init__(self, indexes: List[str] | None = None, journal: CollectionJournal | None = None):
+        self._docs: Dict[Any, Dict[str, Any]] = {}
+        self._indexes: Dict[str, _HashIndex] = {}
+        self._lock = threading.RLock()
+        # Optional on-disk write-ahead log; replayed here before indexes are built
+        self._journal = journal
+        if journal is not None:
+            self._docs = journal.load()
+        for field in indexes or []:
+            self.create_index(field)
+
+    # -----------------------
+    # Indexes
+    # -----------------------
+    def create_index(self, field: str) -> str:
+        """Declare a hash index on a field (list fields are indexed per element)"""
+        if field not in self._indexes:
+            index = _HashIndex(field)
+            for doc in self._docs.values():
+                index.add(doc)
+            self._indexes[field] = index
+        return f"{field}_1"
+
+    def _index_doc(self, doc: Dict[str, Any]):
+        for index in self._indexes.values():
+            index.add(doc)
+
+    def _unindex_doc(self, doc: Dict[str, Any]):
+        for index in self._indexes.values():
+            index.remove(doc)
+
+    def _candidate_ids(self, flt: Dict[str, Any]) -> Set[Any] | None:
+        """_ids that can possibly match the filter, or None if no index applies"""
+        best = None
+        for field, spec in flt.items():
+            ids = None
+            if field == "$and":
+                for sub in spec:
+                    sub_ids = self._candidate_ids(sub)
+                    if sub_ids is not None and (ids is None or len(sub_ids) < len(ids)):
+                        ids = sub_ids
+            elif field == "$or":
+                branches = [self._candidate_ids(sub) for sub in spec]
+                if branches and all(branch is not None for branch in branches):
+                    ids = set().union(*branches)
+            elif not field.startswith("$"):
+                keys = equality_keys(spec)
+                if keys is None:
+                    continue
+                if field == "_id":
+                    ids = {key for key in keys if key in self._docs}
+                elif field in self._indexes:
+                    index = self._indexes[field]
+                    buckets = [index.lookup(key) for key in keys]
+                    if any(bucket is None for bucket in buckets):
+                        continue
+                    ids = buckets[0] if len(buckets) == 1 else set().union(*buckets)
+            if ids is not None and (best is None or len(ids) < len(best)):
+                best = ids
+                if not best:
+                    break
+        return best
+
+    def _candidates(self, flt: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Pick the smallest candidate set the indexes can provide for a filter"""
+        ids = self._candidate_ids(flt)
+        if ids is None:
+            return list(self._docs.values())
+        return [self._docs[doc_id] for doc_id in ids if doc_id in self._docs]
+
+    # -----------------------
+    # Storage
+    # -----------------------
+    def _store(self, doc: Dict[str, Any], old: Dict[str, Any] | None = None):
+        """Write a document (new, or replacing `old`) through journal and indexes"""
+        normalize_datetimes(doc)
+        # Log first: if encoding or the append fails, memory is left untouched
+        snapshot_due = self._journal is not None and self._journal.record_put(doc)
+        if old is not None:
+            self._unindex_doc(old)
+        self._docs[doc["_id"]] = doc
+        self._index_doc(doc)
+        if snapshot_due:
+            self._journal.snapshot(self._docs.values())
+
+    def _remove(self, doc: Dict[str, Any]):
+        snapshot_due = self._journal is not None and self._journal.record_delete(doc["_id"])
+        self._unindex_doc(doc)
+        del self._docs[doc["_id"]]
+        if snapshot_due:
+            self._journal.snapshot(self._docs.values())
+
+    def _update_doc(self, doc: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any] | None:
+        """Apply an update; returns the stored document, or None if nothing changed"""
+        if self._journal is not None:
+            # Update a copy so a failed journal append leaves the stored document as it was
+            new = copy.deepcopy(doc)
+            if not apply_update(new, update):
+                return None
+            self._store(new, doc)
+            return new
+        self._unindex_doc(doc)
+        changed = False
+        try:
+            changed = apply_update(doc, update)
+            if changed:
+                normalize_datetimes(doc)
+        finally:
+            self._index_doc(doc)
+        return doc if changed else None
+
+    def _upsert(self, flt: Dict[str, Any], update: Dict[str, Any]) -> Any:
+        doc = upsert_seed(flt)
+        apply_update(doc, update, inserting=True)
+        if "_id" not in doc:
+            doc["_id"] = ObjectId()
+        self._store(doc)
+        return doc["_id"]
+
+    # -----------------------
+    # Queries
+    # -----------------------
+    def _iter_matches(self, flt: Dict[str, Any] | None):
+        flt = flt or {}
+        predicate = compile_filter(flt)
+        for doc in self._candidates(flt):
+            if predicate(doc):
+                yield doc
+
+    def find_one(self, flt: Dict[str, Any] | None = None, projection: Dict[str, Any] | None = None) -> Dict[str, Any] | None:
+        for doc in self._iter_matches(flt):
+            return _project(doc, projection)
+        return None
+
+    def find(self, flt: Dict[str, Any] | None = None, projection: Dict[str, Any] | None = None) -> _MockCursor:
+        return _MockCursor(self._iter_matches(flt), projection)
+
+    def count_documents(self, flt: Dict[str, Any]):
+        return sum(1 for _ in self._iter_matches(flt))
+
+    # -----------------------
+    # Writes
+    # -----------------------
     def insert_one(self, doc: Dict[str, Any]):
         if "_id" not in doc:
             doc["_id"] = ObjectId()
-        self._docs[doc["_id"]] = doc
+        with self._lock:
+            self._store(doc, self._docs.get(doc["_id"]))
         return _InsertResult(doc["_id"])
 
-    def find_one(self, flt: Dict[str, Any], projection: Dict[str, Any] | None = None) -> Dict[str, Any] | None:
-        for doc in self._docs.values():
-            if self._matches(doc, flt):
-                # Basic projection support: if projection excludes fields (0), remove them
-                if projection:
-                    ret_doc = doc.copy()
-                    for k, v in projection.items():
-                        if v == 0 and k in ret_doc:
-                            del ret_doc[k]
-                    return ret_doc
-                return doc
-        return None
+    def insert_many(self, docs: Iterable[Dict[str, Any]], ordered: bool = True):
+        inserted_ids = []
+        with self._lock:
+            for doc in docs:
+                inserted_ids.append(self.insert_one(doc).inserted_id)
+        return _InsertManyResult(inserted_ids)
 
-    def find(self, flt: Dict[str, Any] | None = None, projection: Dict[str, Any] | None = None) -> List[Dict[str, Any]]:
-        flt = flt or {}
-        results = [doc for doc in self._docs.values() if self._matches(doc, flt)]
-        
-        # Apply projection if provided
-        if projection:
-            clean_results = []
-            for doc in results:
-                new_doc = doc.copy()
-                for k, v in projection.items():
-                    if v == 0 and k in new_doc:
-                        del new_doc[k]
-                clean_results.append(new_doc)
-            return clean_results
-            
-        return results
-
-    def update_one(self, flt: Dict[str, Any], update: Dict[str, Any]):
-        # Only support {$set: {...}}
-        doc = self.find_one(flt)
-        if doc and "$set" in update:
-            for k, v in update["$set"].items():
-                doc[k] = v
-        return doc
+    def update_one(self, flt: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        with self._lock:
+            doc = self.find_one(flt)
+            if doc is not None:
+                return _UpdateResult(1, int(self._update_doc(doc, update) is not None))
+            if upsert:
+                return _UpdateResult(0, 0, self._upsert(flt, update))
+        return _UpdateResult(0, 0)
+
+    def update_many(self, flt: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        with self._lock:
+            docs = list(self._iter_matches(flt))
+            if not docs and upsert:
+                return _UpdateResult(0, 0, self._upsert(flt, update))
+            modified = sum(1 for doc in docs if self._update_doc(doc, update) is not None)
+        return _UpdateResult(len(docs), modified)
+
+    def find_one_and_update(self, flt: Dict[str, Any], update: Dict[str, Any], projection: Dict[str, Any] | None = None,
+                            upsert: bool = False, return_document: bool = ReturnDocument.BEFORE):
+        with self._lock:
+            doc = self.find_one(flt)
+            if doc is None:
+                if not upsert:
+                    return None
+                doc_id = self._upsert(flt, update)
+                return _project(copy.deepcopy(self._docs[doc_id]), projection) if return_document else None
+            before = None if return_document else copy.deepcopy(doc)
+            doc = self._update_doc(doc, update) or doc
+            return _project(copy.deepcopy(doc) if return_document else before, projection)
+
+    def find_one_and_delete(self, flt: Dict[str, Any], projection: Dict[str, Any] | None = None):
+        with self._lock:
+            doc = self.find_one(flt)
+            if doc is None:
+                return None
+            self._remove(doc)
+            return _project(doc, projection)
 
     def delete_one(self, flt: Dict[str, Any]):
-        doc = self.find_one(flt)
-        if doc:
-            del self._docs[doc["_id"]]
-            return _DeleteResult(1)
+        with self._lock:
+            doc = self.find_one(flt)
+            if doc:
+                self._remove(doc)
+                return _DeleteResult(1)
         return _DeleteResult(0)
 
     def delete_many(self, flt: Dict[str, Any]):
-        to_delete = [doc_id for doc_id, doc in self._docs.items() if self._matches(doc, flt)]
-        for doc_id in to_delete:
-            del self._docs[doc_id]
+        with self._lock:
+            to_delete = list(self._iter_matches(flt))
+            for doc in to_delete:
+                self._remove(doc)
         return _DeleteResult(len(to_delete))
 
-    def count_documents(self, flt: Dict[str, Any]):
-        return len(self.find(flt))
+    def bulk_write(self, requests: Iterable[Any], ordered: bool = True):
+        """Apply PyMongo InsertOne/UpdateOne/UpdateMany/DeleteOne/DeleteMany requests"""
+        result = _BulkWriteResult()
+        with self._lock:
+            for i, request in enumerate(requests):
+                kind = type(request).__name__
+                if kind == "InsertOne":
+                    self.insert_one(request._doc)
+                    result.inserted_count += 1
+                elif kind in ("UpdateOne", "UpdateMany"):
+                    write = self.update_one if kind == "UpdateOne" else self.update_many
+                    res = write(request._filter, request._doc, upsert=bool(request._upsert))
+                    result.matched_count += res.matched_count
+                    result.modified_count += res.modified_count
+                    if res.upserted_id is not None:
+                        result.upserted_count += 1
+                        result.upserted_ids[i] = res.upserted_id
+                elif kind in ("DeleteOne", "DeleteMany"):
+                    delete = self.delete_one if kind == "DeleteOne" else self.delete_many
+                    result.deleted_count += delete(request._filter).deleted_count
+                else:
+                    raise ValueError(f"Unsupported bulk write request: {kind}")
+        return result
+
+# -----------------------
+# Async facade over the mock, matching PyMongo's AsyncCollection/AsyncCursor
+# -----------------------
+class _AsyncMockCursor:
+    def __init__(self, cursor: _MockCursor):
+        self._cursor = cursor
+
+    def sort(self, key_or_list, direction: int = 1) -> "_AsyncMockCursor":
+        self._cursor.sort(key_or_list, direction)
+        return self
+
+    def skip(self, count: int) -> "_AsyncMockCursor":
+        self._cursor.skip(count)
+        return self
+
+    def limit(self, count: int) -> "_AsyncMockCursor":
+        self._cursor.limit(count)
+        return self
+
+    async def __aiter__(self):
+        for doc in self._cursor:
+            yield doc
+
+    async def to_list(self, length: int | None = None) -> List[Dict[str, Any]]:
+        if length:
+            return list(islice(self._cursor, length))
+        return list(self._cursor)
+
+class _AsyncMockCollection:
+    """
+    Awaitable wrapper around _MockCollection so routers have a single async code
+    path for both backends. Mock operations are in-memory, so they run inline.
+    """
+    def __init__(self, collection: _MockCollection):
+        self.collection = collection
+
+    def find(self, flt: Dict[str, Any] | None = None, projection: Dict[str, Any] | None = None) -> _AsyncMockCursor:
+        return _AsyncMockCursor(self.collection.find(flt, projection))
+
+    async def find_one(self, flt: Dict[str, Any] | None = None, projection: Dict[str, Any] | None = None):
+        return self.collection.find_one(flt, projection)
+
+    async def count_documents(self, flt: Dict[str, Any]):
+        return self.collection.count_documents(flt)
+
+    async def create_index(self, field: str) -> str:
+        return self.collection.create_index(field)
+
+    async def insert_one(self, doc: Dict[str, Any]):
+        return self.collection.insert_one(doc)
+
+    async def insert_many(self, docs: Iterable[Dict[str, Any]], ordered: bool = True):
+        return self.collection.insert_many(docs, ordered)
+
+    async def update_one(self, flt: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        return self.collection.update_one(flt, update, upsert)
+
+    async def update_many(self, flt: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        return self.collection.update_many(flt, update, upsert)
+
+    async def find_one_and_update(self, flt: Dict[str, Any], update: Dict[str, Any], projection: Dict[str, Any] | None = None,
+                                  upsert: bool = False, return_document: bool = ReturnDocument.BEFORE):
+        return self.collection.find_one_and_update(flt, update, projection, upsert, return_document)
+
+    async def find_one_and_delete(self, flt: Dict[str, Any], projection: Dict[str, Any] | None = None):
+        return self.collection.find_one_and_delete(flt, projection)
+
+    async def delete_one(self, flt: Dict[str, Any]):
+        return self.collection.delete_one(flt)
+
+    async def delete_many(self, flt: Dict[str, Any]):
+        return self.collection.delete_many(flt)
+
+    async def bulk_write(self, requests: Iterable[Any], ordered: bool = True):
+        return self.collection.bulk_write(requests, ordered)
 
 # -----------------------
 # Try real MongoDB first, fallback to in-memory mock
@@ -111,10 +523,14 @@ client = None
 try:
     if not MONGO_URI:
         raise Exception("MONGO_URI is not set")
-    client = MongoClient(MONGO_URI, server_api=ServerApi('1'))
+    # Test connection synchronously at import time; requests use the async driver
+    probe = MongoClient(MONGO_URI, server_api=ServerApi('1'))
+    try:
+        probe.admin.command('ping')
+    finally:
+        probe.close()
+    client = AsyncMongoClient(MONGO_URI, server_api=ServerApi('1'))
     db = client[DB_NAME]
-    # Test connection
-    client.admin.command('ping')
     print("[SUCCESS] Connected to MongoDB successfully!")
 except Exception as e:
     print("[ERROR] MongoDB connection failed:", e)
@@ -123,16 +539,26 @@ except Exception as e:
     db = None
 
 # Collections
+def _mock_collection(name: str, indexes: List[str] | None = None) -> "_AsyncMockCollection":
+    journal = None
+    if MOCK_DB_DIR:
+        journal = CollectionJournal(MOCK_DB_DIR, name, snapshot_every=MOCK_DB_SNAPSHOT_EVERY, fsync=MOCK_DB_FSYNC)
+    return _AsyncMockCollection(_MockCollection(indexes=indexes, journal=journal))
+
 if use_mock:
-    users_collection = _MockCollection()
-    teams_collection = _MockCollection()
-    boards_collection = _MockCollection()
-    tasks_collection = _MockCollection()
-    chats_collection = _MockCollection()
-    history_collection = _MockCollection()
-    activity_logs_collection = _MockCollection()
-    comments_collection = _MockCollection()
-    attachments_collection = _MockCollection()
+    if MOCK_DB_DIR:
+        print(f"[INFO] Persisting mock database to {MOCK_DB_DIR}")
+    users_collection = _mock_collection("users", indexes=["email", "username"])
+    teams_collection = _mock_collection("teams", indexes=["name"])
+    boards_collection = _mock_collection("boards", indexes=["member_ids", "team_id"])
+    tasks_collection = _mock_collection("tasks", indexes=["board_id", "assigned_to"])
+    chats_collection = _mock_collection("chats", indexes=["board_id"])
+    history_collection = _mock_collection("history")
+    activity_logs_collection = _mock_collection("activity_logs", indexes=["entity_id"])
+    comments_collection = _mock_collection("comments", indexes=["task_id"])
+    attachments_collection = _mock_collection("attachments", indexes=["task_id", "blob"])
+    task_tombstones_collection = _mock_collection("task_tombstones", indexes=["board_id"])
+    board_stats_collection = _mock_collection("board_stats")
 else:
     users_collection = db["users"]
     teams_collection = db["teams"]
@@ -140,7 +566,39 @@ else:
     tasks_collection = db["tasks"]
     chats_collection = db["chats"]
     history_collection = db["history"]
-    history_collection = db["history"]
     activity_logs_collection = db["activity_logs"]
     comments_collection = db["comments"]
     attachments_collection = db["attachments"]
+    task_tombstones_collection = db["task_tombstones"]
+    board_stats_collection = db["board_stats"]
+
+DUPLICATE_KEY = 11000
+
+def unwritten(docs: List[Dict[str, Any]], error: Exception) -> List[Dict[str, Any]]:
+    """
+    Documents of a failed unordered insert_many that still need writing.
+    Duplicate-key errors count as written (an earlier attempt inserted them);
+    an error that does not say which documents failed returns them all.
+    """
+    if isinstance(error, BulkWriteError):
+        failed = {e["index"] for e in error.details.get("writeErrors", ()) if e.get("code") != DUPLICATE_KEY}
+        return [doc for i, doc in enumerate(docs) if i in failed]
+    return list(docs)
+
+async def ensure_indexes():
+    """Create the indexes hot queries rely on (the mock builds its own hash indexes)"""
+    if use_mock:
+        return
+    # Keyset pagination sorts on (created_at, _id); filtered lists lead with their filter field
+    for collection in (users_collection, teams_collection, boards_collection, tasks_collection):
+        await collection.create_index([("created_at", 1), ("_id", 1)])
+    await tasks_collection.create_index([("board_id", 1), ("created_at", 1), ("_id", 1)])
+    await tasks_collection.create_index([("assigned_to", 1), ("created_at", 1), ("_id", 1)])
+    await activity_logs_collection.create_index([("created_at", -1), ("_id", -1)])
+    await tasks_collection.create_index([("board_id", 1), ("seq", 1)])
+    await task_tombstones_collection.create_index([("board_id", 1), ("seq", 1)])
+    await chats_collection.create_index([("board_id", 1), ("_id", -1)])
+    await activity_logs_collection.create_index([("entity_id", 1), ("created_at", -1), ("_id", -1)])
+    await comments_collection.create_index([("task_id", 1), ("created_at", -1), ("_id", -1)])
+    await attachments_collection.create_index([("task_id", 1), ("created_at", -1), ("_id", -1)])
+    await attachments_collection.create_index("blob")
@@ -0,0 +1,86 @@
+# backend/etags.py
+"""
+Conditional GET support from in-memory version stamps.
+
+Mutations bump a named scope ("boards" for the set of boards and their
+membership, "board:<id>" for one board and its tasks); the new stamp is
+shared with the other workers over the pub/sub bus. Read endpoints declare
+the scopes they depend on with the ``etag(...)`` dependency, which derives a
+weak ETag from those stamps plus the caller and query string and answers a
+matching ``If-None-Match`` with 304 before the endpoint runs, i.e. without
+touching the database.
+
+A worker that is cut off from the bus cannot see other workers' bumps, so it
+answers no 304s while disconnected, and on every disconnect or reconnect it
+starts a new epoch: all stamps are regenerated, invalidating every ETag it
+issued before.
+"""
+import hashlib
+import time
+import uuid
+from typing import Dict
+
+from fastapi import Depends, HTTPException, Request, Response, status
+
+from backend.pubsub import Bus, bus
+from backend.routers.auth import get_current_user
+
+class VersionRegistry:
+    def __init__(self, bus: Bus):
+        self.bus = bus
+        self._reset()
+        bus.subscribe("etag.bump", self._on_bump)
+
+    def _reset(self):
+        # Scopes not bumped in this epoch share this stamp, so a restart or a new epoch invalidates old tags
+        self._initial = uuid.uuid4().hex[:12]
+        self._versions: Dict[str, str] = {}
+        self._generation = self.bus.generation
+
+    @property
+    def trusted(self) -> bool:
+        """Whether stamps reflect every bump (False while the bus is disconnected)"""
+        return self.bus.connected
+
+    def get(self, scope: str) -> str:
+        if self._generation != self.bus.generation:
+            # Bumps may have been missed while (re)connecting
+            self._reset()
+        return self._versions.get(scope, self._initial)
+
+    async def bump(self, *scopes: str):
+        """Invalidate cached responses that depend on any of `scopes`, on every worker"""
+        await self.bus.publish("etag.bump", {"scopes": list(scopes), "stamp": uuid.uuid4().hex[:12]})
+
+    async def _on_bump(self, channel: str, payload: dict, origin: str):
+        for scope in payload["scopes"]:
+            self._versions[scope] = payload["stamp"]
+
+versions = VersionRegistry(bus)
+
+def _matches(if_none_match: str, tag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/"x" and "x" are the same validator
+    opaque = tag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+def etag(*scopes: str, period: int | None = None):
+    """
+    Dependency for conditional GETs. Scopes may reference path parameters,
+    e.g. etag("boards", "board:{board_id}"). Responses that also change with
+    time (e.g. overdue counts) pass `period` seconds to expire tags on their own.
+    """
+    async def check(request: Request, response: Response, current_user: dict = Depends(get_current_user)):
+        stamps = [versions.get(scope.format(**request.path_params)) for scope in scopes]
+        if period:
+            stamps.append(str(int(time.time() // period)))
+        key = "|".join([*stamps, current_user["id"], str(current_user.get("role")), request.url.query])
+        tag = 'W/"' + hashlib.blake2b(key.encode(), digest_size=12).hexdigest() + '"'
+        if_none_match = request.headers.get("if-none-match")
+        # Let browsers keep the body but revalidate it on every request
+        headers = {"ETag": tag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+        if if_none_match and versions.trusted and _matches(if_none_match, tag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+    return check
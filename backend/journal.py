@@ -0,0 +1,170 @@
+# backend/journal.py
+"""
+Append-only persistence for the in-memory mock database.
+
+Every mutation of a mock collection is appended to a per-collection
+write-ahead log (``<name>.wal``) as a CRC-framed BSON record. Once the log
+grows past a threshold the live documents are written to a compacted
+snapshot (``<name>.snap``) and the log is truncated. Startup loads the
+snapshot and replays the log on top of it; both files are read through mmap.
+The log is held under an exclusive flock for the life of the process, so a
+second process (another server, or a CLI such as ``backend.board_stats``)
+cannot open the same collection while it is in use.
+"""
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+import bson
+
+_CRC = struct.Struct("<I")
+_BSON_LEN = struct.Struct("<i")
+_SNAPSHOT_MAGIC = b"RTTMSNP1"
+
+OP_PUT = "p"
+OP_DELETE = "d"
+
+def _encode_record(record: Dict[str, Any]) -> bytes:
+    payload = bson.encode(record)
+    return _CRC.pack(zlib.crc32(payload)) + payload
+
+def _iter_records(buf, offset: int = 0) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """Yield (record, end_offset) until the end of the buffer or the first torn record"""
+    view = memoryview(buf)
+    end = len(view)
+    try:
+        while offset + _CRC.size + _BSON_LEN.size <= end:
+            (crc,) = _CRC.unpack_from(view, offset)
+            start = offset + _CRC.size
+            (length,) = _BSON_LEN.unpack_from(view, start)
+            if length < 5 or start + length > end:
+                return
+            payload = view[start:start + length]
+            if zlib.crc32(payload) != crc:
+                return
+            offset = start + length
+            yield bson.decode(payload), offset
+    finally:
+        view.release()
+
+def _read_mapped(path: str):
+    """Return an mmap of the file, or None if it is missing or empty"""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+class CollectionJournal:
+    """Write-ahead log plus compacted snapshot for one mock collection"""
+    def __init__(self, directory: str, name: str, snapshot_every: int = 10000, fsync: bool = False):
+        os.makedirs(directory, exist_ok=True)
+        self.wal_path = os.path.join(directory, f"{name}.wal")
+        self.snapshot_path = os.path.join(directory, f"{name}.snap")
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._wal = None
+        self._records_since_snapshot = 0
+
+    # -----------------------
+    # Startup
+    # -----------------------
+    def load(self) -> Dict[Any, Dict[str, Any]]:
+        """Rebuild the collection from the snapshot and the log, then open the log for appends"""
+        docs: Dict[Any, Dict[str, Any]] = {}
+        # Unbuffered, so a failed append leaves nothing queued to be written later
+        wal_file = open(self.wal_path, "ab", buffering=0)
+        try:
+            fcntl.flock(wal_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            wal_file.close()
+            raise RuntimeError(f"{self.wal_path} is in use by another process (stop the server first)") from None
+
+        snap = _read_mapped(self.snapshot_path)
+        if snap is not None:
+            with snap:
+                if snap[:len(_SNAPSHOT_MAGIC)] != _SNAPSHOT_MAGIC:
+                    raise ValueError(f"{self.snapshot_path} is not a snapshot file")
+                for doc, _ in _iter_records(snap, len(_SNAPSHOT_MAGIC)):
+                    docs[doc["_id"]] = doc
+
+        valid_end = 0
+        wal = _read_mapped(self.wal_path)
+        if wal is not None:
+            with wal:
+                for record, valid_end in _iter_records(wal):
+                    if record["op"] == OP_PUT:
+                        docs[record["doc"]["_id"]] = record["doc"]
+                    else:
+                        docs.pop(record["_id"], None)
+                    self._records_since_snapshot += 1
+
+        self._wal = wal_file
+        # Drop a torn tail left behind by a crash mid-append
+        if self._wal.tell() != valid_end:
+            self._wal.truncate(valid_end)
+            self._wal.seek(valid_end)
+        return docs
+
+    # -----------------------
+    # Appends
+    # -----------------------
+    def _append(self, record: Dict[str, Any]) -> bool:
+        data = _encode_record(record)
+        with self._lock:
+            end = self._wal.tell()
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[self._wal.write(view):]
+                if self.fsync:
+                    os.fsync(self._wal.fileno())
+            except BaseException:
+                # Cut a partial record off so later appends are not lost behind it on replay
+                self._wal.truncate(end)
+                self._wal.seek(end)
+                raise
+            self._records_since_snapshot += 1
+            return self._records_since_snapshot >= self.snapshot_every
+
+    def record_put(self, doc: Dict[str, Any]) -> bool:
+        """Log the full post-image of a document; returns True when a snapshot is due"""
+        return self._append({"op": OP_PUT, "doc": doc})
+
+    def record_delete(self, doc_id: Any) -> bool:
+        """Log a document removal; returns True when a snapshot is due"""
+        return self._append({"op": OP_DELETE, "_id": doc_id})
+
+    # -----------------------
+    # Compaction
+    # -----------------------
+    def snapshot(self, docs: Iterable[Dict[str, Any]]):
+        """Write the live documents to a new snapshot and truncate the log"""
+        tmp_path = self.snapshot_path + ".tmp"
+        with self._lock:
+            with open(tmp_path, "wb") as f:
+                f.write(_SNAPSHOT_MAGIC)
+                for doc in docs:
+                    f.write(_encode_record(doc))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            # Replaying the old log over the new snapshot is harmless (puts and
+            # deletes are idempotent), so a crash before this truncate is safe.
+            self._wal.truncate(0)
+            self._wal.seek(0)
+            self._records_since_snapshot = 0
+
+    def close(self):
+        with self._lock:
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
@@ -1,12 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import os
 from backend.routers import auth, admin, team_manager, tasks, users, chat, activity
+from backend.chat_history import chat_history
+from backend.database import ensure_indexes
+from backend.password_pool import password_pool
+from backend.pubsub import bus
+from backend.search import ensure_text_indexes
+from backend.thumbnails import thumbnail_pool
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    password_pool.start()
+    thumbnail_pool.start()
+    await ensure_indexes()
+    await ensure_text_indexes()
+    await bus.start()
+    chat_history.start()
+    activity.activity_writer.start()
+    yield
+    await activity.activity_writer.stop()
+    await chat_history.stop()
+    await bus.stop()
+    thumbnail_pool.shutdown()
+    password_pool.shutdown()
 
 app = FastAPI(
     title="Real-Time Task Manager",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 origins = [
@@ -25,6 +48,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser clients read pagination and delta-sync headers
+    expose_headers=["X-Next-Cursor", "X-Board-Version", "X-Search-Pending-Boards"],
 )
 
 # Include routers
@@ -40,6 +65,3 @@ app.include_router(activity.router, prefix="/activity", tags=["Activity"])
 # Create uploads directory if it doesn't exist
 if not os.path.exists("uploads"):
     os.makedirs("uploads")
-
-# Mount uploads directory
-app.mount("/static/uploads", StaticFiles(directory="uploads"), name="uploads")
\ No newline at end of file
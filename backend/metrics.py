@@ -0,0 +1,92 @@
+# backend/metrics.py
+"""
+Minimal in-process metrics registry.
+
+Counters and latency summaries are created on first use by name and exported
+as a flat dict by ``snapshot()`` (served at ``GET /admin/metrics``). Values
+are per worker process.
+"""
+import threading
+from collections import deque
+from typing import Any, Dict
+
+_lock = threading.Lock()
+_registry: Dict[str, Any] = {}
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+    def export(self):
+        return self.value
+
+class Gauge:
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+    def dec(self, amount: int = 1):
+        self.value -= amount
+
+    def export(self):
+        return self.value
+
+class Summary:
+    """Count/sum/max plus percentiles over a sliding window of recent observations"""
+    def __init__(self, window: int = 2048):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self._recent.append(value)
+
+    def percentile(self, q: float) -> float:
+        values = sorted(self._recent)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def export(self):
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+        }
+
+def _get(name: str, kind):
+    metric = _registry.get(name)
+    if metric is None:
+        with _lock:
+            metric = _registry.setdefault(name, kind())
+    if not isinstance(metric, kind):
+        raise TypeError(f"Metric {name} is a {type(metric).__name__}, not a {kind.__name__}")
+    return metric
+
+def counter(name: str) -> Counter:
+    return _get(name, Counter)
+
+def gauge(name: str) -> Gauge:
+    return _get(name, Gauge)
+
+def summary(name: str) -> Summary:
+    return _get(name, Summary)
+
+def snapshot() -> Dict[str, Any]:
+    return {name: metric.export() for name, metric in sorted(_registry.items())}
@@ -1,6 +1,6 @@
 # backend/models.py
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 from enum import Enum
 
@@ -124,6 +124,42 @@ class TaskResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+class TaskBulkOp(str, Enum):
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+
+class TaskBulkItem(BaseModel):
+    op: TaskBulkOp
+    task_id: Optional[str] = None  # update/delete
+    # Create takes these like TaskCreate (title required), update like TaskUpdate
+    title: Optional[str] = Field(None, min_length=3, max_length=200)
+    description: Optional[str] = None
+    assigned_to: Optional[str] = None
+    status: Optional[TaskStatus] = None
+    priority: Optional[TaskPriority] = None
+    due_date: Optional[datetime] = None
+
+class TaskBulkRequest(BaseModel):
+    board_id: str
+    items: List[TaskBulkItem] = Field(..., min_length=1, max_length=1000)
+
+class TaskBulkResult(BaseModel):
+    index: int
+    ok: bool
+    task_id: Optional[str] = None
+    error: Optional[str] = None
+
+class TaskBulkResponse(BaseModel):
+    version: int  # board version after the batch (unchanged if nothing was applied)
+    results: List[TaskBulkResult]
+
+class TaskDelta(BaseModel):
+    version: int
+    full: bool  # True when `since` was too old and `tasks` is the whole board
+    tasks: List[TaskResponse]
+    deleted: List[str]
+
 # -----------------------
 # Comment Models
 # -----------------------
@@ -149,10 +185,16 @@ class AttachmentResponse(BaseModel):
     user_id: str
     username: str
     filename: str
-    file_path: str  # URL path like /static/uploads/...
+    file_path: str  # download URL path, /tasks/attachments/{id}/download
     file_type: str
     file_size: int
+    thumbnail_path: Optional[str] = None  # /tasks/attachments/{id}/thumbnail, once rendered (images only)
     created_at: datetime
+
+class AttachmentLink(BaseModel):
+    url: str  # file_path with a link token for this attachment only
+    thumbnail_url: Optional[str] = None
+    expires_at: datetime
 class ChatMessage(BaseModel):
     board_id: str
     user_id: str
@@ -182,4 +224,27 @@ class ActivityLog(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class ActivityLogResponse(ActivityLog):
-    id: str
\ No newline at end of file
+    id: str
+# -----------------------
+# Composite Task Detail
+# -----------------------
+class TaskDetail(BaseModel):
+    task: TaskResponse
+    # Present only when requested with ?include=; newest first
+    comments: Optional[List[CommentResponse]] = None
+    attachments: Optional[List[AttachmentResponse]] = None
+    activity: Optional[List[ActivityLogResponse]] = None
+    # Cursor for the matching list endpoint, for sections cut off by ?limit=
+    cursors: Dict[str, str] = {}
+
+# -----------------------
+# Search
+# -----------------------
+class SearchHit(BaseModel):
+    type: str  # "task" or "comment"
+    id: str  # task or comment id
+    task_id: str
+    board_id: str
+    title: str  # the task's title
+    snippet: Optional[str] = None  # matching part of the description or comment
+    score: float
@@ -0,0 +1,143 @@
+# backend/pagination.py
+"""
+Keyset pagination and field projection shared by the list endpoints.
+
+Lists are ordered by ``(created_at, _id)``. A page is requested with
+``?limit=`` and continued with the opaque cursor returned in the
+``X-Next-Cursor`` response header (absent on the last page); each page is a
+range query on that key, so deep pages cost the same as the first one.
+``?fields=a,b`` limits the returned fields and is pushed down into the
+database query as a projection. Without ``limit`` a page holds
+``PAGE_SIZE_DEFAULT`` rows (or the endpoint's own default); the whole list
+is only returned when asked for with ``?all=true``. Rows are encoded by the
+endpoint's ``RowSerializer`` rather than per-row response models.
+"""
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, Query, Response, status
+from pydantic import BaseModel
+
+from backend.serializers import RowSerializer, json_response
+
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "1000"))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# -----------------------
+# Cursors
+# -----------------------
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    created_at = doc.get("created_at")
+    key = [created_at.isoformat() if created_at is not None else None, str(doc["_id"])]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return (datetime.fromisoformat(created_at) if created_at is not None else None, ObjectId(doc_id))
+    except (ValueError, TypeError, InvalidId):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor")
+
+def keyset_filter(after: tuple, direction: int) -> Dict[str, Any]:
+    """Rows strictly after `after` in (created_at, _id) order"""
+    created_at, doc_id = after
+    op = "$lt" if direction < 0 else "$gt"
+    tie = {"created_at": created_at, "_id": {op: doc_id}}
+    if created_at is None:
+        # Missing dates sort first; nothing sorts before them, everything dated sorts after
+        return tie if direction < 0 else {"$or": [tie, {"created_at": {"$ne": None}}]}
+    return {"$or": [{"created_at": {op: created_at}}, tie]}
+
+# -----------------------
+# Request parameters
+# -----------------------
+class PageParams:
+    """Dependency carrying ?cursor=, ?limit=, ?all= and ?fields="""
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description=f"Cursor from the previous page's {NEXT_CURSOR_HEADER} header"),
+        limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX, description=f"Page size (default {PAGE_SIZE_DEFAULT})"),
+        all_rows: bool = Query(False, alias="all", description="Return every row in one response instead of a page"),
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,username")
+    ):
+        if all_rows and (cursor or limit is not None):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="all=true cannot be combined with cursor or limit"
+            )
+        self.after = decode_cursor(cursor) if cursor else None
+        self.limit = limit
+        self.all = all_rows
+        self.fields = {f.strip() for f in fields.split(",") if f.strip()} if fields else None
+
+    def projection(self, model: Type[BaseModel], sources: Dict[str, Tuple[str, ...]] | None = None) -> Dict[str, int] | None:
+        """The stored fields behind ?fields= (`sources` maps computed response fields to theirs)"""
+        if self.fields is None:
+            return None
+        unknown = self.fields - set(model.model_fields)
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+            )
+        sources = sources or {}
+        projection = {stored: 1 for field in self.fields if field != "id" for stored in sources.get(field, (field,))}
+        projection["created_at"] = 1  # needed for the next cursor
+        return projection
+
+async def fetch_page(
+    collection,
+    flt: Dict[str, Any],
+    limit: int | None,
+    after: tuple | None = None,
+    direction: int = 1,
+    projection: Dict[str, Any] | None = None
+) -> Tuple[List[Dict[str, Any]], str | None]:
+    """One (created_at, _id)-ordered page of documents and the cursor of the next one (None on the last page)"""
+    query = flt
+    if after is not None:
+        keyset = keyset_filter(after, direction)
+        query = {"$and": [flt, keyset]} if flt else keyset
+    cursor = collection.find(query, projection).sort([("created_at", direction), ("_id", direction)])
+    if limit:
+        cursor = cursor.limit(limit + 1)
+    docs = await cursor.to_list(None)
+    if limit and len(docs) > limit:
+        docs = docs[:limit]
+        return docs, encode_cursor(docs[-1])
+    return docs, None
+
+async def paginate(
+    collection,
+    flt: Dict[str, Any],
+    page: PageParams,
+    response: Response,
+    serializer: RowSerializer,
+    direction: int = 1,
+    projection: Dict[str, Any] | None = None,
+    default_limit: int | None = None
+) -> Response:
+    """
+    Run a (created_at, _id)-ordered page query and return the encoded rows.
+
+    Rows have the fields of `serializer.model`, or just the requested ones
+    when ?fields= is given. The endpoint's response headers are carried over.
+    """
+    limit = None if page.all else page.limit or default_limit or PAGE_SIZE_DEFAULT
+    docs, next_cursor = await fetch_page(
+        collection, flt, limit, page.after, direction,
+        page.projection(serializer.model, serializer.sources) or projection
+    )
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if page.fields is not None:
+        rows = [serializer.partial(doc, page.fields) for doc in docs]
+    else:
+        rows = serializer.many(docs)
+    return json_response(rows, headers=dict(response.headers))
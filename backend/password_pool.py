@@ -0,0 +1,61 @@
+# backend/password_pool.py
+"""
+Bounded process pool for bcrypt hashing and verification.
+
+bcrypt costs 100-300 ms of CPU per call; running it on the request path (or
+the shared threadpool) lets a login burst starve every other endpoint. Work
+is sent to a small dedicated process pool instead, and once more than
+``PASSWORD_POOL_MAX_PENDING`` calls are queued or running new requests are
+rejected immediately with 429 rather than piling up.
+"""
+import os
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from backend.process_pool import BoundedProcessPool, PoolFull
+
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_POOL_MAX_PENDING = int(os.getenv("PASSWORD_POOL_MAX_PENDING", str(PASSWORD_POOL_WORKERS * 8)))
+
+# -----------------------
+# Worker-side functions (run in the pool processes)
+# -----------------------
+_pwd_context = None
+
+def _context() -> CryptContext:
+    global _pwd_context
+    if _pwd_context is None:
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+def _hash(password: str) -> str:
+    return _context().hash(password)
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return _context().verify(plain_password, hashed_password)
+
+# -----------------------
+# Pool
+# -----------------------
+class PasswordPool(BoundedProcessPool):
+    def __init__(self, workers: int = PASSWORD_POOL_WORKERS, max_pending: int = PASSWORD_POOL_MAX_PENDING):
+        super().__init__("password_pool", workers, max_pending)
+
+    async def _run(self, fn, *args):
+        try:
+            return await self.run(fn, *args)
+        except PoolFull:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many authentication requests, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(_verify, plain_password, hashed_password)
+
+password_pool = PasswordPool()
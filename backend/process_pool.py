@@ -0,0 +1,65 @@
+# backend/process_pool.py
+"""
+Bounded process pools for CPU-heavy work that must stay off the event loop.
+
+A pool runs module-level functions in a few dedicated worker processes and
+admits at most ``max_pending`` calls (queued or running) at a time; past that
+``run`` raises ``PoolFull`` at once, so callers can shed load (429, skip the
+work) instead of piling requests up behind the pool. The executor is created
+on first use or by ``start()`` from the app lifespan.
+
+Work functions are sent to the workers by reference, so every worker imports
+the module that defines them: keep those modules free of database and router
+imports.
+"""
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from backend import metrics
+
+class PoolFull(Exception):
+    pass
+
+class BoundedProcessPool:
+    def __init__(self, name: str, workers: int, max_pending: int, available: bool = True):
+        """`available` False (a missing optional dependency) never starts workers"""
+        self.name = name
+        self.workers = workers
+        self.max_pending = max_pending
+        self.available = available
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending = 0
+        self.pending = metrics.gauge(f"{name}.pending")
+        self.rejected = metrics.counter(f"{name}.rejected")
+        self.latency = metrics.summary(f"{name}.latency_ms")
+
+    def start(self):
+        if self._executor is None and self.available:
+            # spawn: forking a process that already runs an event loop and threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn, *args):
+        """`fn(*args)` in a worker process; raises PoolFull instead of queueing past max_pending"""
+        if self._pending >= self.max_pending:
+            self.rejected.inc()
+            raise PoolFull(self.name)
+        self.start()
+        self._pending += 1
+        self.pending.set(self._pending)
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+            self.pending.set(self._pending)
+            self.latency.observe((time.perf_counter() - started) * 1000)
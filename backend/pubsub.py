@@ -0,0 +1,220 @@
+# backend/pubsub.py
+"""
+Pluggable publish/subscribe bus shared by all workers of the API.
+
+``InProcessBus`` (the default) only reaches subscribers in the current
+process. ``UnixSocketBus`` connects every worker on the host to a small relay
+hub over a Unix domain socket: one worker wins an flock-based election and
+runs the hub, every worker (including that one) connects to it as a client,
+and the hub forwards each published frame to all other workers. If the hub
+worker exits its lock is released and the survivors elect a new one.
+
+Select the backend with PUBSUB_URL:
+    (unset) / memory://          in-process only
+    unix:///tmp/rttm-bus.sock    cross-process over a Unix socket
+
+Besides regular channels the bus emits two control channels to subscribers:
+PEER_UP (another worker connected) and PEER_DOWN (a worker went away, or this
+worker lost the hub and every remote peer must be considered gone).
+``Bus.generation`` changes whenever this worker connects to or loses the hub,
+so state derived from bus messages can tell that some may have been missed.
+"""
+import asyncio
+import json
+import os
+import uuid
+from typing import Awaitable, Callable, Dict, List, Set
+
+PEER_UP = "__peer_up__"
+PEER_DOWN = "__peer_down__"
+
+Handler = Callable[[str, dict, str], Awaitable[None]]
+
+class Bus:
+    """Base bus: subscriber registry and local dispatch"""
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex
+        self._handlers: Dict[str, List[Handler]] = {}
+        self.generation = 0
+
+    @property
+    def connected(self) -> bool:
+        """Whether messages from other workers are currently being received"""
+        return True
+
+    def subscribe(self, channel: str, handler: Handler):
+        """Register `handler(channel, message, origin_worker_id)` for a channel"""
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def _dispatch(self, channel: str, message: dict, origin: str):
+        for handler in self._handlers.get(channel, ()):
+            try:
+                await handler(channel, message, origin)
+            except Exception as e:
+                print(f"[ERROR] pubsub handler for {channel} failed: {e}")
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, channel: str, message: dict):
+        raise NotImplementedError
+
+class InProcessBus(Bus):
+    async def publish(self, channel: str, message: dict):
+        await self._dispatch(channel, message, self.worker_id)
+
+class UnixSocketBus(Bus):
+    STREAM_LIMIT = 16 * 1024 * 1024
+    # Drop a hub client whose unsent backlog grows past this many bytes
+    MAX_CLIENT_BACKLOG = 64 * 1024 * 1024
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self.lock_path = path + ".lock"
+        self._writer: asyncio.StreamWriter | None = None
+        self._runner: asyncio.Task | None = None
+        self._connected = asyncio.Event()
+        self._closing = False
+        # Hub state (only used by the elected worker)
+        self._lock_fd: int | None = None
+        self._server: asyncio.AbstractServer | None = None
+        self._clients: Dict[asyncio.StreamWriter, str] = {}
+        self._client_tasks: Set[asyncio.Task] = set()
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    # -----------------------
+    # Client side
+    # -----------------------
+    async def start(self):
+        self._runner = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            print(f"[WARNING] pubsub: could not reach hub at {self.path}, delivering locally until it is up")
+
+    async def stop(self):
+        self._closing = True
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+        if self._server is not None:
+            self._server.close()
+            for task in list(self._client_tasks):
+                task.cancel()
+            await asyncio.gather(*self._client_tasks, return_exceptions=True)
+            self._server = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    async def publish(self, channel: str, message: dict):
+        await self._dispatch(channel, message, self.worker_id)
+        writer = self._writer
+        if writer is not None and not writer.is_closing():
+            frame = json.dumps({"c": channel, "o": self.worker_id, "m": message}, default=str)
+            writer.write(frame.encode() + b"\n")
+
+    async def _run(self):
+        backoff = 0.05
+        while not self._closing:
+            try:
+                await self._try_become_hub()
+                reader, writer = await asyncio.open_unix_connection(self.path, limit=self.STREAM_LIMIT)
+            except (FileNotFoundError, ConnectionRefusedError, OSError):
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 1.0)
+                continue
+            backoff = 0.05
+            writer.write(json.dumps({"hello": self.worker_id}).encode() + b"\n")
+            self._writer = writer
+            self._connected.set()
+            self.generation += 1
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    frame = json.loads(line)
+                    await self._dispatch(frame["c"], frame.get("m", {}), frame["o"])
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+                pass
+            finally:
+                self._writer = None
+                self._connected.clear()
+                self.generation += 1
+                writer.close()
+            if not self._closing:
+                # Anything we knew about other workers may be stale now
+                await self._dispatch(PEER_DOWN, {"all": True}, self.worker_id)
+
+    # -----------------------
+    # Hub side
+    # -----------------------
+    async def _try_become_hub(self):
+        if self._server is not None:
+            return
+        import fcntl  # POSIX only; the in-process bus is used elsewhere
+
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return
+        self._lock_fd = fd
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._serve_client, self.path, limit=self.STREAM_LIMIT)
+
+    def _relay(self, data: bytes, sender: asyncio.StreamWriter | None):
+        for client in list(self._clients):
+            if client is sender or client.is_closing():
+                continue
+            if client.transport.get_write_buffer_size() > self.MAX_CLIENT_BACKLOG:
+                client.close()
+                continue
+            client.write(data)
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        worker_id = None
+        self._client_tasks.add(asyncio.current_task())
+        try:
+            hello = await reader.readline()
+            worker_id = json.loads(hello)["hello"]
+            self._clients[writer] = worker_id
+            self._relay(json.dumps({"c": PEER_UP, "o": worker_id, "m": {}}).encode() + b"\n", writer)
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._relay(line, writer)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, KeyError):
+            pass
+        except asyncio.CancelledError:
+            # Hub shutdown; finish normally so the stream callback does not log it
+            pass
+        finally:
+            self._client_tasks.discard(asyncio.current_task())
+            self._clients.pop(writer, None)
+            writer.close()
+            if worker_id is not None:
+                self._relay(json.dumps({"c": PEER_DOWN, "o": worker_id, "m": {}}).encode() + b"\n", None)
+
+def create_bus(url: str | None) -> Bus:
+    if not url or url.startswith("memory://"):
+        return InProcessBus()
+    if url.startswith("unix://"):
+        return UnixSocketBus(url[len("unix://"):])
+    raise ValueError(f"Unsupported PUBSUB_URL: {url}")
+
+bus = create_bus(os.getenv("PUBSUB_URL"))
@@ -0,0 +1,349 @@
+# backend/query_engine.py
+"""
+Mongo-style query and update support for the in-memory mock database.
+
+Filter documents are compiled once into plain Python predicates (and cached),
+so matching a document is a chain of closure calls instead of re-walking the
+filter dict for every row. Update documents are applied by ``apply_update``.
+"""
+import re
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+from bson import ObjectId
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+_MISSING = object()
+
+# -----------------------
+# Value helpers
+# -----------------------
+def type_rank(value) -> int:
+    """Roughly follows MongoDB's BSON comparison order so mixed types still sort"""
+    if value is None or value is _MISSING:
+        return 0
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 1
+    if isinstance(value, str):
+        return 2
+    if isinstance(value, dict):
+        return 3
+    if isinstance(value, (list, tuple)):
+        return 4
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+def get_path(doc: Dict[str, Any], path: str):
+    """Resolve a dotted path; list values along the way fan out into a list of matches"""
+    if "." not in path:
+        return doc.get(path, _MISSING) if isinstance(doc, dict) else _MISSING
+    value: Any = doc
+    for part in path.split("."):
+        if isinstance(value, dict):
+            value = value.get(part, _MISSING)
+        elif isinstance(value, list):
+            if part.isdigit():
+                index = int(part)
+                value = value[index] if index < len(value) else _MISSING
+            else:
+                value = [v.get(part, _MISSING) for v in value if isinstance(v, dict)]
+                value = [v for v in value if v is not _MISSING] or _MISSING
+        else:
+            return _MISSING
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+def _candidates(value) -> List[Any]:
+    """A field matches if the value itself or (for arrays) any element matches"""
+    if isinstance(value, list):
+        return [value, *value]
+    return [value]
+
+def _equals(value, target) -> bool:
+    if target is None:
+        return value is _MISSING or value is None or (isinstance(value, list) and None in value)
+    if value is _MISSING:
+        return False
+    return any(v == target for v in _candidates(value))
+
+def _comparator(op: Callable[[Any, Any], bool], target) -> Callable[[Any], bool]:
+    rank = type_rank(target)
+
+    def compare(value) -> bool:
+        if value is _MISSING:
+            return False
+        for v in _candidates(value):
+            if type_rank(v) == rank:
+                try:
+                    if op(v, target):
+                        return True
+                except TypeError:
+                    continue
+        return False
+    return compare
+
+# -----------------------
+# Filter compilation
+# -----------------------
+_COMPARISONS = {
+    "$gt": lambda a, b: a > b,
+    "$gte": lambda a, b: a >= b,
+    "$lt": lambda a, b: a < b,
+    "$lte": lambda a, b: a <= b,
+}
+
+def _compile_operator(op: str, arg, spec: Dict[str, Any]) -> Callable[[Any], bool]:
+    if op == "$eq":
+        return lambda value: _equals(value, arg)
+    if op == "$ne":
+        return lambda value: not _equals(value, arg)
+    if op in _COMPARISONS:
+        return _comparator(_COMPARISONS[op], arg)
+    if op == "$in":
+        options = list(arg)
+        return lambda value: any(_equals(value, option) for option in options)
+    if op == "$nin":
+        options = list(arg)
+        return lambda value: not any(_equals(value, option) for option in options)
+    if op == "$exists":
+        return lambda value: (value is not _MISSING) == bool(arg)
+    if op == "$regex":
+        flags = 0
+        for char in spec.get("$options", ""):
+            flags |= {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL, "x": re.VERBOSE}.get(char, 0)
+        pattern = arg if isinstance(arg, re.Pattern) else re.compile(arg, flags)
+        return lambda value: value is not _MISSING and any(
+            isinstance(v, str) and pattern.search(v) is not None for v in _candidates(value)
+        )
+    if op == "$options":
+        return lambda value: True
+    if op == "$not":
+        inner = _compile_field_spec(arg)
+        return lambda value: not inner(value)
+    if op == "$size":
+        return lambda value: isinstance(value, list) and len(value) == arg
+    if op == "$all":
+        required = list(arg)
+        return lambda value: all(_equals(value, item) for item in required)
+    if op == "$elemMatch":
+        if any(k.startswith("$") for k in arg):
+            inner = _compile_field_spec(arg)
+            return lambda value: isinstance(value, list) and any(inner(v) for v in value)
+        doc_predicate = compile_filter(arg)
+        return lambda value: isinstance(value, list) and any(isinstance(v, dict) and doc_predicate(v) for v in value)
+    raise ValueError(f"Unsupported query operator: {op}")
+
+def _is_operator_spec(spec) -> bool:
+    return isinstance(spec, dict) and bool(spec) and all(k.startswith("$") for k in spec)
+
+def _compile_field_spec(spec) -> Callable[[Any], bool]:
+    if isinstance(spec, re.Pattern):
+        return _compile_operator("$regex", spec, {})
+    if not _is_operator_spec(spec):
+        return lambda value: _equals(value, spec)
+    tests = [_compile_operator(op, arg, spec) for op, arg in spec.items()]
+    if len(tests) == 1:
+        return tests[0]
+    return lambda value: all(test(value) for test in tests)
+
+def _compile(flt: Dict[str, Any]) -> Predicate:
+    clauses: List[Predicate] = []
+    for key, spec in flt.items():
+        if key in ("$and", "$or", "$nor"):
+            subs = [_compile(sub) for sub in spec]
+            if key == "$and":
+                clauses.append(lambda doc, subs=subs: all(p(doc) for p in subs))
+            elif key == "$or":
+                clauses.append(lambda doc, subs=subs: any(p(doc) for p in subs))
+            else:
+                clauses.append(lambda doc, subs=subs: not any(p(doc) for p in subs))
+            continue
+        if key.startswith("$"):
+            raise ValueError(f"Unsupported top-level operator: {key}")
+        test = _compile_field_spec(spec)
+        if "." in key:
+            clauses.append(lambda doc, key=key, test=test: test(get_path(doc, key)))
+        else:
+            clauses.append(lambda doc, key=key, test=test: test(doc.get(key, _MISSING)))
+    if not clauses:
+        return lambda doc: True
+    if len(clauses) == 1:
+        return clauses[0]
+    return lambda doc: all(clause(doc) for clause in clauses)
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return ("d", tuple((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return ("l", tuple(_freeze(v) for v in value))
+    if isinstance(value, re.Pattern):
+        return ("r", value.pattern, value.flags)
+    # Tag with the type so 1, 1.0 and True do not share a cache entry
+    return (type(value), value)
+
+_cache: Dict[Any, Predicate] = {}
+_cache_lock = threading.Lock()
+_CACHE_SIZE = 2048
+
+def compile_filter(flt: Dict[str, Any] | None) -> Predicate:
+    """Compile a Mongo filter document into a predicate, caching by filter content"""
+    if not flt:
+        return lambda doc: True
+    try:
+        key = _freeze(flt)
+        predicate = _cache.get(key)
+    except TypeError:
+        return _compile(flt)
+    if predicate is None:
+        predicate = _compile(flt)
+        with _cache_lock:
+            if len(_cache) >= _CACHE_SIZE:
+                # Evict the oldest entry (dicts keep insertion order)
+                del _cache[next(iter(_cache))]
+            _cache[key] = predicate
+    return predicate
+
+# -----------------------
+# Index planning
+# -----------------------
+def equality_keys(spec) -> Tuple[Any, ...] | None:
+    """Values a field must equal for `spec` to match, or None if it is not an equality"""
+    if spec is None or isinstance(spec, re.Pattern):
+        return None
+    if not isinstance(spec, dict) or not spec:
+        if isinstance(spec, (list, dict)):
+            return None
+        return (spec,)
+    if not _is_operator_spec(spec):
+        return None
+    if "$eq" in spec and not isinstance(spec["$eq"], (list, dict, type(None))):
+        return (spec["$eq"],)
+    if "$in" in spec and not any(isinstance(v, (list, dict, type(None), re.Pattern)) for v in spec["$in"]):
+        return tuple(spec["$in"])
+    return None
+
+# -----------------------
+# Updates
+# -----------------------
+def _parent(doc: Dict[str, Any], path: str, create: bool):
+    parts = path.split(".")
+    target: Any = doc
+    for part in parts[:-1]:
+        if isinstance(target, list) and part.isdigit():
+            target = target[int(part)]
+            continue
+        if part not in target or not isinstance(target[part], (dict, list)):
+            if not create:
+                return None, parts[-1]
+            target[part] = {}
+        target = target[part]
+    return target, parts[-1]
+
+def _set_path(doc, path, value):
+    parent, last = _parent(doc, path, create=True)
+    if isinstance(parent, list) and last.isdigit():
+        parent[int(last)] = value
+    else:
+        parent[last] = value
+
+def _get_for_update(doc, path):
+    parent, last = _parent(doc, path, create=False)
+    if parent is None:
+        return _MISSING
+    if isinstance(parent, list) and last.isdigit():
+        index = int(last)
+        return parent[index] if index < len(parent) else _MISSING
+    return parent.get(last, _MISSING)
+
+def _each(arg) -> List[Any]:
+    if isinstance(arg, dict) and "$each" in arg:
+        return list(arg["$each"])
+    return [arg]
+
+def _array_for_update(doc, path, op) -> List[Any]:
+    current = _get_for_update(doc, path)
+    if current is _MISSING or current is None:
+        current = []
+        _set_path(doc, path, current)
+    if not isinstance(current, list):
+        raise ValueError(f"Cannot apply {op} to non-array field '{path}'")
+    return current
+
+def apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool = False) -> bool:
+    """Apply update operators to `doc` in place; returns True if anything changed"""
+    changed = False
+    for op, fields in update.items():
+        if not op.startswith("$"):
+            raise ValueError("Replacement documents are not supported; use update operators")
+        for path, arg in fields.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                if _get_for_update(doc, path) != arg:
+                    _set_path(doc, path, arg)
+                    changed = True
+            elif op == "$setOnInsert":
+                continue
+            elif op == "$unset":
+                parent, last = _parent(doc, path, create=False)
+                if isinstance(parent, dict) and last in parent:
+                    del parent[last]
+                    changed = True
+            elif op == "$inc":
+                current = _get_for_update(doc, path)
+                _set_path(doc, path, (0 if current is _MISSING or current is None else current) + arg)
+                changed = changed or arg != 0 or current is _MISSING
+            elif op in ("$min", "$max"):
+                current = _get_for_update(doc, path)
+                if current is _MISSING or (arg < current if op == "$min" else arg > current):
+                    _set_path(doc, path, arg)
+                    changed = True
+            elif op == "$push":
+                _array_for_update(doc, path, op).extend(_each(arg))
+                changed = True
+            elif op == "$addToSet":
+                current = _array_for_update(doc, path, op)
+                for item in _each(arg):
+                    if item not in current:
+                        current.append(item)
+                        changed = True
+            elif op == "$pull":
+                current = _get_for_update(doc, path)
+                if not isinstance(current, list):
+                    continue
+                if _is_operator_spec(arg) and not any(k in ("$and", "$or", "$nor") for k in arg):
+                    test = _compile_field_spec(arg)
+                    keep = [item for item in current if not test(item)]
+                elif isinstance(arg, dict):
+                    test = compile_filter(arg)
+                    keep = [item for item in current if not (isinstance(item, dict) and test(item))]
+                else:
+                    keep = [item for item in current if item != arg]
+                if len(keep) != len(current):
+                    current[:] = keep
+                    changed = True
+            elif op == "$pop":
+                current = _get_for_update(doc, path)
+                if isinstance(current, list) and current:
+                    current.pop(0 if arg < 0 else -1)
+                    changed = True
+            else:
+                raise ValueError(f"Unsupported update operator: {op}")
+    return changed
+
+def upsert_seed(flt: Dict[str, Any]) -> Dict[str, Any]:
+    """Initial document for an upsert: the plain equality fields of the filter"""
+    doc: Dict[str, Any] = {}
+    for key, spec in flt.items():
+        if key.startswith("$"):
+            continue
+        keys = equality_keys(spec)
+        if keys is not None and len(keys) == 1:
+            _set_path(doc, key, keys[0])
+    return doc
@@ -1,53 +1,70 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from typing import List
+import os
 from ..database import activity_logs_collection
 from ..models import ActivityLog, ActivityLogResponse
+from ..pagination import PageParams, paginate
+from ..serializers import activity_row
 from .auth import get_current_user
+from ..write_behind import BatchWriter
 from datetime import datetime
-from bson import ObjectId
 
 router = APIRouter(
     tags=["activity"]
 )
 
-def log_activity(user_id: str, username: str, action: str, entity_type: str, entity_id: str, details: str = None):
+# Activity logs are written behind the request: entries are queued in memory
+# and inserted in batches by a background flusher (started by the app lifespan)
+ACTIVITY_WRITE_BATCH = int(os.getenv("ACTIVITY_WRITE_BATCH", "500"))
+ACTIVITY_FLUSH_INTERVAL_MS = int(os.getenv("ACTIVITY_FLUSH_INTERVAL_MS", "500"))
+# Queue bound; when full, loggers wait up to ACTIVITY_BACKPRESSURE_MS for the flusher, then drop
+ACTIVITY_MAX_PENDING = int(os.getenv("ACTIVITY_MAX_PENDING", "20000"))
+ACTIVITY_BACKPRESSURE_MS = int(os.getenv("ACTIVITY_BACKPRESSURE_MS", "100"))
+# Failed inserts of an entry before it is dropped
+ACTIVITY_MAX_RETRIES = int(os.getenv("ACTIVITY_MAX_RETRIES", "5"))
+
+activity_writer = BatchWriter(
+    activity_logs_collection, "activity.log",
+    batch_size=ACTIVITY_WRITE_BATCH,
+    flush_interval_ms=ACTIVITY_FLUSH_INTERVAL_MS,
+    max_pending=ACTIVITY_MAX_PENDING,
+    max_retries=ACTIVITY_MAX_RETRIES,
+    backpressure_ms=ACTIVITY_BACKPRESSURE_MS,
+)
+
+async def log_activity(user_id: str, username: str, action: str, entity_type: str, entity_id: str, details: str = None):
     """
     Helper function to log an activity.
     """
-    try:
-        log_entry = {
-            "user_id": user_id,
-            "username": username,
-            "action": action,
-            "entity_type": entity_type,
-            "entity_id": entity_id,
-            "details": details,
-            "created_at": datetime.utcnow()
-        }
-        activity_logs_collection.insert_one(log_entry)
-    except Exception as e:
-        print(f"Failed to log activity: {e}")
+    await log_activities([{
+        "user_id": user_id,
+        "username": username,
+        "action": action,
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "details": details
+    }])
+
+async def log_activities(entries: List[dict]):
+    """
+    Log several activities at once; each entry has the arguments of
+    log_activity.
+    """
+    now = datetime.utcnow()
+    await activity_writer.put([{"details": None, **entry, "created_at": now} for entry in entries])
 
 @router.get("/", response_model=List[ActivityLogResponse])
-async def get_recent_activity(current_user: dict = Depends(get_current_user)):
+async def get_recent_activity(
+    response: Response,
+    page: PageParams = Depends(),
+    current_user: dict = Depends(get_current_user)
+):
     """
-    Get the 50 most recent activity logs.
+    Get the most recent activity logs, newest first (50 unless ?limit= is given).
     """
-    logs = activity_logs_collection.find()
-    # Sort by created_at desc in python since mock doesn't support sort
-    sorted_logs = sorted(logs, key=lambda x: x["created_at"], reverse=True)[:50]
-    
-    response = []
-    for log in sorted_logs:
-        response.append(ActivityLogResponse(
-            id=str(log["_id"]),
-            user_id=log["user_id"],
-            username=log["username"],
-            action=log["action"],
-            entity_type=log["entity_type"],
-            entity_id=log["entity_id"],
-            details=log["details"],
-            created_at=log["created_at"]
-        ))
-    
-    return response
+    await activity_writer.flush()
+    return await paginate(
+        activity_logs_collection, {}, page, response, activity_row,
+        direction=-1,
+        default_limit=50
+    )
@@ -1,29 +1,73 @@
 # backend/routers/admin.py
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Response, status
 from datetime import datetime
 from bson import ObjectId
-from typing import List
+from typing import Dict, List
 
-from backend.database import users_collection, teams_collection, boards_collection
+from backend.database import (
+    users_collection, teams_collection, boards_collection, tasks_collection, task_tombstones_collection
+)
 from backend.models import (
     TeamCreate, TeamResponse, BoardCreate, BoardUpdate, BoardResponse, UserResponse, UserRole, UserRoleUpdate
 )
-from backend.routers.auth import get_current_user, require_role
+from backend.routers.auth import get_current_user, require_role, invalidate_principal
+from backend import metrics
+from backend.access import invalidate_boards
+from backend.board_stats import apply_task_changes, delete_board_stats
+from backend.etags import versions
+from backend.pagination import PageParams, paginate
+from backend.search import forget_board
+from backend.serializers import board_row, team_row, user_row
+from backend.task_events import board_version, publish_bulk_task_event
+from backend.uploads import delete_attachments
 from backend.routers.activity import log_activity
 
 router = APIRouter()
 
+async def purge_board(board_id: str):
+    """Remove what a deleted board leaves behind: its tasks and their attachment files, tombstones, stats and search index"""
+    tasks = await tasks_collection.find({"board_id": board_id}, {"_id": 1}).to_list(None)
+    await tasks_collection.delete_many({"board_id": board_id})
+    if tasks:
+        await delete_attachments({"task_id": {"$in": [str(task["_id"]) for task in tasks]}})
+    await task_tombstones_collection.delete_many({"board_id": board_id})
+    await delete_board_stats(board_id)
+    await forget_board(board_id)
+
+async def unassign_user(user_id: str, current_user: dict):
+    """Unassign every task of a user, one board version and bulk event per board, moving the stats counters along"""
+    tasks = await tasks_collection.find({"assigned_to": user_id}, {"board_id": 1}).to_list(None)
+    by_board: Dict[str, List[ObjectId]] = {}
+    for task in tasks:
+        by_board.setdefault(task["board_id"], []).append(task["_id"])
+    for board_id, task_ids in by_board.items():
+        changes = {"assigned_to": None, "updated_at": datetime.utcnow()}
+        befores = []
+        async with board_version(board_id) as version:
+            for task_id in task_ids:
+                # Skips a task reassigned meanwhile, so the stats move only for tasks really unassigned here
+                before = await tasks_collection.find_one_and_update(
+                    {"_id": task_id, "assigned_to": user_id},
+                    {"$set": {**changes, "seq": version}}
+                )
+                if before:
+                    befores.append(before)
+        await apply_task_changes(board_id, [(before, {**before, **changes}) for before in befores])
+        await publish_bulk_task_event(board_id, version, [
+            {"op": "updated", "task_id": str(before["_id"]), "changes": changes} for before in befores
+        ], current_user)
+
 # -----------------------
 # Team Management (Admin Only)
 # -----------------------
 @router.post("/teams", response_model=TeamResponse)
-def create_team(
+async def create_team(
     team: TeamCreate,
     current_user: dict = Depends(require_role([UserRole.ADMIN]))
 ):
     """Admin: Create a new team"""
     # Check if team name already exists
-    if teams_collection.find_one({"name": team.name}):
+    if await teams_collection.find_one({"name": team.name}):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Team name already exists"
@@ -36,9 +80,9 @@ def create_team(
         "created_at": datetime.utcnow()
     }
     
-    result = teams_collection.insert_one(team_doc)
+    result = await teams_collection.insert_one(team_doc)
     
-    log_activity(
+    await log_activity(
         user_id=current_user["id"],
         username=current_user["username"],
         action="created_team",
@@ -56,40 +100,38 @@ def create_team(
     )
 
 @router.get("/teams", response_model=List[TeamResponse])
-def get_all_teams(
+async def get_all_teams(
+    response: Response,
+    page: PageParams = Depends(),
     current_user: dict = Depends(require_role([UserRole.ADMIN]))
 ):
-    """Admin: Get all teams"""
-    teams = list(teams_collection.find())
-    return [
-        TeamResponse(
-            id=str(team["_id"]),
-            name=team["name"],
-            description=team.get("description"),
-            created_by=team["created_by"],
-            created_at=team["created_at"]
-        )
-        for team in teams
-    ]
+    """Admin: Get all teams (paginated with ?limit=/?cursor=)"""
+    return await paginate(teams_collection, {}, page, response, team_row)
 
 @router.delete("/teams/{team_id}")
-def delete_team(
+async def delete_team(
     team_id: str,
     current_user: dict = Depends(require_role([UserRole.ADMIN]))
 ):
     """Admin: Delete a team"""
     try:
-        result = teams_collection.delete_one({"_id": ObjectId(team_id)})
+        result = await teams_collection.delete_one({"_id": ObjectId(team_id)})
         if result.deleted_count == 0:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Team not found"
             )
         
-        # Also delete all boards associated with this team
-        boards_collection.delete_many({"team_id": team_id})
+        # Also delete all boards associated with this team, and everything on them
+        boards = await boards_collection.find({"team_id": team_id}, {"_id": 1}).to_list(None)
+        board_ids = [str(board["_id"]) for board in boards]
+        await boards_collection.delete_many({"team_id": team_id})
+        for board_id in board_ids:
+            await purge_board(board_id)
+        await invalidate_boards()
+        await versions.bump("boards", *(f"board:{board_id}" for board_id in board_ids))
         
-        log_activity(
+        await log_activity(
             user_id=current_user["id"],
             username=current_user["username"],
             action="deleted_team",
@@ -109,13 +151,13 @@ def delete_team(
 # Board Management (Admin Only)
 # -----------------------
 @router.post("/boards", response_model=BoardResponse)
-def create_board(
+async def create_board(
     board: BoardCreate,
     current_user: dict = Depends(require_role([UserRole.ADMIN]))
 ):
     """Admin: Create a new board and assign team members"""
     # Verify team exists
-    if not teams_collection.find_one({"_id": ObjectId(board.team_id)}):
+    if not await teams_collection.find_one({"_id": ObjectId(board.team_id)}):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Team not found"
@@ -123,14 +165,14 @@ def create_board(
     
     # Verify all member IDs exist
     for member_id in board.member_ids:
-        if not users_collection.find_one({"_id": ObjectId(member_id)}):
+        if not await users_collection.find_one({"_id": ObjectId(member_id)}):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"User {member_id} not found"
             )
     
     # Check if board name already exists in this team
-    if boards_collection.find_one({"name": board.name, "team_id": board.team_id}):
+    if await boards_collection.find_one({"name": board.name, "team_id": board.team_id}):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Board name already exists in this team"
@@ -145,9 +187,10 @@ def create_board(
         "created_at": datetime.utcnow()
     }
     
-    result = boards_collection.insert_one(board_doc)
+    result = await boards_collection.insert_one(board_doc)
+    await versions.bump("boards")
     
-    log_activity(
+    await log_activity(
         user_id=current_user["id"],
         username=current_user["username"],
         action="created_board",
@@ -167,32 +210,22 @@ def create_board(
     )
 
 @router.get("/boards", response_model=List[BoardResponse])
-def get_all_boards(
+async def get_all_boards(
+    response: Response,
+    page: PageParams = Depends(),
     current_user: dict = Depends(require_role([UserRole.ADMIN]))
 ):
-    """Admin: Get all boards"""
-    boards = list(boards_collection.find())
-    return [
-        BoardResponse(
-            id=str(board["_id"]),
-            name=board["name"],
-            description=board.get("description"),
-            team_id=board["team_id"],
-            member_ids=board.get("member_ids", []),
-            created_by=board["created_by"],
-            created_at=board["created_at"]
-        )
-        for board in boards
-    ]
+    """Admin: Get all boards (paginated with ?limit=/?cursor=)"""
+    return await paginate(boards_collection, {}, page, response, board_row)
 
 @router.put("/boards/{board_id}", response_model=BoardResponse)
-def update_board(
+async def update_board(
     board_id: str,
     board_update: BoardUpdate,
     current_user: dict = Depends(require_role([UserRole.ADMIN]))
 ):
     """Admin: Update board details and members"""
-    board = boards_collection.find_one({"_id": ObjectId(board_id)})
+    board = await boards_collection.find_one({"_id": ObjectId(board_id)})
     if not board:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -207,7 +240,7 @@ def update_board(
     if board_update.member_ids is not None:
         # Verify all member IDs exist
         for member_id in board_update.member_ids:
-            if not users_collection.find_one({"_id": ObjectId(member_id)}):
+            if not await users_collection.find_one({"_id": ObjectId(member_id)}):
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"User {member_id} not found"
@@ -215,13 +248,16 @@ def update_board(
         update_data["member_ids"] = board_update.member_ids
     
     if update_data:
-        boards_collection.update_one(
+        await boards_collection.update_one(
             {"_id": ObjectId(board_id)},
             {"$set": update_data}
         )
+        if "member_ids" in update_data:
+            await invalidate_boards(board_id)
+        await versions.bump("boards", f"board:{board_id}")
     
     # Fetch updated board
-    updated_board = boards_collection.find_one({"_id": ObjectId(board_id)})
+    updated_board = await boards_collection.find_one({"_id": ObjectId(board_id)})
     
     return BoardResponse(
         id=str(updated_board["_id"]),
@@ -234,20 +270,23 @@ def update_board(
     )
 
 @router.delete("/boards/{board_id}")
-def delete_board(
+async def delete_board(
     board_id: str,
     current_user: dict = Depends(require_role([UserRole.ADMIN]))
 ):
     """Admin: Delete a board"""
     try:
-        result = boards_collection.delete_one({"_id": ObjectId(board_id)})
+        result = await boards_collection.delete_one({"_id": ObjectId(board_id)})
         if result.deleted_count == 0:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Board not found"
             )
+        await purge_board(board_id)
+        await invalidate_boards(board_id)
+        await versions.bump("boards", f"board:{board_id}")
         
-        log_activity(
+        await log_activity(
             user_id=current_user["id"],
             username=current_user["username"],
             action="deleted_board",
@@ -267,52 +306,48 @@ def delete_board(
 # User Management (Admin Only)
 # -----------------------
 @router.get("/users", response_model=List[UserResponse])
-def get_all_users(
+async def get_all_users(
+    response: Response,
+    page: PageParams = Depends(),
     current_user: dict = Depends(require_role([UserRole.ADMIN]))
 ):
-    """Admin: Get all users"""
-    users = list(users_collection.find({}, {"password": 0}))
-    return [
-        UserResponse(
-            id=str(user["_id"]),
-            username=user["username"],
-            email=user["email"],
-            role=user.get("role", "team_member"),
-            created_at=user.get("created_at", datetime.utcnow())
-        )
-        for user in users
-    ]
+    """Admin: Get all users (paginated with ?limit=/?cursor=)"""
+    return await paginate(
+        users_collection, {}, page, response, user_row,
+        projection={"password": 0}
+    )
 
 @router.put("/users/{user_id}/role")
-def update_user_role(
+async def update_user_role(
     user_id: str,
     payload: UserRoleUpdate,
     current_user: dict = Depends(require_role([UserRole.ADMIN]))
 ):
     """Admin: Update user role"""
-    user = users_collection.find_one({"_id": ObjectId(user_id)})
+    user = await users_collection.find_one({"_id": ObjectId(user_id)})
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    users_collection.update_one(
+    await users_collection.update_one(
         {"_id": ObjectId(user_id)},
         {"$set": {"role": payload.role.value}}
     )
+    await invalidate_principal(user_id)
     
     return {"message": f"User role updated to {payload.role.value}"}
 
 @router.delete("/users/{user_id}")
-def delete_user(
+async def delete_user(
     user_id: str,
     current_user: dict = Depends(require_role([UserRole.ADMIN]))
 ):
     """Admin: Delete a user"""
     try:
         # Check if user exists
-        if not users_collection.find_one({"_id": ObjectId(user_id)}):
+        if not await users_collection.find_one({"_id": ObjectId(user_id)}):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
@@ -320,13 +355,18 @@ def delete_user(
 
         # Remove user from all teams and boards
         # 1. Remove from boards' member_ids
-        boards_collection.update_many(
+        await boards_collection.update_many(
             {},
             {"$pull": {"member_ids": user_id}}
         )
+        await invalidate_boards()
+        await versions.bump("boards")
+        # 2. Unassign their tasks (no longer assignable to them once they left the boards)
+        await unassign_user(user_id, current_user)
         
-        # 2. Delete the user document
-        result = users_collection.delete_one({"_id": ObjectId(user_id)})
+        # 3. Delete the user document
+        result = await users_collection.delete_one({"_id": ObjectId(user_id)})
+        await invalidate_principal(user_id)
         
         if result.deleted_count == 0:
              raise HTTPException(
@@ -339,4 +379,14 @@ def delete_user(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
-        )
\ No newline at end of file
+        )
+
+# -----------------------
+# Metrics (Admin Only)
+# -----------------------
+@router.get("/metrics")
+async def get_metrics(
+    current_user: dict = Depends(require_role([UserRole.ADMIN]))
+):
+    """Admin: In-process counters (cache hit rates etc.) for this worker"""
+    return metrics.snapshot()
@@ -1,15 +1,19 @@
 # backend/routers/auth.py
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from bson import ObjectId
 import os
+import time
 from dotenv import load_dotenv
 
+from backend import metrics
+from backend.cache import TTLCache
 from backend.database import users_collection
 from backend.models import SignupModel, LoginModel, TokenResponse, UserResponse, UserRole
+from backend.password_pool import password_pool
+from backend.pubsub import PEER_DOWN, bus
 
 load_dotenv()
 
@@ -19,32 +23,94 @@ router = APIRouter()
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
+# Lifetime of the per-attachment tokens put in download/thumbnail URLs
+ATTACHMENT_LINK_EXPIRE_SECONDS = int(os.getenv("ATTACHMENT_LINK_EXPIRE_SECONDS", "300"))
+ATTACHMENT_LINK_SCOPE = "attachment"
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Authenticated principals keyed by token (sub, iat), tagged by user id so
+# profile/role changes can drop every cached token of that user at once. The
+# drop is published on the pub/sub bus so every worker applies it.
+principal_cache = TTLCache(
+    "auth.principal_cache",
+    maxsize=int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60")),
+)
 
 # -----------------------
 # Helper Functions
 # -----------------------
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+login_latency = metrics.summary("auth.login.latency_ms")
+login_success = metrics.counter("auth.login.success")
+login_failure = metrics.counter("auth.login.failure")
+
+# bcrypt runs in the bounded password pool (raises 429 when it is saturated)
+async def hash_password(password: str) -> str:
+    return await password_pool.hash(password)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_pool.verify(plain_password, hashed_password)
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Dependency to get current authenticated user"""
-    token = credentials.credentials
+def create_attachment_link_token(user_id: str, attachment_id: str) -> tuple[str, datetime]:
+    """A short-lived token that only opens one attachment (for URLs, which end up in logs and history)"""
+    expire = datetime.utcnow() + timedelta(seconds=ATTACHMENT_LINK_EXPIRE_SECONDS)
+    token = jwt.encode(
+        {"sub": user_id, "att": attachment_id, "scope": ATTACHMENT_LINK_SCOPE, "exp": expire},
+        SECRET_KEY, algorithm=ALGORITHM
+    )
+    return token, expire
+
+async def invalidate_principal(user_id: str):
+    """Drop cached principals for a user on every worker (call after changing or deleting them)"""
+    await bus.publish("auth.invalidate", {"user_id": user_id})
+
+async def _on_invalidate(channel: str, payload: dict, origin: str):
+    principal_cache.invalidate_tag(payload["user_id"])
+
+async def _on_peer_down(channel: str, payload: dict, origin: str):
+    # Invalidations published while we were cut off from the hub are lost
+    if payload.get("all"):
+        principal_cache.clear()
+
+bus.subscribe("auth.invalidate", _on_invalidate)
+bus.subscribe(PEER_DOWN, _on_peer_down)
+
+async def load_principal(user_id: str, issued_at=None) -> dict | None:
+    """Return the user dict for a token subject, from cache or the users collection"""
+    key = (user_id, issued_at)
+    principal = principal_cache.get(key)
+    if principal is not None:
+        return principal
+
+    user = await users_collection.find_one({"_id": ObjectId(user_id)})
+    if user is None:
+        return None
+
+    principal = {
+        "id": str(user["_id"]),
+        "username": user["username"],
+        "email": user["email"],
+        "role": user["role"],
+        "avatar_url": user.get("avatar_url")
+    }
+    principal_cache.set(key, principal, tag=principal["id"])
+    return principal
+
+async def user_from_token(token: str) -> dict:
+    """The user a JWT access token belongs to; 401 if it is invalid"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
-        if user_id is None:
+        # Scoped tokens (attachment links) are not access tokens
+        if user_id is None or payload.get("scope") is not None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication credentials"
@@ -55,20 +121,52 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             detail="Invalid authentication credentials"
         )
     
-    user = users_collection.find_one({"_id": ObjectId(user_id)})
+    user = await load_principal(user_id, payload.get("iat"))
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
     
-    return {
-        "id": str(user["_id"]),
-        "username": user["username"],
-        "email": user["email"],
-        "role": user["role"],
-        "avatar_url": user.get("avatar_url")
-    }
+    return user
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Dependency to get current authenticated user"""
+    return await user_from_token(credentials.credentials)
+
+async def get_link_user(
+    attachment_id: str,
+    credentials: HTTPAuthorizationCredentials | None = Depends(optional_security),
+    token: str | None = Query(None, description="Link token from /tasks/attachments/{attachment_id}/link")
+):
+    """
+    Like get_current_user, but also accepts ?token= for URLs opened by the
+    browser itself (links and <img> tags cannot send headers). The query token
+    must be a link token for this attachment; access tokens are refused there.
+    """
+    if credentials is not None:
+        return await user_from_token(credentials.credentials)
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated"
+        )
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        payload = {}
+    if payload.get("scope") != ATTACHMENT_LINK_SCOPE or payload.get("att") != attachment_id or not payload.get("sub"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired link"
+        )
+    user = await load_principal(payload["sub"])
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    return user
 
 def require_role(required_roles: list):
     """Dependency to check if user has required role. Supports both Enum values and plain strings."""
@@ -98,16 +196,16 @@ def require_role(required_roles: list):
 # Signup Endpoint
 # -----------------------
 @router.post("/signup", response_model=TokenResponse)
-def signup(user: SignupModel):
+async def signup(user: SignupModel):
     # Check if email already exists
-    if users_collection.find_one({"email": user.email}):
+    if await users_collection.find_one({"email": user.email}):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
     # Check if username already exists
-    if users_collection.find_one({"username": user.username}):
+    if await users_collection.find_one({"username": user.username}):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
@@ -117,12 +215,12 @@ def signup(user: SignupModel):
     user_doc = {
         "username": user.username,
         "email": user.email,
-        "password": hash_password(user.password),
+        "password": await hash_password(user.password),
         "role": user.role.value,
         "created_at": datetime.utcnow()
     }
     
-    result = users_collection.insert_one(user_doc)
+    result = await users_collection.insert_one(user_doc)
     user_id = str(result.inserted_id)
     
     # Create access token
@@ -143,10 +241,12 @@ def signup(user: SignupModel):
 # Login Endpoint
 # -----------------------
 @router.post("/login", response_model=TokenResponse)
-def login(credentials: LoginModel):
-    user = users_collection.find_one({"email": credentials.email})
+async def login(credentials: LoginModel):
+    started = time.perf_counter()
+    user = await users_collection.find_one({"email": credentials.email})
     
-    if not user or not verify_password(credentials.password, user["password"]):
+    if not user or not await verify_password(credentials.password, user["password"]):
+        login_failure.inc()
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
@@ -154,6 +254,8 @@ def login(credentials: LoginModel):
     
     user_id = str(user["_id"])
     access_token = create_access_token({"sub": user_id})
+    login_success.inc()
+    login_latency.observe((time.perf_counter() - started) * 1000)
     
     return TokenResponse(
         access_token=access_token,
@@ -170,7 +272,7 @@ def login(credentials: LoginModel):
 # Get Current User
 # -----------------------
 @router.get("/me", response_model=UserResponse)
-def get_me(current_user: dict = Depends(get_current_user)):
+async def get_me(current_user: dict = Depends(get_current_user)):
     return UserResponse(
         id=current_user["id"],
         username=current_user["username"],
@@ -1,15 +1,20 @@
 # backend/routers/chat.py
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status, Query
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status, Query
 from datetime import datetime
 from bson import ObjectId
 from jose import JWTError, jwt
-from typing import Dict, List
+from typing import Deque, Dict, List, Set, Tuple
+from collections import deque
+import asyncio
 import json
 import os
 from dotenv import load_dotenv
 
-from backend.database import boards_collection, users_collection
-from backend.models import UserRole
+from backend import metrics
+from backend.access import has_board_access
+from backend.chat_history import chat_history
+from backend.pubsub import Bus, PEER_DOWN, PEER_UP, bus
+from backend.routers.auth import get_current_user, load_principal
 
 load_dotenv()
 
@@ -18,54 +23,226 @@ router = APIRouter()
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
 ALGORITHM = "HS256"
 
+WS_OUTBOX_SIZE = int(os.getenv("WS_OUTBOX_SIZE", "256"))
+# What to do when a client's outbox is full: "drop" ephemeral events,
+# "coalesce" them (latest typing state per user wins), or "disconnect"
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "coalesce").lower()
+EPHEMERAL_TYPES = {"typing"}
+
+_dropped = metrics.counter("chat.outbox.dropped")
+_coalesced = metrics.counter("chat.outbox.coalesced")
+_slow_disconnects = metrics.counter("chat.outbox.slow_disconnects")
+_background_tasks: Set[asyncio.Task] = set()
+
+def _encode(message: dict) -> str:
+    # Same encoding as WebSocket.send_json, done once per broadcast
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+class ClientConnection:
+    """
+    A WebSocket plus its bounded outbox. A dedicated writer task drains the
+    outbox, so a client with a full TCP buffer only delays itself.
+    """
+    def __init__(self, websocket: WebSocket, policy: str = WS_SLOW_CONSUMER_POLICY, maxsize: int = WS_OUTBOX_SIZE):
+        self.websocket = websocket
+        self.policy = policy
+        self.maxsize = maxsize
+        # (coalesce key or None, encoded frame)
+        self.outbox: Deque[Tuple[tuple | None, str]] = deque()
+        self.closed = False
+        self._wakeup = asyncio.Event()
+        self._writer = asyncio.create_task(self._drain())
+
+    def offer(self, text: str, ephemeral_key: tuple | None = None) -> bool:
+        """Queue an encoded frame; returns False if the client is closed or too far behind"""
+        if self.closed:
+            return False
+        if ephemeral_key is not None and self.policy == "coalesce":
+            for i, (key, _) in enumerate(self.outbox):
+                if key == ephemeral_key:
+                    self.outbox[i] = (key, text)
+                    _coalesced.inc()
+                    return True
+        if len(self.outbox) >= self.maxsize:
+            if self.policy == "disconnect":
+                return False
+            if ephemeral_key is not None:
+                _dropped.inc()
+                return True
+            if not self._evict_ephemeral():
+                return False
+        self.outbox.append((ephemeral_key, text))
+        self._wakeup.set()
+        return True
+
+    def _evict_ephemeral(self) -> bool:
+        for i, (key, _) in enumerate(self.outbox):
+            if key is not None:
+                del self.outbox[i]
+                _dropped.inc()
+                return True
+        return False
+
+    async def _drain(self):
+        try:
+            while True:
+                while not self.outbox:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                _, text = self.outbox.popleft()
+                await self.websocket.send_text(text)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.closed = True
+
+    def stop(self, close_code: int | None = None):
+        """Stop the writer; optionally close the socket in the background"""
+        self.closed = True
+        self.outbox.clear()
+        self._writer.cancel()
+        if close_code is not None:
+            task = asyncio.create_task(self._close(close_code))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+
+    async def _close(self, code: int):
+        try:
+            await self.websocket.close(code=code, reason="Client too slow")
+        except Exception:
+            pass
+
 # Connection manager to handle WebSocket connections
 class ConnectionManager:
-    def __init__(self):
-        # Store connections by board_id: {board_id: {user_id: websocket}}
-        self.active_connections: Dict[str, Dict[str, WebSocket]] = {}
+    """
+    Tracks this worker's WebSockets and fans board messages out through the
+    pub/sub bus, so members connected to other workers receive them too.
+    Presence (who is online on a board) is aggregated across workers.
+    """
+    def __init__(self, bus: Bus):
+        # Store connections by board_id: {board_id: {user_id: connection}}
+        self.active_connections: Dict[str, Dict[str, ClientConnection]] = {}
+        # Aggregated presence: {board_id: {user_id: {worker_id, ...}}}
+        self.presence: Dict[str, Dict[str, Set[str]]] = {}
+        self.bus = bus
+        bus.subscribe("chat.broadcast", self._on_broadcast)
+        bus.subscribe("chat.presence", self._on_presence)
+        bus.subscribe(PEER_UP, self._on_peer_up)
+        bus.subscribe(PEER_DOWN, self._on_peer_down)
     
     async def connect(self, websocket: WebSocket, board_id: str, user_id: str):
         await websocket.accept()
         if board_id not in self.active_connections:
             self.active_connections[board_id] = {}
-        self.active_connections[board_id][user_id] = websocket
+        previous = self.active_connections[board_id].get(user_id)
+        if previous is not None:
+            previous.stop()
+        self.active_connections[board_id][user_id] = ClientConnection(websocket)
+        await self.bus.publish("chat.presence", {"op": "join", "board_id": board_id, "user_id": user_id})
     
-    def disconnect(self, board_id: str, user_id: str):
-        if board_id in self.active_connections:
-            if user_id in self.active_connections[board_id]:
-                del self.active_connections[board_id][user_id]
-            # Remove board entry if no connections left
-            if not self.active_connections[board_id]:
-                del self.active_connections[board_id]
+    async def disconnect(self, board_id: str, user_id: str, websocket: WebSocket = None):
+        """Forget a user's socket; if `websocket` is given only that socket is removed"""
+        connections = self.active_connections.get(board_id)
+        if not connections or user_id not in connections:
+            return
+        connection = connections[user_id]
+        if websocket is not None and connection.websocket is not websocket:
+            return  # the user has already reconnected with a newer socket
+        connection.stop()
+        del connections[user_id]
+        # Remove board entry if no connections left
+        if not connections:
+            del self.active_connections[board_id]
+        await self.bus.publish("chat.presence", {"op": "leave", "board_id": board_id, "user_id": user_id})
     
     async def broadcast(self, board_id: str, message: dict, exclude_user: str = None):
-        """Broadcast message to all users in a board except exclude_user"""
+        """Broadcast message to all users in a board (on every worker) except exclude_user"""
+        await self.bus.publish("chat.broadcast", {
+            "board_id": board_id,
+            "message": message,
+            "exclude_user": exclude_user
+        })
+    
+    async def _deliver(self, board_id: str, message: dict, exclude_user: str = None):
+        """Queue a message on this worker's sockets for a board without waiting on any of them"""
         if board_id in self.active_connections:
-            disconnected_users = []
+            text = _encode(message)
+            ephemeral_key = None
+            if message.get("type") in EPHEMERAL_TYPES:
+                ephemeral_key = (message["type"], message.get("user_id"))
+            slow_users = []
             for user_id, connection in self.active_connections[board_id].items():
                 if exclude_user and user_id == exclude_user:
                     continue
-                try:
-                    await connection.send_json(message)
-                except Exception:
-                    disconnected_users.append(user_id)
+                if not connection.offer(text, ephemeral_key):
+                    slow_users.append(user_id)
             
-            # Clean up disconnected users
-            for user_id in disconnected_users:
-                self.disconnect(board_id, user_id)
+            # Drop clients that fell too far behind or whose socket failed
+            for user_id in slow_users:
+                await self._drop(board_id, user_id)
     
     async def send_personal_message(self, board_id: str, user_id: str, message: dict):
         """Send message to a specific user"""
-        if board_id in self.active_connections:
-            if user_id in self.active_connections[board_id]:
-                try:
-                    await self.active_connections[board_id][user_id].send_json(message)
-                except Exception:
-                    self.disconnect(board_id, user_id)
+        connection = self.active_connections.get(board_id, {}).get(user_id)
+        if connection is not None and not connection.offer(_encode(message)):
+            await self._drop(board_id, user_id)
+    
+    async def _drop(self, board_id: str, user_id: str):
+        connection = self.active_connections[board_id][user_id]
+        if not connection.closed:
+            _slow_disconnects.inc()
+            connection.stop(close_code=status.WS_1013_TRY_AGAIN_LATER)
+        await self.disconnect(board_id, user_id, connection.websocket)
+    
+    def online_users(self, board_id: str) -> List[str]:
+        return list(self.presence.get(board_id, {}).keys())
+    
+    # -----------------------
+    # Bus handlers
+    # -----------------------
+    async def _on_broadcast(self, channel: str, payload: dict, origin: str):
+        await self._deliver(payload["board_id"], payload["message"], payload.get("exclude_user"))
+    
+    async def _on_presence(self, channel: str, payload: dict, origin: str):
+        if payload["op"] == "sync":
+            # Full local presence of a worker, sent when a new peer appears
+            for board_id, user_ids in payload["boards"].items():
+                for user_id in user_ids:
+                    self.presence.setdefault(board_id, {}).setdefault(user_id, set()).add(origin)
+            return
+        board_id, user_id = payload["board_id"], payload["user_id"]
+        if payload["op"] == "join":
+            self.presence.setdefault(board_id, {}).setdefault(user_id, set()).add(origin)
+        else:
+            workers = self.presence.get(board_id, {}).get(user_id)
+            if workers is not None:
+                workers.discard(origin)
+                if not workers:
+                    del self.presence[board_id][user_id]
+                if not self.presence[board_id]:
+                    del self.presence[board_id]
+    
+    async def _on_peer_up(self, channel: str, payload: dict, origin: str):
+        local = {board_id: list(users) for board_id, users in self.active_connections.items()}
+        if local:
+            await self.bus.publish("chat.presence", {"op": "sync", "boards": local})
+    
+    async def _on_peer_down(self, channel: str, payload: dict, origin: str):
+        for board_id in list(self.presence):
+            users = self.presence[board_id]
+            for user_id in list(users):
+                if payload.get("all"):
+                    users[user_id] &= {self.bus.worker_id}
+                else:
+                    users[user_id].discard(origin)
+                if not users[user_id]:
+                    del users[user_id]
+            if not users:
+                del self.presence[board_id]
 
-manager = ConnectionManager()
+manager = ConnectionManager(bus)
 
-def verify_token(token: str) -> dict:
+async def verify_token(token: str) -> dict:
     """Verify JWT token and return user data"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -74,17 +251,9 @@ def verify_token(token: str) -> dict:
         if user_id is None:
             return None
         
-        user = users_collection.find_one({"_id": ObjectId(user_id)})
+        user = await load_principal(user_id, payload.get("iat"))
         print(f"[DEBUG] verify_token: user found: {user is not None}")
-        if user is None:
-            return None
-        
-        return {
-            "id": str(user["_id"]),
-            "username": user.get("username", "Unknown"),
-            "email": user.get("email", ""),
-            "role": user.get("role", "team_member")
-        }
+        return user
     except JWTError as e:
         print(f"[DEBUG] verify_token: JWTError: {e}")
         return None
@@ -92,37 +261,6 @@ def verify_token(token: str) -> dict:
         print(f"[DEBUG] verify_token: Exception: {e}")
         return None
 
-def verify_board_access(board_id: str, user: dict) -> bool:
-    """Check if user has access to the board"""
-    try:
-        print(f"[DEBUG] verify_board_access: checking access for user {user.get('username')} to board {board_id}")
-        board = boards_collection.find_one({"_id": ObjectId(board_id)})
-        if not board:
-            print(f"[DEBUG] verify_board_access: board not found")
-            return False
-        
-        # Normalize role to handle enum/string representations
-        _role = str(user.get("role", "")).lower()
-        if _role.startswith("userrole."):
-            _role = _role.split(".", 1)[1]
-        
-        print(f"[DEBUG] verify_board_access: user role: {_role}")
-
-        # Admin has access to all boards
-        if _role == UserRole.ADMIN.value:
-            print(f"[DEBUG] verify_board_access: Access GRANTED (Admin)")
-            return True
-        
-        # Team managers and members must be in the board's member list
-        member_ids = board.get("member_ids", [])
-        print(f"[DEBUG] verify_board_access: board members: {member_ids}")
-        is_member = user["id"] in member_ids
-        print(f"[DEBUG] verify_board_access: is_member: {is_member}")
-        return is_member
-    except Exception as e:
-        print(f"[DEBUG] verify_board_access: Exception: {e}")
-        return False
-
 @router.websocket("/ws/{board_id}")
 async def websocket_endpoint(
     websocket: WebSocket,
@@ -135,14 +273,14 @@ async def websocket_endpoint(
     """
     print(f"[DEBUG] websocket_endpoint: New connection request for board {board_id}")
     # Verify authentication
-    user = verify_token(token)
+    user = await verify_token(token)
     if not user:
         print(f"[DEBUG] websocket_endpoint: Token verification failed")
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid token")
         return
     
     # Verify board access
-    if not verify_board_access(board_id, user):
+    if not await has_board_access(board_id, user):
         print(f"[DEBUG] websocket_endpoint: Access denied")
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Access denied")
         return
@@ -160,6 +298,12 @@ async def websocket_endpoint(
     }
     await manager.broadcast(board_id, join_message, exclude_user=user["id"])
     
+    # Replay recent history from memory so a reconnect does not lose the conversation
+    await manager.send_personal_message(board_id, user["id"], {
+        "type": "history",
+        "messages": await chat_history.recent(board_id)
+    })
+    
     # Send welcome message to the user
     welcome_message = {
         "type": "system",
@@ -181,13 +325,15 @@ async def websocket_endpoint(
                     # Regular chat message
                     chat_message = {
                         "type": "chat",
+                        "id": str(ObjectId()),
                         "user_id": user["id"],
                         "username": user["username"],
                         "message": message_data.get("message", ""),
                         "timestamp": datetime.utcnow().isoformat()
                     }
                     
-                    # Broadcast to all users in the board
+                    # Persist (batched) and broadcast to all users in the board
+                    chat_history.persist(board_id, chat_message)
                     await manager.broadcast(board_id, chat_message)
                 
                 elif message_type == "typing":
@@ -217,15 +363,17 @@ async def websocket_endpoint(
                 # If not JSON, treat as plain text message
                 chat_message = {
                     "type": "chat",
+                    "id": str(ObjectId()),
                     "user_id": user["id"],
                     "username": user["username"],
                     "message": data,
                     "timestamp": datetime.utcnow().isoformat()
                 }
+                chat_history.persist(board_id, chat_message)
                 await manager.broadcast(board_id, chat_message)
     
     except WebSocketDisconnect:
-        manager.disconnect(board_id, user["id"])
+        await manager.disconnect(board_id, user["id"], websocket)
         
         # Notify others that user left
         leave_message = {
@@ -238,15 +386,30 @@ async def websocket_endpoint(
 
 @router.get("/boards/{board_id}/online-users")
 async def get_online_users(board_id: str):
-    """Get list of users currently connected to a board"""
-    if board_id in manager.active_connections:
-        return {
-            "board_id": board_id,
-            "online_users": list(manager.active_connections[board_id].keys()),
-            "count": len(manager.active_connections[board_id])
-        }
+    """Get list of users currently connected to a board (across all workers)"""
+    online_users = manager.online_users(board_id)
+    return {
+        "board_id": board_id,
+        "online_users": online_users,
+        "count": len(online_users)
+    }
+
+@router.get("/boards/{board_id}/messages")
+async def get_chat_messages(
+    board_id: str,
+    before: str = Query(None, description="Return messages older than this message id"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: dict = Depends(get_current_user)
+):
+    """Older chat history for a board, oldest first; pass `next_before` back as `before` for the next page"""
+    if before is not None and not ObjectId.is_valid(before):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid message cursor")
+    if not await has_board_access(board_id, current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    
+    messages = await chat_history.before(board_id, before, limit)
     return {
         "board_id": board_id,
-        "online_users": [],
-        "count": 0
-    }
\ No newline at end of file
+        "messages": messages,
+        "next_before": messages[0]["id"] if len(messages) == limit else None
+    }
@@ -1,116 +1,75 @@
 # backend/routers/tasks.py
-from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File
-import shutil
-import os
-import uuid
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
+from fastapi.responses import FileResponse
+import asyncio
 from datetime import datetime
 from bson import ObjectId
-from typing import List
+from typing import List, Optional
 
-from backend.database import tasks_collection, boards_collection, comments_collection, users_collection, attachments_collection
-from backend.models import TaskResponse, TaskStatus, UserRole, TaskStatusUpdate, CommentCreate, CommentResponse, AttachmentResponse
-from backend.routers.auth import get_current_user
-from backend.routers.activity import log_activity
+from backend.database import tasks_collection, boards_collection, comments_collection, users_collection, attachments_collection, activity_logs_collection
+from backend.models import TaskDelta, TaskDetail, TaskResponse, UserRole, TaskStatusUpdate, CommentCreate, CommentResponse, AttachmentLink, AttachmentResponse, SearchHit
+from backend.routers.auth import create_attachment_link_token, get_current_user, get_link_user
+from backend.routers.activity import activity_writer, log_activity
+from backend.access import check_board_access, is_admin, normalize_role, verify_board_access
+from backend.board_stats import apply_task_change, get_board_stats
+from backend.etags import etag
+from backend.pagination import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, PageParams, fetch_page, paginate
+from backend.serializers import (
+    activity_row, attachment_row, attachment_thumbnail_url, attachment_url, comment_row, json_response, task_row
+)
+from backend.search import index_comment, search, unindex_comment
+from backend.task_events import board_tasks_since, board_version, committed_version, publish_task_event
+from backend.uploads import (
+    UPLOAD_OPENAPI, attachment_file_response, commit_upload, delete_attachments, discard_upload, receive_upload,
+    schedule_thumbnails, thumbnail_file_response
+)
 
 router = APIRouter()
 
-# Normalize role helper
-def _normalize_role(role):
-    if isinstance(role, UserRole):
-        return role.value.lower()
-    s = str(role).lower()
-    if s.startswith("userrole."):
-        s = s.split(".", 1)[1]
-    return s
-
-def verify_board_access(board_id: str, current_user: dict) -> dict:
-    """Verify user has access to the board"""
-    board = boards_collection.find_one({"_id": ObjectId(board_id)})
-    if not board:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Board not found"
-        )
-    
-    # Admin has access to all boards
-    _role = _normalize_role(current_user.get("role", ""))
-    if _role == UserRole.ADMIN.value:
-        return board
-    
-    # Team managers and members must be in the board's member list
-    if current_user["id"] not in board.get("member_ids", []):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have access to this board"
-        )
-    
-    return board
-
 # -----------------------
 # Task Viewing (All Authenticated Users)
 # -----------------------
-@router.get("/boards/{board_id}/tasks", response_model=List[TaskResponse])
-def get_my_board_tasks(
+@router.get("/boards/{board_id}/tasks", response_model=List[TaskResponse] | TaskDelta,
+            dependencies=[Depends(etag("boards", "board:{board_id}"))])
+async def get_my_board_tasks(
     board_id: str,
+    response: Response,
+    since: Optional[int] = Query(None, ge=0, description="Only return changes after this board version"),
+    page: PageParams = Depends(),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get all tasks for a board (user must be a member)"""
+    """Get all tasks for a board (user must be a member), or the changes since a version"""
     # Verify board access
-    verify_board_access(board_id, current_user)
+    board = await verify_board_access(board_id, current_user)
+    if since is not None:
+        return await board_tasks_since(board, since, response)
+    response.headers["X-Board-Version"] = str(committed_version(board))
     
-    tasks = list(tasks_collection.find({"board_id": board_id}))
-    return [
-        TaskResponse(
-            id=str(task["_id"]),
-            title=task["title"],
-            description=task.get("description"),
-            board_id=task["board_id"],
-            assigned_to=task.get("assigned_to"),
-            status=task["status"],
-            priority=task["priority"],
-            due_date=task.get("due_date"),
-            created_by=task["created_by"],
-            created_at=task["created_at"],
-            updated_at=task["updated_at"]
-        )
-        for task in tasks
-    ]
+    return await paginate(tasks_collection, {"board_id": board_id}, page, response, task_row)
 
 @router.get("/my-tasks", response_model=List[TaskResponse])
-def get_my_tasks(current_user: dict = Depends(get_current_user)):
+async def get_my_tasks(
+    response: Response,
+    page: PageParams = Depends(),
+    current_user: dict = Depends(get_current_user)
+):
     """Get all tasks assigned to the current user"""
-    tasks = list(tasks_collection.find({"assigned_to": current_user["id"]}))
-    return [
-        TaskResponse(
-            id=str(task["_id"]),
-            title=task["title"],
-            description=task.get("description"),
-            board_id=task["board_id"],
-            assigned_to=task.get("assigned_to"),
-            status=task["status"],
-            priority=task["priority"],
-            due_date=task.get("due_date"),
-            created_by=task["created_by"],
-            created_at=task["created_at"],
-            updated_at=task["updated_at"]
-        )
-        for task in tasks
-    ]
+    return await paginate(tasks_collection, {"assigned_to": current_user["id"]}, page, response, task_row)
 
 # -----------------------
 # Board Access (All Authenticated Users)
 # -----------------------
-@router.get("/my-boards")
-def get_my_boards(current_user: dict = Depends(get_current_user)):
+@router.get("/my-boards", dependencies=[Depends(etag("boards"))])
+async def get_my_boards(current_user: dict = Depends(get_current_user)):
     """Get all boards the current user has access to"""
     try:
-        _role = _normalize_role(current_user.get("role", ""))
+        _role = normalize_role(current_user.get("role", ""))
         print(f"DEBUG: User role: {_role}, ID: {current_user['id']}")
 
         if _role == UserRole.ADMIN.value:
-            boards = list(boards_collection.find())
+            boards = await boards_collection.find().to_list(None)
         else:
-            boards = list(boards_collection.find({"member_ids": current_user["id"]}))
+            boards = await boards_collection.find({"member_ids": current_user["id"]}).to_list(None)
         
         print(f"DEBUG: Found {len(boards)} boards")
 
@@ -131,13 +90,31 @@ def get_my_boards(current_user: dict = Depends(get_current_user)):
         print(f"ERROR in get_my_boards: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/search", response_model=List[SearchHit])
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find; the last one also matches as a prefix"),
+    board_id: Optional[str] = Query(None, description="Only search this board"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: dict = Depends(get_current_user)
+):
+    """Search task titles, descriptions and comments on the boards the user can access, best matches first"""
+    if board_id:
+        await check_board_access(board_id, current_user)
+        board_ids = [board_id]
+    else:
+        flt = {} if is_admin(current_user) else {"member_ids": current_user["id"]}
+        board_ids = [str(board["_id"]) for board in await boards_collection.find(flt, {"_id": 1}).to_list(None)]
+    hits, pending = await search(q, board_ids, limit)
+    # Boards still being indexed in the background are left out; asking again soon includes them
+    return json_response(hits, headers={"X-Search-Pending-Boards": str(pending)} if pending else None)
+
 @router.get("/{task_id}", response_model=TaskResponse)
-def get_task(
+async def get_task(
     task_id: str,
     current_user: dict = Depends(get_current_user)
 ):
     """Get a specific task (user must have access to the board)"""
-    task = tasks_collection.find_one({"_id": ObjectId(task_id)})
+    task = await tasks_collection.find_one({"_id": ObjectId(task_id)})
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -145,7 +122,7 @@ def get_task(
         )
     
     # Verify board access
-    verify_board_access(task["board_id"], current_user)
+    await check_board_access(task["board_id"], current_user)
     
     return TaskResponse(
         id=str(task["_id"]),
@@ -161,17 +138,61 @@ def get_task(
         updated_at=task["updated_at"]
     )
 
+DETAIL_SECTIONS = {
+    "comments": (comments_collection, comment_row, lambda task_id: {"task_id": task_id}),
+    "attachments": (attachments_collection, attachment_row, lambda task_id: {"task_id": task_id}),
+    "activity": (activity_logs_collection, activity_row, lambda task_id: {"entity_type": "task", "entity_id": task_id}),
+}
+
+@router.get("/{task_id}/detail", response_model=TaskDetail)
+async def get_task_detail(
+    task_id: str,
+    include: str = Query("comments,attachments", description="Comma-separated: comments, attachments, activity"),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX, description="Rows per included section"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Task plus its newest comments/attachments/activity in one request (one access check, concurrent reads)"""
+    sections = [name.strip() for name in include.split(",") if name.strip()]
+    unknown = set(sections) - set(DETAIL_SECTIONS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown include: {', '.join(sorted(unknown))}"
+        )
+    
+    task = await tasks_collection.find_one({"_id": ObjectId(task_id)}) if ObjectId.is_valid(task_id) else None
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    await check_board_access(task["board_id"], current_user)
+    
+    sections = list(dict.fromkeys(sections))
+    if "activity" in sections:
+        await activity_writer.flush()
+    pages = await asyncio.gather(*(
+        fetch_page(DETAIL_SECTIONS[name][0], DETAIL_SECTIONS[name][2](task_id), limit, direction=-1)
+        for name in sections
+    ))
+    body = {"task": task_row(task), "cursors": {}}
+    for name, (docs, next_cursor) in zip(sections, pages):
+        body[name] = DETAIL_SECTIONS[name][1].many(docs)
+        if next_cursor is not None:
+            body["cursors"][name] = next_cursor
+    return json_response(body)
+
 # -----------------------
 # Task Status Update (Team Members can update their own tasks)
 # -----------------------
 @router.put("/{task_id}/status")
-def update_my_task_status(
+async def update_my_task_status(
     task_id: str,
     payload: TaskStatusUpdate,
     current_user: dict = Depends(get_current_user)
 ):
     """Team Member: Update status of tasks assigned to them"""
-    task = tasks_collection.find_one({"_id": ObjectId(task_id)})
+    task = await tasks_collection.find_one({"_id": ObjectId(task_id)})
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -179,11 +200,11 @@ def update_my_task_status(
         )
     
     # Verify board access
-    verify_board_access(task["board_id"], current_user)
+    await check_board_access(task["board_id"], current_user)
     
     # Team members can only update their own tasks
     # Team managers and admins can update any task
-    _role = _normalize_role(current_user.get("role", ""))
+    _role = normalize_role(current_user.get("role", ""))
     if _role == UserRole.TEAM_MEMBER.value:
         if task.get("assigned_to") != current_user["id"]:
             raise HTTPException(
@@ -191,12 +212,21 @@ def update_my_task_status(
                 detail="You can only update tasks assigned to you"
             )
     
-    tasks_collection.update_one(
-        {"_id": ObjectId(task_id)},
-        {"$set": {"status": payload.status, "updated_at": datetime.utcnow()}}
-    )
+    changes = {"status": payload.status, "updated_at": datetime.utcnow()}
+    async with board_version(task["board_id"]) as version:
+        before = await tasks_collection.find_one_and_update(
+            {"_id": ObjectId(task_id)},
+            {"$set": {**changes, "seq": version}}
+        )
+        if not before:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Task not found"
+            )
+    await apply_task_change(task["board_id"], before, {**before, **changes})
+    await publish_task_event(task["board_id"], version, "updated", task_id, current_user, changes)
     
-    log_activity(
+    await log_activity(
         user_id=current_user["id"],
         username=current_user["username"],
         action="updated_task_status",
@@ -211,20 +241,13 @@ def update_my_task_status(
 # Board Access (All Authenticated Users)
 # -----------------------
 
-@router.get("/boards/{board_id}")
-def get_board_details(
+@router.get("/boards/{board_id}", dependencies=[Depends(etag("boards", "board:{board_id}", period=3600))])
+async def get_board_details(
     board_id: str,
     current_user: dict = Depends(get_current_user)
 ):
     """Get detailed information about a specific board"""
-    board = verify_board_access(board_id, current_user)
-    
-    # Get task statistics for the board
-    total_tasks = tasks_collection.count_documents({"board_id": board_id})
-    completed_tasks = tasks_collection.count_documents({
-        "board_id": board_id,
-        "status": TaskStatus.COMPLETED
-    })
+    board = await verify_board_access(board_id, current_user)
     
     return {
         "id": str(board["_id"]),
@@ -234,25 +257,22 @@ def get_board_details(
         "member_ids": board.get("member_ids", []),
         "created_by": board.get("created_by", ""),
         "created_at": board.get("created_at", datetime.min),
-        "stats": {
-            "total_tasks": total_tasks,
-            "completed_tasks": completed_tasks,
-            "pending_tasks": total_tasks - completed_tasks
-        }
+        "version": committed_version(board),
+        "stats": await get_board_stats(board_id)
     }
 
 # -----------------------
 # Comments Endpoints
 # -----------------------
 @router.post("/{task_id}/comments", response_model=CommentResponse)
-def create_comment(
+async def create_comment(
     task_id: str,
     payload: CommentCreate,
     current_user: dict = Depends(get_current_user)
 ):
     """Add a comment to a task"""
     # Verify task exists
-    task = tasks_collection.find_one({"_id": ObjectId(task_id)})
+    task = await tasks_collection.find_one({"_id": ObjectId(task_id)})
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -260,7 +280,7 @@ def create_comment(
         )
     
     # Verify board access
-    verify_board_access(task["board_id"], current_user)
+    await check_board_access(task["board_id"], current_user)
     
     comment_doc = {
         "task_id": task_id,
@@ -271,10 +291,11 @@ def create_comment(
         "created_at": datetime.utcnow()
     }
     
-    result = comments_collection.insert_one(comment_doc)
+    result = await comments_collection.insert_one(comment_doc)
+    await index_comment(task["board_id"], {**comment_doc, "_id": result.inserted_id})
     
     # Log activity
-    log_activity(
+    await log_activity(
         user_id=current_user["id"],
         username=current_user["username"],
         action="commented_on_task",
@@ -294,13 +315,15 @@ def create_comment(
     )
 
 @router.get("/{task_id}/comments", response_model=List[CommentResponse])
-def get_task_comments(
+async def get_task_comments(
     task_id: str,
+    response: Response,
+    page: PageParams = Depends(),
     current_user: dict = Depends(get_current_user)
 ):
     """Get all comments for a task"""
     # Verify task exists
-    task = tasks_collection.find_one({"_id": ObjectId(task_id)})
+    task = await tasks_collection.find_one({"_id": ObjectId(task_id)})
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -308,27 +331,18 @@ def get_task_comments(
         )
         
     # Verify board access
-    verify_board_access(task["board_id"], current_user)
-    
-    comments = list(comments_collection.find({"task_id": task_id}).sort("created_at", -1))
+    await check_board_access(task["board_id"], current_user)
     
     # Enrich with latest user info (avatar) if needed, but for now use stored snapshot
     # Ideally should join with users mainly for avatar updates, but snapshot is faster
     
-    return [
-        CommentResponse(
-            id=str(c["_id"]),
-            task_id=c["task_id"],
-            user_id=c["user_id"],
-            username=c["username"],
-            avatar_url=c.get("avatar_url"),
-            content=c["content"],
-            created_at=c["created_at"]
-        ) for c in comments
-    ]
+    return await paginate(
+        comments_collection, {"task_id": task_id}, page, response, comment_row,
+        direction=-1
+    )
 
 @router.delete("/{task_id}/comments/{comment_id}")
-def delete_comment(
+async def delete_comment(
     task_id: str,
     comment_id: str,
     current_user: dict = Depends(get_current_user)
@@ -337,15 +351,15 @@ def delete_comment(
     print(f"DEBUG: Attempting to delete comment {comment_id} for task {task_id}")
     
     # Verify task exists
-    task = tasks_collection.find_one({"_id": ObjectId(task_id)})
+    task = await tasks_collection.find_one({"_id": ObjectId(task_id)})
     if not task:
         print("DEBUG: Task not found")
         raise HTTPException(status_code=404, detail="Task not found")
 
     # Verify board access
-    verify_board_access(task["board_id"], current_user)
+    await check_board_access(task["board_id"], current_user)
 
-    comment = comments_collection.find_one({
+    comment = await comments_collection.find_one({
         "_id": ObjectId(comment_id),
         "task_id": task_id
     })
@@ -355,7 +369,7 @@ def delete_comment(
         raise HTTPException(status_code=404, detail="Comment not found")
 
     # Check permissions: Admin or Author
-    _role = _normalize_role(current_user.get("role", ""))
+    _role = normalize_role(current_user.get("role", ""))
     print(f"DEBUG: User role: {_role}, Comment Author: {comment['user_id']}, Current User: {current_user['id']}")
 
     if _role != UserRole.ADMIN.value and comment["user_id"] != current_user["id"]:
@@ -365,7 +379,8 @@ def delete_comment(
             detail="You can only delete your own comments"
         )
     
-    comments_collection.delete_one({"_id": ObjectId(comment_id)})
+    await comments_collection.delete_one({"_id": ObjectId(comment_id)})
+    await unindex_comment(task["board_id"], comment_id)
     print("DEBUG: Comment deleted successfully")
     
     return {"message": "Comment deleted successfully"}
@@ -373,46 +388,52 @@ def delete_comment(
 # -----------------------
 # Attachment Endpoints
 # -----------------------
-@router.post("/{task_id}/attachments", response_model=AttachmentResponse)
+@router.post("/{task_id}/attachments", response_model=AttachmentResponse, openapi_extra=UPLOAD_OPENAPI)
 async def upload_attachment(
     task_id: str,
-    file: UploadFile = File(...),
+    request: Request,
     current_user: dict = Depends(get_current_user)
 ):
-    """Upload a file attachment to a task"""
+    """Upload a file attachment to a task (multipart field "file", streamed to disk)"""
     # Verify task exists
-    task = tasks_collection.find_one({"_id": ObjectId(task_id)})
+    task = await tasks_collection.find_one({"_id": ObjectId(task_id)})
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    # Verify board access
-    verify_board_access(task["board_id"], current_user)
-    
-    # Save file
-    file_ext = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = f"uploads/{unique_filename}"
+    # Verify board access before reading the body
+    await check_board_access(task["board_id"], current_user)
     
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    static_path = f"/static/uploads/{unique_filename}"
+    # Receive the file, then store it once per content (see backend/uploads.py)
+    file = await receive_upload(request)
     
     attachment_doc = {
         "task_id": task_id,
         "user_id": current_user["id"],
         "username": current_user["username"],
         "filename": file.filename,
-        "file_path": static_path,
         "file_type": file.content_type,
-        "file_size": os.path.getsize(file_path),
+        "file_size": file.size,
+        "sha256": file.sha256,
+        "blob": file.blob,
         "created_at": datetime.utcnow()
     }
     
-    result = attachments_collection.insert_one(attachment_doc)
+    # The reference goes in before the blob so garbage collection of the same content cannot miss it
+    try:
+        result = await attachments_collection.insert_one(attachment_doc)
+    except BaseException:
+        await discard_upload(file)
+        raise
+    try:
+        await commit_upload(file)
+    except BaseException:
+        await attachments_collection.delete_one({"_id": result.inserted_id})
+        await discard_upload(file)
+        raise
+    schedule_thumbnails(file)
     
     # Log activity
-    log_activity(
+    await log_activity(
         user_id=current_user["id"],
         username=current_user["username"],
         action="uploaded_attachment",
@@ -421,44 +442,117 @@ async def upload_attachment(
         details=f"Uploaded {file.filename}"
     )
     
-    return AttachmentResponse(
-        id=str(result.inserted_id),
-        task_id=attachment_doc["task_id"],
-        user_id=attachment_doc["user_id"],
-        username=attachment_doc["username"],
-        filename=attachment_doc["filename"],
-        file_path=attachment_doc["file_path"],
-        file_type=attachment_doc["file_type"],
-        file_size=attachment_doc["file_size"],
-        created_at=attachment_doc["created_at"]
+    return attachment_row({**attachment_doc, "_id": result.inserted_id})
+
+@router.delete("/{task_id}/attachments/{attachment_id}")
+async def delete_attachment(
+    task_id: str,
+    attachment_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Delete an attachment (Uploader or Admin only); the file goes with its last reference"""
+    # Verify task exists
+    task = await tasks_collection.find_one({"_id": ObjectId(task_id)})
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    # Verify board access
+    await check_board_access(task["board_id"], current_user)
+
+    attachment = await attachments_collection.find_one({
+        "_id": ObjectId(attachment_id),
+        "task_id": task_id
+    }) if ObjectId.is_valid(attachment_id) else None
+    if not attachment:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+
+    # Check permissions: Admin or Uploader
+    if normalize_role(current_user.get("role", "")) != UserRole.ADMIN.value and attachment["user_id"] != current_user["id"]:
+        raise HTTPException(
+            status_code=403,
+            detail="You can only delete your own attachments"
+        )
+
+    await delete_attachments({"_id": attachment["_id"]})
+
+    await log_activity(
+        user_id=current_user["id"],
+        username=current_user["username"],
+        action="deleted_attachment",
+        entity_type="task",
+        entity_id=task_id,
+        details=f"Deleted {attachment['filename']}"
     )
 
+    return {"message": "Attachment deleted successfully"}
+
+async def readable_attachment(attachment_id: str, current_user: dict) -> dict:
+    """An attachment document, if it exists and the user can access its task's board"""
+    attachment = await attachments_collection.find_one({"_id": ObjectId(attachment_id)}) if ObjectId.is_valid(attachment_id) else None
+    if not attachment:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+
+    # Verify board access through the attachment's task
+    task = await tasks_collection.find_one({"_id": ObjectId(attachment["task_id"])}, {"board_id": 1})
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    await check_board_access(task["board_id"], current_user)
+    return attachment
+
+@router.get("/attachments/{attachment_id}/link", response_model=AttachmentLink)
+async def attachment_link(
+    attachment_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Short-lived download/thumbnail URLs for links and <img> tags, which cannot send the Authorization header"""
+    attachment = await readable_attachment(attachment_id, current_user)
+    token, expires_at = create_attachment_link_token(current_user["id"], attachment_id)
+    thumbnail_url = attachment_thumbnail_url(attachment)
+    return AttachmentLink(
+        url=f"{attachment_url(attachment)}?token={token}",
+        thumbnail_url=f"{thumbnail_url}?token={token}" if thumbnail_url else None,
+        expires_at=expires_at
+    )
+
+@router.get("/attachments/{attachment_id}/download", response_class=FileResponse)
+async def download_attachment(
+    attachment_id: str,
+    request: Request,
+    download: bool = Query(False, description="Always save instead of showing in the browser"),
+    current_user: dict = Depends(get_link_user)
+):
+    """Download an attachment (board members only); supports Range and conditional requests"""
+    attachment = await readable_attachment(attachment_id, current_user)
+    return await attachment_file_response(attachment, request, as_download=download)
+
+@router.get("/attachments/{attachment_id}/thumbnail", response_class=FileResponse)
+async def attachment_thumbnail(
+    attachment_id: str,
+    request: Request,
+    size: int = Query(160, ge=1, description="Smallest acceptable width/height in pixels"),
+    current_user: dict = Depends(get_link_user)
+):
+    """WebP thumbnail of an image attachment (404 until it has been rendered)"""
+    attachment = await readable_attachment(attachment_id, current_user)
+    return await thumbnail_file_response(attachment, request, size)
+
 @router.get("/{task_id}/attachments", response_model=List[AttachmentResponse])
-def get_task_attachments(
+async def get_task_attachments(
     task_id: str,
+    response: Response,
+    page: PageParams = Depends(),
     current_user: dict = Depends(get_current_user)
 ):
     """Get all attachments for a task"""
     # Verify task exists
-    task = tasks_collection.find_one({"_id": ObjectId(task_id)})
+    task = await tasks_collection.find_one({"_id": ObjectId(task_id)})
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
         
     # Verify board access
-    verify_board_access(task["board_id"], current_user)
-    
-    attachments = list(attachments_collection.find({"task_id": task_id}).sort("created_at", -1))
+    await check_board_access(task["board_id"], current_user)
     
-    return [
-        AttachmentResponse(
-            id=str(a["_id"]),
-            task_id=a["task_id"],
-            user_id=a["user_id"],
-            username=a["username"],
-            filename=a["filename"],
-            file_path=a["file_path"],
-            file_type=a["file_type"],
-            file_size=a["file_size"],
-            created_at=a["created_at"]
-        ) for a in attachments
-    ]
\ No newline at end of file
+    return await paginate(
+        attachments_collection, {"task_id": task_id}, page, response, attachment_row,
+        direction=-1
+    )
\ No newline at end of file
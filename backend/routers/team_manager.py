@@ -1,59 +1,45 @@
 # backend/routers/team_manager.py
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, status
 from datetime import datetime
 from bson import ObjectId
-from typing import List
+from pymongo import DeleteOne, UpdateOne
+from typing import List, Optional
 
-from backend.database import tasks_collection, boards_collection, users_collection
+from backend.database import tasks_collection, users_collection
 from backend.models import (
-    TeamCreate, BoardCreate, BoardUpdate, TaskCreate, TaskUpdate, TaskResponse, UserRole, TaskAssignPayload
+    TeamCreate, BoardCreate, BoardUpdate, TaskCreate, TaskUpdate, TaskResponse, UserRole, TaskAssignPayload, TaskDelta,
+    TaskBulkOp, TaskBulkRequest, TaskBulkResponse, TaskBulkResult, TaskPriority, TaskStatus
 )
 from backend.routers.auth import get_current_user, require_role
-from backend.routers.activity import log_activity
+from backend.routers.activity import log_activities, log_activity
+from backend.access import check_board_access, verify_board_access
+from backend.board_stats import apply_task_change, apply_task_changes
+from backend.etags import etag
+from backend.pagination import PageParams, paginate
+from backend.serializers import task_row
+from backend.task_events import (
+    board_tasks_since, board_version, committed_version, publish_bulk_task_event, publish_task_event, record_tombstone, record_tombstones
+)
+from backend.search import index_tasks, unindex_tasks
+from backend.uploads import delete_attachments
 
 router = APIRouter()
 
-def verify_board_access(board_id: str, current_user: dict) -> dict:
-    """Verify user has access to the board"""
-    board = boards_collection.find_one({"_id": ObjectId(board_id)})
-    if not board:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Board not found"
-        )
-    
-    # Admin has access to all boards
-    # Normalize role to handle enum/string representations
-    _role = str(current_user.get("role", "")).lower()
-    if _role.startswith("userrole."):
-        _role = _role.split(".", 1)[1]
-    if _role == UserRole.ADMIN.value:
-        return board
-    
-    # Team managers and members must be in the board's member list
-    if current_user["id"] not in board.get("member_ids", []):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have access to this board"
-        )
-    
-    return board
-
 # -----------------------
 # Task Management (Team Manager & Admin)
 # -----------------------
 @router.post("/tasks", response_model=TaskResponse)
-def create_task(
+async def create_task(
     task: TaskCreate,
     current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.TEAM_MANAGER]))
 ):
     """Team Manager/Admin: Create a new task"""
     # Verify board access
-    board = verify_board_access(task.board_id, current_user)
+    members = await check_board_access(task.board_id, current_user)
     
     # Verify assigned user exists and has access to the board
     if task.assigned_to:
-        assigned_user = users_collection.find_one({"_id": ObjectId(task.assigned_to)})
+        assigned_user = await users_collection.find_one({"_id": ObjectId(task.assigned_to)})
         if not assigned_user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -61,7 +47,7 @@ def create_task(
             )
         
         # Check if assigned user is a member of the board
-        if task.assigned_to not in board.get("member_ids", []):
+        if task.assigned_to not in members:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Assigned user is not a member of this board"
@@ -80,9 +66,13 @@ def create_task(
         "updated_at": datetime.utcnow()
     }
     
-    result = tasks_collection.insert_one(task_doc)
+    async with board_version(task.board_id) as version:
+        task_doc["seq"] = version
+        result = await tasks_collection.insert_one(task_doc)
+    await apply_task_change(task.board_id, None, task_doc)
+    await index_tasks(task.board_id, [{**task_doc, "_id": result.inserted_id}])
     
-    log_activity(
+    await log_activity(
         user_id=current_user["id"],
         username=current_user["username"],
         action="created_task",
@@ -91,7 +81,7 @@ def create_task(
         details=f"Created task '{task.title}' in board"
     )
     
-    return TaskResponse(
+    created = TaskResponse(
         id=str(result.inserted_id),
         title=task.title,
         description=task.description,
@@ -104,42 +94,153 @@ def create_task(
         created_at=task_doc["created_at"],
         updated_at=task_doc["updated_at"]
     )
+    await publish_task_event(task.board_id, task_doc["seq"], "created", created.id, current_user, created.model_dump())
+    
+    return created
+
+BULK_UPDATE_FIELDS = {"title", "description", "assigned_to", "status", "priority", "due_date"}
+
+@router.post("/tasks/bulk", response_model=TaskBulkResponse)
+async def bulk_tasks(
+    payload: TaskBulkRequest,
+    current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.TEAM_MANAGER]))
+):
+    """
+    Team Manager/Admin: Create, update (e.g. move) and delete many tasks of one board.
 
-@router.get("/boards/{board_id}/tasks", response_model=List[TaskResponse])
-def get_board_tasks(
+    Items succeed or fail independently (see `results`). Everything applied
+    shares one new board version, one write per kind, one activity insert
+    and one real-time event.
+    """
+    board_id = payload.board_id
+    board = await verify_board_access(board_id, current_user)
+    members = set(board.get("member_ids", []))
+    
+    task_ids = {
+        item.task_id for item in payload.items
+        if item.op != TaskBulkOp.CREATE and item.task_id and ObjectId.is_valid(item.task_id)
+    }
+    current = {}
+    if task_ids:
+        found = await tasks_collection.find(
+            {"_id": {"$in": [ObjectId(task_id) for task_id in task_ids]}, "board_id": board_id}
+        ).to_list(None)
+        current = {str(t["_id"]): dict(t) for t in found}
+    
+    now = datetime.utcnow()
+    results: List[TaskBulkResult] = []
+    inserts, stats_changes, events, activities = [], [], [], []
+    updates, deleted = {}, []
+    
+    for index, item in enumerate(payload.items):
+        if item.assigned_to and item.assigned_to not in members:
+            results.append(TaskBulkResult(index=index, ok=False, task_id=item.task_id, error="Assigned user is not a member of this board"))
+            continue
+        
+        if item.op == TaskBulkOp.CREATE:
+            if not item.title:
+                results.append(TaskBulkResult(index=index, ok=False, error="title is required"))
+                continue
+            task_doc = {
+                "_id": ObjectId(),
+                "title": item.title,
+                "description": item.description,
+                "board_id": board_id,
+                "assigned_to": item.assigned_to or None,
+                "status": item.status or TaskStatus.TODO,
+                "priority": item.priority or TaskPriority.MEDIUM,
+                "due_date": item.due_date,
+                "created_by": current_user["id"],
+                "created_at": now,
+                "updated_at": now
+            }
+            task_id = str(task_doc["_id"])
+            inserts.append(task_doc)
+            stats_changes.append((None, task_doc))
+            events.append({"op": "created", "task_id": task_id, "changes": task_row(task_doc)})
+            activities.append({"action": "created_task", "entity_id": task_id, "details": f"Created task '{item.title}' in board"})
+            results.append(TaskBulkResult(index=index, ok=True, task_id=task_id))
+            continue
+        
+        task = current.get(item.task_id)
+        if task is None:
+            results.append(TaskBulkResult(index=index, ok=False, task_id=item.task_id, error="Task not found"))
+            continue
+        
+        if item.op == TaskBulkOp.DELETE:
+            del current[item.task_id]
+            deleted.append(item.task_id)
+            stats_changes.append((task, None))
+            events.append({"op": "deleted", "task_id": item.task_id, "changes": {}})
+            activities.append({"action": "deleted_task", "entity_id": item.task_id, "details": f"Deleted task '{task['title']}'"})
+        else:
+            changes = {**item.model_dump(include=BULK_UPDATE_FIELDS, exclude_none=True), "updated_at": now}
+            current[item.task_id] = {**task, **changes}
+            # Several updates of one task collapse into a single $set
+            updates.setdefault(item.task_id, {}).update(changes)
+            stats_changes.append((task, current[item.task_id]))
+            events.append({"op": "updated", "task_id": item.task_id, "changes": changes})
+            activities.append({"action": "updated_task", "entity_id": item.task_id, "details": "Updated task details"})
+        results.append(TaskBulkResult(index=index, ok=True, task_id=item.task_id))
+    
+    if not events:
+        return TaskBulkResponse(version=committed_version(board), results=results)
+    
+    async with board_version(board_id) as version:
+        if inserts:
+            for task_doc in inserts:
+                task_doc["seq"] = version
+            await tasks_collection.insert_many(inserts, ordered=False)
+        writes = [
+            UpdateOne({"_id": ObjectId(task_id)}, {"$set": {**changes, "seq": version}})
+            for task_id, changes in updates.items() if task_id in current
+        ] + [DeleteOne({"_id": ObjectId(task_id)}) for task_id in deleted]
+        if writes:
+            await tasks_collection.bulk_write(writes, ordered=False)
+        await record_tombstones(board_id, deleted, version)
+    
+    await apply_task_changes(board_id, stats_changes)
+    await index_tasks(board_id, inserts + [
+        current[task_id] for task_id, changes in updates.items()
+        if task_id in current and ("title" in changes or "description" in changes)
+    ])
+    await unindex_tasks(board_id, deleted)
+    if deleted:
+        await delete_attachments({"task_id": {"$in": deleted}})
+    await log_activities([
+        {"user_id": current_user["id"], "username": current_user["username"], "entity_type": "task", **entry}
+        for entry in activities
+    ])
+    await publish_bulk_task_event(board_id, version, events, current_user)
+    
+    return TaskBulkResponse(version=version, results=results)
+
+@router.get("/boards/{board_id}/tasks", response_model=List[TaskResponse] | TaskDelta,
+            dependencies=[Depends(etag("boards", "board:{board_id}"))])
+async def get_board_tasks(
     board_id: str,
+    response: Response,
+    since: Optional[int] = Query(None, ge=0, description="Only return changes after this board version"),
+    page: PageParams = Depends(),
     current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.TEAM_MANAGER]))
 ):
-    """Team Manager/Admin: Get all tasks for a board"""
+    """Team Manager/Admin: Get all tasks for a board, or the changes since a version"""
     # Verify board access
-    verify_board_access(board_id, current_user)
+    board = await verify_board_access(board_id, current_user)
+    if since is not None:
+        return await board_tasks_since(board, since, response)
+    response.headers["X-Board-Version"] = str(committed_version(board))
     
-    tasks = list(tasks_collection.find({"board_id": board_id}))
-    return [
-        TaskResponse(
-            id=str(task["_id"]),
-            title=task["title"],
-            description=task.get("description"),
-            board_id=task["board_id"],
-            assigned_to=task.get("assigned_to"),
-            status=task["status"],
-            priority=task["priority"],
-            due_date=task.get("due_date"),
-            created_by=task["created_by"],
-            created_at=task["created_at"],
-            updated_at=task["updated_at"]
-        )
-        for task in tasks
-    ]
+    return await paginate(tasks_collection, {"board_id": board_id}, page, response, task_row)
 
 @router.put("/tasks/{task_id}", response_model=TaskResponse)
-def update_task(
+async def update_task(
     task_id: str,
     task_update: TaskUpdate,
     current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.TEAM_MANAGER]))
 ):
     """Team Manager/Admin: Update a task"""
-    task = tasks_collection.find_one({"_id": ObjectId(task_id)})
+    task = await tasks_collection.find_one({"_id": ObjectId(task_id)})
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -147,7 +248,7 @@ def update_task(
         )
     
     # Verify board access
-    verify_board_access(task["board_id"], current_user)
+    members = await check_board_access(task["board_id"], current_user)
     
     update_data = {"updated_at": datetime.utcnow()}
     
@@ -164,20 +265,28 @@ def update_task(
     if task_update.assigned_to is not None:
         # Verify assigned user exists and has access
         if task_update.assigned_to:
-            board = boards_collection.find_one({"_id": ObjectId(task["board_id"])})
-            if task_update.assigned_to not in board.get("member_ids", []):
+            if task_update.assigned_to not in members:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Assigned user is not a member of this board"
                 )
         update_data["assigned_to"] = task_update.assigned_to
     
-    tasks_collection.update_one(
-        {"_id": ObjectId(task_id)},
-        {"$set": update_data}
-    )
+    async with board_version(task["board_id"]) as version:
+        before = await tasks_collection.find_one_and_update(
+            {"_id": ObjectId(task_id)},
+            {"$set": {**update_data, "seq": version}}
+        )
+        if not before:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Task not found"
+            )
+    await apply_task_change(task["board_id"], before, {**before, **update_data})
+    if "title" in update_data or "description" in update_data:
+        await index_tasks(task["board_id"], [{**before, **update_data}])
     
-    log_activity(
+    await log_activity(
         user_id=current_user["id"],
         username=current_user["username"],
         action="updated_task",
@@ -186,8 +295,10 @@ def update_task(
         details=f"Updated task details"
     )
     
+    await publish_task_event(task["board_id"], version, "updated", task_id, current_user, update_data)
+    
     # Fetch updated task
-    updated_task = tasks_collection.find_one({"_id": ObjectId(task_id)})
+    updated_task = await tasks_collection.find_one({"_id": ObjectId(task_id)})
     
     return TaskResponse(
         id=str(updated_task["_id"]),
@@ -204,12 +315,12 @@ def update_task(
     )
 
 @router.delete("/tasks/{task_id}")
-def delete_task(
+async def delete_task(
     task_id: str,
     current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.TEAM_MANAGER]))
 ):
     """Team Manager/Admin: Delete a task"""
-    task = tasks_collection.find_one({"_id": ObjectId(task_id)})
+    task = await tasks_collection.find_one({"_id": ObjectId(task_id)})
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -217,11 +328,23 @@ def delete_task(
         )
     
     # Verify board access
-    verify_board_access(task["board_id"], current_user)
+    await check_board_access(task["board_id"], current_user)
     
-    tasks_collection.delete_one({"_id": ObjectId(task_id)})
+    async with board_version(task["board_id"]) as version:
+        deleted = await tasks_collection.find_one_and_delete({"_id": ObjectId(task_id)})
+        if not deleted:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Task not found"
+            )
+        # The tombstone is the delete's record for delta sync, so it lands before the version commits
+        await record_tombstone(task["board_id"], task_id, version)
+    await apply_task_change(task["board_id"], deleted, None)
+    await unindex_tasks(task["board_id"], [task_id])
+    await delete_attachments({"task_id": task_id})
+    await publish_task_event(task["board_id"], version, "deleted", task_id, current_user)
     
-    log_activity(
+    await log_activity(
         user_id=current_user["id"],
         username=current_user["username"],
         action="deleted_task",
@@ -233,13 +356,13 @@ def delete_task(
     return {"message": "Task deleted successfully"}
 
 @router.put("/tasks/{task_id}/assign")
-def assign_task(
+async def assign_task(
     task_id: str,
     payload: TaskAssignPayload,
     current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.TEAM_MANAGER]))
 ):
     """Team Manager/Admin: Assign a task to a user"""
-    task = tasks_collection.find_one({"_id": ObjectId(task_id)})
+    task = await tasks_collection.find_one({"_id": ObjectId(task_id)})
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -247,22 +370,31 @@ def assign_task(
         )
     
     # Verify board access
-    board = verify_board_access(task["board_id"], current_user)
+    members = await check_board_access(task["board_id"], current_user)
     
     # Verify user exists and has access to the board
     user_id = payload.user_id
-    if user_id not in board.get("member_ids", []):
+    if user_id not in members:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User is not a member of this board"
         )
     
-    tasks_collection.update_one(
-        {"_id": ObjectId(task_id)},
-        {"$set": {"assigned_to": user_id, "updated_at": datetime.utcnow()}}
-    )
+    changes = {"assigned_to": user_id, "updated_at": datetime.utcnow()}
+    async with board_version(task["board_id"]) as version:
+        before = await tasks_collection.find_one_and_update(
+            {"_id": ObjectId(task_id)},
+            {"$set": {**changes, "seq": version}}
+        )
+        if not before:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Task not found"
+            )
+    await apply_task_change(task["board_id"], before, {**before, **changes})
+    await publish_task_event(task["board_id"], version, "updated", task_id, current_user, changes)
     
-    log_activity(
+    await log_activity(
         user_id=current_user["id"],
         username=current_user["username"],
         action="assigned_task",
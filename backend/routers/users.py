@@ -1,27 +1,21 @@
 # backend/routers/users.py
 from fastapi import APIRouter
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from bson import ObjectId
 from backend.database import users_collection
 from backend.models import UserResponse, UserUpdate
-from backend.routers.auth import get_current_user, hash_password
+from backend.pagination import PageParams, paginate
+from backend.serializers import user_row
+from backend.routers.auth import get_current_user, hash_password, invalidate_principal
 
 router = APIRouter()
 
 @router.get("/", response_model=list[UserResponse])
-async def get_all_users():
-    users = list(users_collection.find({}, {"password": 0}))
-    return [
-        UserResponse(
-            id=str(user["_id"]),
-            username=user["username"],
-            email=user["email"],
-            role=user["role"],
-            avatar_url=user.get("avatar_url"),
-            created_at=user["created_at"]
-        )
-        for user in users
-    ]
+async def get_all_users(response: Response, page: PageParams = Depends()):
+    return await paginate(
+        users_collection, {}, page, response, user_row,
+        projection={"password": 0}
+    )
 
 @router.put("/me", response_model=UserResponse)
 async def update_my_profile(
@@ -35,7 +29,7 @@ async def update_my_profile(
         update_data["avatar_url"] = payload.avatar_url
         
     if payload.password:
-        update_data["password"] = hash_password(payload.password)
+        update_data["password"] = await hash_password(payload.password)
         
     if not update_data:
         raise HTTPException(
@@ -43,13 +37,14 @@ async def update_my_profile(
             detail="No data to update"
         )
         
-    users_collection.update_one(
+    await users_collection.update_one(
         {"_id": ObjectId(current_user["id"])},
         {"$set": update_data}
     )
+    await invalidate_principal(current_user["id"])
     
     # Fetch updated user
-    updated_user = users_collection.find_one({"_id": ObjectId(current_user["id"])})
+    updated_user = await users_collection.find_one({"_id": ObjectId(current_user["id"])})
     
     return UserResponse(
         id=str(updated_user["_id"]),
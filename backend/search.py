@@ -0,0 +1,575 @@
+# backend/search.py
+"""
+Full-text search over task titles, descriptions and comments.
+
+Every worker keeps an inverted index per board, built from the database the
+first time the board is searched and kept current by the task and comment
+write paths, which publish their changes on the pub/sub bus (so every worker,
+including the writer, applies them). Text is split into casefolded words;
+title words count SEARCH_TITLE_WEIGHT times. Results are ranked with BM25,
+using the document counts, lengths and word frequencies of all the boards
+searched together so scores from different boards compare; every word of
+the query must match, and the last word also matches as a prefix (search as
+you type) unless the query ends with a space.
+
+A query builds at most SEARCH_MAX_LOADS_PER_QUERY board indexes itself; the
+remaining boards are loaded in the background, one at a time, and reported
+as pending so the caller can ask again.
+
+A board's index is append-only: a changed document gets a new ordinal and
+its old one is marked dead, so postings stay sorted by ordinal and can be
+intersected with binary search. Dead ordinals are compacted away once they
+make up SEARCH_COMPACT_RATIO of the board. Indexes are evicted least
+recently searched first when more than SEARCH_MAX_DOCUMENTS are held.
+
+With SEARCH_BACKEND=mongo (and a real MongoDB) queries go to MongoDB text
+indexes instead; those rank by MongoDB's text score and have no prefix
+matching.
+"""
+import asyncio
+import heapq
+import math
+import os
+import re
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from bson import ObjectId
+
+from backend import metrics
+from backend.database import comments_collection, tasks_collection, use_mock
+from backend.pubsub import bus
+
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "memory")
+SEARCH_TITLE_WEIGHT = int(os.getenv("SEARCH_TITLE_WEIGHT", "2"))
+SEARCH_MAX_DOCUMENTS = int(os.getenv("SEARCH_MAX_DOCUMENTS", "2000000"))
+SEARCH_COMPACT_RATIO = float(os.getenv("SEARCH_COMPACT_RATIO", "0.25"))
+# A prefix matches at most this many words (in alphabetical order) and needs this many characters
+SEARCH_MAX_EXPANSIONS = int(os.getenv("SEARCH_MAX_EXPANSIONS", "64"))
+SEARCH_MIN_PREFIX = int(os.getenv("SEARCH_MIN_PREFIX", "2"))
+# Board indexes a single query builds before it answers from the boards it has
+SEARCH_MAX_LOADS_PER_QUERY = int(os.getenv("SEARCH_MAX_LOADS_PER_QUERY", "4"))
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_TOKEN_LENGTH = 40
+SNIPPET_LENGTH = 200
+
+use_mongo_text = SEARCH_BACKEND == "mongo" and not use_mock
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+def tokenize(text: str | None) -> List[str]:
+    return [token[:MAX_TOKEN_LENGTH] for token in _TOKEN.findall(text.casefold())] if text else []
+
+def parse_query(q: str) -> List[Tuple[str, bool]]:
+    """(word, match as prefix) pairs of a query, without repeats"""
+    words = list(dict.fromkeys(tokenize(q)))
+    if not words:
+        return []
+    last_is_prefix = not q[-1].isspace() and len(words[-1]) >= SEARCH_MIN_PREFIX
+    return [(word, last_is_prefix and i == len(words) - 1) for i, word in enumerate(words)]
+
+def task_key(task_id: str) -> str:
+    return f"t:{task_id}"
+
+def comment_key(comment_id: str) -> str:
+    return f"c:{comment_id}"
+
+# -----------------------
+# Per-board index
+# -----------------------
+class BoardIndex:
+    """Inverted index of one board's tasks and comments"""
+    def __init__(self):
+        # Per ordinal: document key ("t:<task id>" / "c:<comment id>"), task id, weighted length, live flag
+        self.keys: List[str] = []
+        self.tasks: List[str] = []
+        self.lengths = array("I")
+        self.live = bytearray()
+        self.total_length = 0
+        self.dead = 0
+        # Live ordinal of each key, and the live keys of each task (the task and its comments)
+        self.ordinals: Dict[str, int] = {}
+        self.task_keys: Dict[str, Set[str]] = {}
+        # Live document frequencies computed since the last change (see _df)
+        self._df_cache: Dict[str, int] = {}
+        # word -> (ordinals, term frequencies), ordinals ascending
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        # Sorted words for prefix lookups; words added since the last sort wait in _new_words
+        self._vocabulary: List[str] = []
+        self._new_words: List[str] = []
+
+    @classmethod
+    def build(cls, tasks: Iterable[Dict[str, Any]], comments: Iterable[Dict[str, Any]]) -> "BoardIndex":
+        index = cls()
+        for task in tasks:
+            task_id = str(task["_id"])
+            index.put(task_key(task_id), task_id, task.get("title"), task.get("description"))
+        for comment in comments:
+            index.put(comment_key(str(comment["_id"])), comment["task_id"], None, comment.get("content"))
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    def put(self, key: str, task_id: str, title: str | None, body: str | None):
+        """Add or replace a document"""
+        self.remove(key)
+        counts = Counter(tokenize(body))
+        for word in tokenize(title):
+            counts[word] += SEARCH_TITLE_WEIGHT
+        ordinal = len(self.keys)
+        length = sum(counts.values())
+        self.keys.append(key)
+        self.tasks.append(task_id)
+        self.lengths.append(length)
+        self.live.append(1)
+        self.total_length += length
+        self.ordinals[key] = ordinal
+        self.task_keys.setdefault(task_id, set()).add(key)
+        if self._df_cache:
+            self._df_cache.clear()
+        for word, tf in counts.items():
+            posting = self.postings.get(word)
+            if posting is None:
+                posting = self.postings[word] = (array("I"), array("H"))
+                self._new_words.append(word)
+            posting[0].append(ordinal)
+            posting[1].append(min(tf, 0xFFFF))
+
+    def remove(self, key: str):
+        ordinal = self.ordinals.pop(key, None)
+        if ordinal is not None:
+            self.live[ordinal] = 0
+            self.dead += 1
+            self.total_length -= self.lengths[ordinal]
+            keys = self.task_keys[self.tasks[ordinal]]
+            keys.discard(key)
+            if not keys:
+                del self.task_keys[self.tasks[ordinal]]
+            if self._df_cache:
+                self._df_cache.clear()
+
+    def remove_tasks(self, task_ids: Set[str]):
+        """Remove tasks together with their comments"""
+        for task_id in task_ids:
+            for key in list(self.task_keys.get(task_id, ())):
+                self.remove(key)
+
+    def _df(self, word: str) -> int:
+        """Live documents containing `word` (postings keep dead ordinals until compaction)"""
+        ordinals = self.postings[word][0]
+        if not self.dead:
+            return len(ordinals)
+        df = self._df_cache.get(word)
+        if df is None:
+            live = self.live
+            df = self._df_cache[word] = sum(live[ordinal] for ordinal in ordinals)
+        return df
+
+    def apply(self, change: Dict[str, Any]):
+        """Apply a change message (see publish_change)"""
+        for key in change.get("drop", ()):
+            self.remove(key)
+        if change.get("drop_tasks"):
+            self.remove_tasks(set(change["drop_tasks"]))
+        for key, task_id, title, body in change.get("put", ()):
+            self.put(key, task_id, title, body)
+        if self.dead > 64 and self.dead >= SEARCH_COMPACT_RATIO * len(self.keys):
+            self.compact()
+
+    def compact(self):
+        """Drop dead ordinals and renumber the live ones (keeping their order)"""
+        remap = array("i", [-1]) * len(self.keys)
+        keys, tasks, lengths = [], [], array("I")
+        for ordinal, alive in enumerate(self.live):
+            if alive:
+                remap[ordinal] = len(keys)
+                keys.append(self.keys[ordinal])
+                tasks.append(self.tasks[ordinal])
+                lengths.append(self.lengths[ordinal])
+        postings = {}
+        for word, (ordinals, tfs) in self.postings.items():
+            kept_ordinals, kept_tfs = array("I"), array("H")
+            for ordinal, tf in zip(ordinals, tfs):
+                new = remap[ordinal]
+                if new >= 0:
+                    kept_ordinals.append(new)
+                    kept_tfs.append(tf)
+            if kept_ordinals:
+                postings[word] = (kept_ordinals, kept_tfs)
+        self.keys, self.tasks, self.lengths = keys, tasks, lengths
+        self.live = bytearray(b"\x01") * len(keys)
+        self.total_length = sum(lengths)
+        self.dead = 0
+        self._df_cache = {}
+        self.ordinals = {key: ordinal for ordinal, key in enumerate(keys)}
+        self.postings = postings
+        self._vocabulary = sorted(postings)
+        self._new_words = []
+
+    def _expand(self, word: str, prefix: bool) -> List[str]:
+        if not prefix:
+            return [word] if word in self.postings else []
+        if self._new_words:
+            self._vocabulary += self._new_words
+            self._vocabulary.sort()
+            self._new_words = []
+        vocabulary = self._vocabulary
+        words = []
+        i = bisect_left(vocabulary, word)
+        while i < len(vocabulary) and vocabulary[i].startswith(word) and len(words) < SEARCH_MAX_EXPANSIONS:
+            if vocabulary[i] in self.postings:  # not yet compacted away
+                words.append(vocabulary[i])
+            i += 1
+        return words
+
+    def statistics(self, terms: List[Tuple[str, bool]]) -> Tuple[int, int, Counter]:
+        """Document count, total length and document frequency of every word the terms expand to"""
+        df = Counter()
+        for word, prefix in terms:
+            for w in self._expand(word, prefix):
+                df[w] += self._df(w)
+        return len(self.ordinals), self.total_length, df
+
+    def search(
+        self, terms: List[Tuple[str, bool]], limit: int, stats: Tuple[int, int, Counter] | None = None
+    ) -> List[Tuple[float, str, str]]:
+        """
+        Best `limit` (score, key, task id) matching every term. `stats` are
+        corpus statistics (see statistics()) to score against instead of this
+        board's own, e.g. summed over several boards.
+        """
+        if not self.ordinals or not terms:
+            return []
+        n, total_length, dfs = stats if stats is not None else (len(self.ordinals), self.total_length, None)
+        k1 = BM25_K1
+        norm = k1 * BM25_B * n / total_length if total_length else 0.0
+        base = k1 * (1 - BM25_B)
+        lengths, live = self.lengths, self.live
+
+        groups = []
+        for word, prefix in terms:
+            words = self._expand(word, prefix)
+            if not words:
+                return []
+            group = []
+            for w in words:
+                ordinals, tfs = self.postings[w]
+                df = dfs[w] if dfs is not None else self._df(w)
+                group.append((ordinals, tfs, math.log(1 + (n - df + 0.5) / (df + 0.5))))
+            groups.append((sum(len(g[0]) for g in group), group))
+        # Rarest term first: it bounds the candidates the others are checked against
+        groups.sort(key=itemgetter(0))
+
+        scores: Dict[int, float] | None = None
+        for size, group in groups:
+            found: Dict[int, float] = {}
+            if scores is None and len(group) == 1:
+                # The rarest term, a single word: every live posting is a candidate
+                ordinals, tfs, idf = group[0]
+                weight = idf * (k1 + 1)
+                for ordinal, tf in zip(ordinals, tfs):
+                    if live[ordinal]:
+                        found[ordinal] = weight * tf / (tf + base + norm * lengths[ordinal])
+            elif scores is None or size < 8 * len(scores):
+                # Walk the postings
+                for ordinals, tfs, idf in group:
+                    for ordinal, tf in zip(ordinals, tfs):
+                        if live[ordinal] and (scores is None or ordinal in scores):
+                            s = idf * tf * (k1 + 1) / (tf + base + norm * lengths[ordinal])
+                            if s > found.get(ordinal, 0.0):
+                                found[ordinal] = s
+            else:
+                # Few candidates against long postings: binary-search each candidate
+                for ordinal in scores:
+                    for ordinals, tfs, idf in group:
+                        i = bisect_left(ordinals, ordinal)
+                        if i < len(ordinals) and ordinals[i] == ordinal:
+                            tf = tfs[i]
+                            s = idf * tf * (k1 + 1) / (tf + base + norm * lengths[ordinal])
+                            if s > found.get(ordinal, 0.0):
+                                found[ordinal] = s
+            # A prefix scores as its best-matching word; terms add up
+            scores = found if scores is None else {ordinal: scores[ordinal] + s for ordinal, s in found.items()}
+            if not scores:
+                return []
+        best = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+        return [(score, self.keys[ordinal], self.tasks[ordinal]) for ordinal, score in best]
+
+# -----------------------
+# Board indexes of this worker
+# -----------------------
+class SearchIndex:
+    def __init__(self, max_documents: int = SEARCH_MAX_DOCUMENTS):
+        self.max_documents = max_documents
+        self.boards: "OrderedDict[str, BoardIndex]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        # Changes that arrive while a board is being loaded, applied on top of it
+        self._backlog: Dict[str, List[Dict[str, Any]]] = {}
+        # Boards queries skipped, loaded one at a time by _warmer
+        self._to_warm: "OrderedDict[str, None]" = OrderedDict()
+        self._warmer: asyncio.Task | None = None
+        self.queries = metrics.counter("search.queries")
+        self.latency = metrics.summary("search.latency_ms")
+        self.loads = metrics.counter("search.board_loads")
+        self.evictions = metrics.counter("search.board_evictions")
+        self.documents = metrics.gauge("search.documents")
+
+    async def board(self, board_id: str) -> BoardIndex:
+        """A board's index, loading it from the database if this worker has none"""
+        index = self.boards.get(board_id)
+        if index is not None:
+            self.boards.move_to_end(board_id)
+            return index
+        loading = self._loading.get(board_id)
+        if loading is not None:
+            return await asyncio.shield(loading)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[board_id] = future
+        self._backlog[board_id] = []
+        try:
+            index = await self._load(board_id)
+            for change in self._backlog[board_id]:
+                index.apply(change)
+            self.boards[board_id] = index
+            self.loads.inc()
+            self._evict()
+            future.set_result(index)
+            return index
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # retrieved: waiters (if any) re-raise it
+            raise
+        finally:
+            del self._loading[board_id]
+            del self._backlog[board_id]
+
+    async def _load(self, board_id: str) -> BoardIndex:
+        tasks = await tasks_collection.find({"board_id": board_id}, {"title": 1, "description": 1}).to_list(None)
+        task_ids = [str(task["_id"]) for task in tasks]
+        comments = []
+        for start in range(0, len(task_ids), 10000):
+            comments += await comments_collection.find(
+                {"task_id": {"$in": task_ids[start:start + 10000]}}, {"task_id": 1, "content": 1}
+            ).to_list(None)
+        # Tokenizing a large board takes a while; the index is not shared until it is done
+        return await asyncio.get_running_loop().run_in_executor(None, BoardIndex.build, tasks, comments)
+
+    def _evict(self):
+        total = sum(len(index) for index in self.boards.values())
+        while total > self.max_documents and len(self.boards) > 1:
+            _, index = self.boards.popitem(last=False)
+            total -= len(index)
+            self.evictions.inc()
+        self.documents.set(total)
+
+    def apply(self, change: Dict[str, Any]):
+        board_id = change["board"]
+        if change.get("forget"):
+            self.boards.pop(board_id, None)
+            return
+        if board_id in self._backlog:
+            self._backlog[board_id].append(change)
+            return
+        index = self.boards.get(board_id)
+        if index is not None:
+            index.apply(change)
+
+    def _warm_later(self, board_ids: List[str]):
+        for board_id in board_ids:
+            self._to_warm[board_id] = None
+        if self._warmer is None or self._warmer.done():
+            self._warmer = asyncio.create_task(self._warm())
+
+    async def _warm(self):
+        while self._to_warm:
+            board_id, _ = self._to_warm.popitem(last=False)
+            try:
+                await self.board(board_id)
+            except Exception as e:
+                print(f"[ERROR] search: loading board {board_id} failed: {e}")
+
+    async def query(self, q: str, board_ids: List[str], limit: int) -> Tuple[List[Tuple[float, str, str, str]], List[str]]:
+        """
+        Best `limit` (score, board id, key, task id) over the given boards, and
+        the boards left out because their index is still being loaded
+        """
+        terms = parse_query(q)
+        if not terms:
+            return [], []
+        started = time.perf_counter()
+        missing = [board_id for board_id in board_ids if board_id not in self.boards]
+        pending = missing[SEARCH_MAX_LOADS_PER_QUERY:]
+        if pending:
+            self._warm_later(pending)
+            skipped = set(pending)
+            board_ids = [board_id for board_id in board_ids if board_id not in skipped]
+        indexes = [(board_id, await self.board(board_id)) for board_id in board_ids]
+        stats = None
+        if len(indexes) > 1:
+            # Score every board against the combined corpus, so scores compare across boards
+            n, total_length, df = 0, 0, Counter()
+            for _, index in indexes:
+                board_n, board_length, board_df = index.statistics(terms)
+                n += board_n
+                total_length += board_length
+                df.update(board_df)
+            stats = (n, total_length, df)
+        hits = []
+        for board_id, index in indexes:
+            hits += [(score, board_id, key, task_id) for score, key, task_id in index.search(terms, limit, stats)]
+        self.queries.inc()
+        self.latency.observe((time.perf_counter() - started) * 1000)
+        return heapq.nlargest(limit, hits), pending
+
+search_index = SearchIndex()
+
+async def _on_change(channel: str, change: dict, origin: str):
+    search_index.apply(change)
+
+bus.subscribe("search.index", _on_change)
+
+# -----------------------
+# Write paths
+# -----------------------
+async def publish_change(board_id: str, **change):
+    """
+    Send an index change to every worker: `put` [key, task id, title, body]
+    entries, `drop` keys, `drop_tasks` task ids (with their comments) or
+    `forget` (the board is gone).
+    """
+    if use_mongo_text:
+        return  # MongoDB maintains its text indexes itself
+    await bus.publish("search.index", {"board": board_id, **change})
+
+async def index_tasks(board_id: str, tasks: Iterable[Dict[str, Any]]):
+    """(Re)index tasks; each needs _id, title and description"""
+    put = [[task_key(str(task["_id"])), str(task["_id"]), task.get("title"), task.get("description")] for task in tasks]
+    if put:
+        await publish_change(board_id, put=put)
+
+async def unindex_tasks(board_id: str, task_ids: List[str]):
+    if task_ids:
+        await publish_change(board_id, drop_tasks=list(task_ids))
+
+async def index_comment(board_id: str, comment: Dict[str, Any]):
+    await publish_change(board_id, put=[[comment_key(str(comment["_id"])), comment["task_id"], None, comment.get("content")]])
+
+async def unindex_comment(board_id: str, comment_id: str):
+    await publish_change(board_id, drop=[comment_key(comment_id)])
+
+async def forget_board(board_id: str):
+    await publish_change(board_id, forget=True)
+
+# -----------------------
+# Queries
+# -----------------------
+def _snippet(text: str | None, words: List[str]) -> str | None:
+    """About SNIPPET_LENGTH characters of `text` around the first query word in it"""
+    if not text:
+        return None
+    lowered = text.lower()
+    found = [i for i in (lowered.find(word) for word in words) if i >= 0]
+    start = max(0, min(found, default=0) - SNIPPET_LENGTH // 4)
+    end = start + SNIPPET_LENGTH
+    snippet = text[start:end].strip()
+    return ("…" if start else "") + snippet + ("…" if end < len(text) else "")
+
+async def _hits(ranked: List[Tuple[float, str, str]], words: List[str]) -> List[Dict[str, Any]]:
+    """SearchHit rows for (score, key, task id) results, skipping documents deleted meanwhile"""
+    task_ids = {task_id for _, _, task_id in ranked if ObjectId.is_valid(task_id)}
+    comment_ids = [ObjectId(key[2:]) for _, key, _ in ranked if key.startswith("c:")]
+    tasks = {
+        str(task["_id"]): task for task in await tasks_collection.find(
+            {"_id": {"$in": [ObjectId(task_id) for task_id in task_ids]}}, {"title": 1, "description": 1, "board_id": 1}
+        ).to_list(None)
+    } if task_ids else {}
+    comments = {
+        str(comment["_id"]): comment for comment in await comments_collection.find(
+            {"_id": {"$in": comment_ids}}, {"content": 1}
+        ).to_list(None)
+    } if comment_ids else {}
+
+    hits = []
+    for score, key, task_id in ranked:
+        task = tasks.get(task_id)
+        if task is None:
+            continue
+        if key.startswith("t:"):
+            kind, doc_id, text = "task", task_id, task.get("description")
+        else:
+            kind, doc_id = "comment", key[2:]
+            if doc_id not in comments:
+                continue
+            text = comments[doc_id].get("content")
+        hits.append({
+            "type": kind,
+            "id": doc_id,
+            "task_id": task_id,
+            "board_id": task["board_id"],
+            "title": task["title"],
+            "snippet": _snippet(text, words),
+            "score": round(score, 4),
+        })
+    return hits
+
+async def search(q: str, board_ids: List[str], limit: int = 20) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Best matches for `q` among the tasks and comments of the given boards, as
+    SearchHit rows, and how many boards were not searched yet (still loading)
+    """
+    if not board_ids:
+        return [], 0
+    words = [word for word, _ in parse_query(q)]
+    pending: List[str] = []
+    if use_mongo_text:
+        ranked = await _mongo_search(q, board_ids, limit)
+    else:
+        found, pending = await search_index.query(q, board_ids, limit)
+        ranked = [(score, key, task_id) for score, _, key, task_id in found]
+    return await _hits(ranked, words), len(pending)
+
+# -----------------------
+# MongoDB text indexes (SEARCH_BACKEND=mongo)
+# -----------------------
+async def ensure_text_indexes():
+    if not use_mongo_text:
+        return
+    await tasks_collection.create_index(
+        [("title", "text"), ("description", "text")], weights={"title": SEARCH_TITLE_WEIGHT}, name="search_text"
+    )
+    await comments_collection.create_index([("content", "text")], name="search_text")
+
+async def _mongo_search(q: str, board_ids: List[str], limit: int) -> List[Tuple[float, str, str]]:
+    tasks = await tasks_collection.find(
+        {"$text": {"$search": q}, "board_id": {"$in": board_ids}},
+        {"score": {"$meta": "textScore"}}
+    ).sort([("score", {"$meta": "textScore"})]).limit(limit).to_list(None)
+    # Comments carry no board id: join their tasks and keep those on the given boards before ranking,
+    # so matches on other boards cannot crowd out the caller's
+    cursor = await comments_collection.aggregate([
+        {"$match": {"$text": {"$search": q}}},
+        {"$lookup": {
+            "from": tasks_collection.name,
+            "let": {"task_id": {"$toObjectId": "$task_id"}},
+            "pipeline": [{"$match": {"$expr": {"$eq": ["$_id", "$$task_id"]}}}, {"$project": {"board_id": 1}}],
+            "as": "task",
+        }},
+        {"$match": {"task.board_id": {"$in": board_ids}}},
+        {"$sort": {"score": {"$meta": "textScore"}}},
+        {"$limit": limit},
+        {"$project": {"task_id": 1, "score": {"$meta": "textScore"}}},
+    ])
+    comments = await cursor.to_list(None)
+    ranked = [(task["score"], task_key(str(task["_id"])), str(task["_id"])) for task in tasks]
+    ranked += [(comment["score"], comment_key(str(comment["_id"])), comment["task_id"]) for comment in comments]
+    return heapq.nlargest(limit, ranked, key=itemgetter(0))
@@ -0,0 +1,191 @@
+# backend/serializers.py
+"""
+Document-to-JSON serializers for the list endpoints.
+
+Building a Pydantic response model per row and letting FastAPI validate and
+serialize it again dominates the cost of large lists. A ``RowSerializer``
+instead maps a stored document straight to a dict of JSON-ready values with
+one getter per response field, and ``json_response`` encodes the whole list
+with orjson in one call. Each serializer is declared against its response
+model and refuses to build if the two disagree on field names, so the
+OpenAPI schema (still declared via ``response_model``) stays accurate.
+"""
+import json
+from datetime import datetime
+from enum import Enum
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Type
+
+from fastapi import Response
+from pydantic import BaseModel
+
+from backend.models import (
+    ActivityLogResponse, AttachmentResponse, BoardResponse, CommentResponse, TaskResponse, TeamResponse, UserResponse
+)
+
+try:
+    import orjson
+except ImportError:  # optional speedup; fall back to the stdlib encoder
+    orjson = None
+
+Getter = Callable[[Dict[str, Any]], Any]
+
+# -----------------------
+# Encoding
+# -----------------------
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+def json_response(content: Any, headers: Dict[str, str] | None = None) -> Response:
+    """A JSON response whose body is already encoded (bypasses response_model validation)"""
+    return Response(content=dumps(content), media_type="application/json", headers=headers)
+
+# -----------------------
+# Field getters
+# -----------------------
+def object_id(doc: Dict[str, Any]) -> str:
+    return str(doc["_id"])
+
+def required(key: str) -> Getter:
+    return itemgetter(key)
+
+def optional(key: str, default: Any = None) -> Getter:
+    return lambda doc: doc.get(key, default)
+
+def optional_factory(key: str, factory: Callable[[], Any]) -> Getter:
+    def get(doc):
+        value = doc.get(key)
+        return factory() if value is None else value
+    return get
+
+def attachment_url(doc: Dict[str, Any]) -> str:
+    """Where an attachment is downloaded (tasks.download_attachment), built from the id alone"""
+    return f"/tasks/attachments/{doc['_id']}/download"
+
+def attachment_thumbnail_url(doc: Dict[str, Any]) -> str | None:
+    """Where its thumbnail is (tasks.attachment_thumbnail), once one has been rendered"""
+    return f"/tasks/attachments/{doc['_id']}/thumbnail" if doc.get("thumbnails") else None
+
+class RowSerializer:
+    def __init__(self, model: Type[BaseModel], sources: Dict[str, Tuple[str, ...]] | None = None, **getters: Getter):
+        """`sources` names the stored fields a response field is computed from, where they differ"""
+        missing = set(model.model_fields) - set(getters)
+        extra = set(getters) - set(model.model_fields)
+        if missing or extra:
+            raise ValueError(f"{model.__name__} serializer mismatch: missing={sorted(missing)} extra={sorted(extra)}")
+        self.model = model
+        self.sources = sources or {}
+        self.getters = getters
+        self._items = list(getters.items())
+
+    def __call__(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: get(doc) for name, get in self._items}
+
+    def many(self, docs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        items = self._items
+        return [{name: get(doc) for name, get in items} for doc in docs]
+
+    def partial(self, doc: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+        """Only `fields`, for ?fields= requests whose query projected the rest away"""
+        row = {}
+        for name in fields:
+            try:
+                row[name] = self.getters[name](doc)
+            except KeyError:
+                continue
+        return row
+
+# -----------------------
+# Serializers
+# -----------------------
+task_row = RowSerializer(
+    TaskResponse,
+    id=object_id,
+    title=required("title"),
+    description=optional("description"),
+    board_id=required("board_id"),
+    assigned_to=optional("assigned_to"),
+    status=required("status"),
+    priority=required("priority"),
+    due_date=optional("due_date"),
+    created_by=required("created_by"),
+    created_at=required("created_at"),
+    updated_at=required("updated_at"),
+)
+
+comment_row = RowSerializer(
+    CommentResponse,
+    id=object_id,
+    task_id=required("task_id"),
+    user_id=required("user_id"),
+    username=required("username"),
+    avatar_url=optional("avatar_url"),
+    content=required("content"),
+    created_at=required("created_at"),
+)
+
+attachment_row = RowSerializer(
+    AttachmentResponse,
+    sources={"file_path": (), "thumbnail_path": ("thumbnails",)},
+    id=object_id,
+    task_id=required("task_id"),
+    user_id=required("user_id"),
+    username=required("username"),
+    filename=required("filename"),
+    file_path=attachment_url,
+    file_type=required("file_type"),
+    file_size=required("file_size"),
+    thumbnail_path=attachment_thumbnail_url,
+    created_at=required("created_at"),
+)
+
+user_row = RowSerializer(
+    UserResponse,
+    id=object_id,
+    username=required("username"),
+    email=required("email"),
+    role=optional("role", "team_member"),
+    avatar_url=optional("avatar_url"),
+    created_at=optional_factory("created_at", datetime.utcnow),
+)
+
+team_row = RowSerializer(
+    TeamResponse,
+    id=object_id,
+    name=required("name"),
+    description=optional("description"),
+    created_by=required("created_by"),
+    created_at=required("created_at"),
+)
+
+board_row = RowSerializer(
+    BoardResponse,
+    id=object_id,
+    name=required("name"),
+    description=optional("description"),
+    team_id=required("team_id"),
+    member_ids=optional("member_ids", []),
+    created_by=required("created_by"),
+    created_at=required("created_at"),
+)
+
+activity_row = RowSerializer(
+    ActivityLogResponse,
+    id=object_id,
+    user_id=required("user_id"),
+    username=required("username"),
+    action=required("action"),
+    entity_type=required("entity_type"),
+    entity_id=required("entity_id"),
+    details=optional("details"),
+    created_at=required("created_at"),
+)
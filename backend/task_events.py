@@ -0,0 +1,173 @@
+# backend/task_events.py
+"""
+Per-board task change log: server-pushed events and delta sync.
+
+Every task mutation takes the next value of the board's ``version`` counter,
+stores it on the task as ``seq`` (or on a tombstone, for deletes) and
+broadcasts a small ``task_event`` frame (op, task id, changed fields, new
+version) to the board's sockets, so clients patch their task list in place.
+Clients that were away ask for ``?since=<version>`` and get only the tasks
+changed after it plus the ids deleted since; a client that sees a version
+gap, or a ``since`` older than the compacted tombstones, gets a full list.
+
+A version is allocated before its write lands, so the board also lists the
+versions still being written (``pending_versions``). Readers only report the
+committed version: the highest one below every pending version, so a client
+that resumes from it cannot skip a write that was still in flight. A write
+that fails after taking a version broadcasts a "skipped" event for it, so
+clients' counters stay contiguous.
+"""
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List
+
+from bson import ObjectId
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+from backend.database import boards_collection, tasks_collection, task_tombstones_collection
+from backend.etags import versions
+from backend.routers.chat import manager
+from backend.serializers import json_response, task_row
+
+# Tombstones older than this are purged; clients further behind get a full list
+TASK_TOMBSTONE_TTL_DAYS = int(os.getenv("TASK_TOMBSTONE_TTL_DAYS", "30"))
+# A pending version older than this (its writer died) no longer holds back the committed version
+TASK_VERSION_PENDING_TTL_SECONDS = int(os.getenv("TASK_VERSION_PENDING_TTL_SECONDS", "60"))
+
+def committed_version(board: Dict[str, Any]) -> int:
+    """The board version up to which every change has been written"""
+    version = board.get("version", 0)
+    cutoff = datetime.utcnow() - timedelta(seconds=TASK_VERSION_PENDING_TTL_SECONDS)
+    pending = [p["seq"] for p in board.get("pending_versions", ()) if p["at"] >= cutoff]
+    return min(version, min(pending) - 1) if pending else version
+
+async def _allocate_version(board_id: str) -> int:
+    """Increment a board's change counter and mark the new version pending"""
+    while True:
+        board = await boards_collection.find_one({"_id": ObjectId(board_id)}, {"version": 1})
+        if board is None:
+            return 0
+        version = board.get("version", 0) + 1
+        # Compare-and-set, so the pending entry carries the version it holds back
+        result = await boards_collection.update_one(
+            {"_id": ObjectId(board_id), "version": board.get("version")},
+            {"$set": {"version": version}, "$push": {"pending_versions": {"seq": version, "at": datetime.utcnow()}}}
+        )
+        if result.modified_count:
+            return version
+
+async def _release_version(board_id: str, version: int):
+    cutoff = datetime.utcnow() - timedelta(seconds=TASK_VERSION_PENDING_TTL_SECONDS)
+    await boards_collection.update_one(
+        {"_id": ObjectId(board_id)},
+        {"$pull": {"pending_versions": {"$or": [{"seq": version}, {"at": {"$lt": cutoff}}]}}}
+    )
+
+@asynccontextmanager
+async def board_version(board_id: str) -> AsyncIterator[int]:
+    """
+    Take the next board version for the task writes made inside the block;
+    it counts as committed once the block exits. If the block raises, the
+    version is broadcast as skipped.
+    """
+    version = await _allocate_version(board_id)
+    try:
+        yield version
+    except BaseException:
+        await _release_version(board_id, version)
+        await publish_skipped_version(board_id, version)
+        raise
+    await _release_version(board_id, version)
+
+async def publish_task_event(board_id: str, version: int, op: str, task_id: str, current_user: dict, changes: Dict[str, Any] | None = None):
+    """Broadcast a task change (`op` is created/updated/deleted) to everyone on the board"""
+    await versions.bump(f"board:{board_id}")
+    await manager.broadcast(board_id, {
+        "type": "task_event",
+        "op": op,
+        "board_id": board_id,
+        "task_id": task_id,
+        "version": version,
+        "changes": jsonable_encoder(changes or {}),
+        "user_id": current_user["id"],
+        "username": current_user["username"],
+        "timestamp": datetime.utcnow().isoformat()
+    })
+
+async def publish_skipped_version(board_id: str, version: int):
+    """Tell the board's clients that a version carries no change (its write failed)"""
+    if version:
+        await manager.broadcast(board_id, {
+            "type": "task_event",
+            "op": "skipped",
+            "board_id": board_id,
+            "version": version,
+            "timestamp": datetime.utcnow().isoformat()
+        })
+
+async def publish_bulk_task_event(board_id: str, version: int, events: List[Dict[str, Any]], current_user: dict):
+    """
+    Broadcast a batch of task changes that share one board version as a
+    single "bulk" event; `events` holds {op, task_id, changes} entries.
+    """
+    await versions.bump(f"board:{board_id}")
+    await manager.broadcast(board_id, {
+        "type": "task_event",
+        "op": "bulk",
+        "board_id": board_id,
+        "version": version,
+        "events": jsonable_encoder(events),
+        "user_id": current_user["id"],
+        "username": current_user["username"],
+        "timestamp": datetime.utcnow().isoformat()
+    })
+
+async def record_tombstone(board_id: str, task_id: str, version: int):
+    """Remember a deleted task for delta sync and purge expired tombstones of the board"""
+    await record_tombstones(board_id, [task_id], version)
+
+async def record_tombstones(board_id: str, task_ids: List[str], version: int):
+    if not task_ids:
+        return
+    now = datetime.utcnow()
+    await task_tombstones_collection.insert_many([
+        {"board_id": board_id, "task_id": task_id, "seq": version, "deleted_at": now}
+        for task_id in task_ids
+    ])
+    expired = await task_tombstones_collection.find(
+        {"board_id": board_id, "deleted_at": {"$lt": now - timedelta(days=TASK_TOMBSTONE_TTL_DAYS)}},
+        {"seq": 1}
+    ).sort("seq", -1).limit(1).to_list(None)
+    if expired:
+        floor = expired[0]["seq"]
+        await boards_collection.update_one({"_id": ObjectId(board_id)}, {"$max": {"compacted_seq": floor}})
+        await task_tombstones_collection.delete_many({"board_id": board_id, "seq": {"$lte": floor}})
+
+async def board_tasks_since(board: Dict[str, Any], since: int, response: Response) -> Response:
+    """
+    Tasks changed and ids deleted after version `since`, or the full list if
+    that is no longer possible; encoded as a ``TaskDelta`` and carrying the
+    endpoint's response headers.
+    """
+    board_id = str(board["_id"])
+    # `board` was read before the tasks below, and every write up to its
+    # committed version had landed by then, so none of them can be skipped
+    version = committed_version(board)
+    if since < board.get("compacted_seq", 0) or since > version:
+        tasks = await tasks_collection.find({"board_id": board_id}).to_list(None)
+        return json_response({"version": version, "full": True, "tasks": task_row.many(tasks), "deleted": []},
+                             headers=dict(response.headers))
+
+    tasks = await tasks_collection.find({"board_id": board_id, "seq": {"$gt": since}}).to_list(None)
+    tombstones = await task_tombstones_collection.find(
+        {"board_id": board_id, "seq": {"$gt": since}},
+        {"task_id": 1}
+    ).to_list(None)
+    return json_response({
+        "version": version,
+        "full": False,
+        "tasks": task_row.many(tasks),
+        "deleted": [t["task_id"] for t in tombstones]
+    }, headers=dict(response.headers))
@@ -0,0 +1,82 @@
+# backend/thumbnails.py
+"""
+Bounded process pool rendering thumbnails of image attachments.
+
+Decoding and resizing a large photo costs tens to hundreds of milliseconds
+of CPU, so it runs in a small dedicated process pool, never on the request
+path. Thumbnails are named after the stored blob (the content hash) and size
+of their source (``thumbs/<blob>-<size>.webp`` in the upload directory) and
+written with an atomic rename, so rendering the same image twice, or
+retrying a job that died halfway, just finds the files already there.
+
+Pillow is optional: without it ``thumbnail_pool.available`` is False and
+attachments simply have no thumbnails.
+"""
+import os
+import uuid
+from typing import Dict, Iterable
+
+from backend.process_pool import BoundedProcessPool, PoolFull
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional; no thumbnails without it
+    Image = None
+
+THUMBNAIL_SIZES = tuple(sorted(int(size) for size in os.getenv("THUMBNAIL_SIZES", "160,480").split(",")))
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+THUMBNAIL_MAX_PENDING = int(os.getenv("THUMBNAIL_MAX_PENDING", "256"))
+# Images larger than this are not decoded at all (decompression bombs)
+THUMBNAIL_MAX_PIXELS = int(os.getenv("THUMBNAIL_MAX_PIXELS", str(64 * 1024 * 1024)))
+THUMBNAIL_TYPES = {"image/png", "image/jpeg", "image/gif", "image/webp", "image/bmp"}
+
+# Raised by ThumbnailPool.render when the pool is saturated
+ThumbnailPoolFull = PoolFull
+
+def thumbnail_name(blob: str, size: int) -> str:
+    """Path of a thumbnail relative to the upload directory"""
+    return f"thumbs/{blob}-{size}.webp"
+
+# -----------------------
+# Worker-side functions (run in the pool processes)
+# -----------------------
+def _render(upload_dir: str, blob: str, sizes: Iterable[int]) -> Dict[str, str]:
+    """
+    Write the missing thumbnails of a stored image and return {size: name}
+    for all of them; an empty dict if Pillow cannot decode the file.
+    """
+    names = {str(size): thumbnail_name(blob, size) for size in sizes}
+    missing = [int(size) for size, name in names.items() if not os.path.exists(os.path.join(upload_dir, name))]
+    if not missing:
+        return names
+    Image.MAX_IMAGE_PIXELS = THUMBNAIL_MAX_PIXELS
+    try:
+        with Image.open(os.path.join(upload_dir, blob)) as image:
+            # Let JPEG decode at a reduced scale instead of full resolution
+            image.draft("RGB", (max(missing), max(missing)))
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+    except (Image.UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        return {}
+    for size in sorted(missing, reverse=True):
+        # Each size is taken from the next larger one; thumbnail() never upscales
+        image.thumbnail((size, size), Image.LANCZOS)
+        path = os.path.join(upload_dir, thumbnail_name(blob, size))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.part"
+        image.save(temp_path, "WEBP", quality=80, method=4)
+        os.replace(temp_path, path)
+    return names
+
+# -----------------------
+# Pool
+# -----------------------
+class ThumbnailPool(BoundedProcessPool):
+    def __init__(self, workers: int = THUMBNAIL_WORKERS, max_pending: int = THUMBNAIL_MAX_PENDING):
+        super().__init__("thumbnails", workers, max_pending, available=Image is not None)
+
+    async def render(self, upload_dir: str, blob: str, sizes: Iterable[int] = THUMBNAIL_SIZES) -> Dict[str, str]:
+        """Thumbnails of one stored image; raises ThumbnailPoolFull instead of queueing past max_pending"""
+        return await self.run(_render, upload_dir, blob, tuple(sizes))
+
+thumbnail_pool = ThumbnailPool()
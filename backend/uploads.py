@@ -0,0 +1,628 @@
+# backend/uploads.py
+"""
+Streaming attachment uploads and the content-addressed attachment store.
+
+The multipart body is parsed as it arrives instead of being spooled by the
+form parser first. File bytes are written to a temp file in the upload
+directory and hashed (SHA-256) on a small dedicated thread pool, so the event
+loop, and with it every chat socket, only ever parses the multipart framing.
+A request over UPLOAD_MAX_REQUEST_BYTES (checked against Content-Length up
+front, then while reading) or a file over UPLOAD_MAX_FILE_BYTES is rejected
+with 413 as soon as the limit is crossed, and the temp file is removed.
+
+Files are stored once per content: a finished upload is moved with an atomic
+rename to ``uploads/<sha256[:2]>/<sha256><ext>`` (its "blob"), unless that
+blob already exists, in which case the temp file is dropped and the upload
+costs only its attachment document. The reference count of a blob is the
+number of attachment documents naming it; deleting the last one removes the
+file. Downloads go through an authenticated endpoint that serves blobs with
+Range support and immutable cache headers (see attachment_file_response).
+Attachments stored before this (one ``uploads/<uuid><ext>`` file each) are
+moved into the store by::
+
+    python -m backend.uploads compact [--dry-run]
+
+Image blobs get thumbnails, rendered in the background by the
+backend.thumbnails process pool and recorded on their attachment documents;
+images whose rendering was skipped or failed are caught up on by::
+
+    python -m backend.uploads thumbnails
+"""
+import asyncio
+import codecs
+import glob
+import hashlib
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Set
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import FileResponse
+from python_multipart import MultipartParser
+from python_multipart.exceptions import FormParserError
+from python_multipart.multipart import parse_options_header
+
+from backend import metrics
+from backend.database import attachments_collection
+from backend.thumbnails import THUMBNAIL_TYPES, ThumbnailPoolFull, thumbnail_name, thumbnail_pool
+
+UPLOAD_DIR = "uploads"
+UPLOAD_MAX_FILE_BYTES = int(os.getenv("UPLOAD_MAX_FILE_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_BYTES", str(210 * 1024 * 1024)))
+# File data is handed to the writer thread in blocks of at least this size
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+THUMBNAIL_RETRIES = int(os.getenv("THUMBNAIL_RETRIES", "3"))
+DOWNLOAD_CHUNK_BYTES = int(os.getenv("DOWNLOAD_CHUNK_BYTES", str(1024 * 1024)))
+# URL prefix of a proxy location serving UPLOAD_DIR (e.g. "/_uploads/"); when set, downloads are
+# answered with X-Accel-Redirect so the proxy streams the file with sendfile
+DOWNLOAD_ACCEL_REDIRECT = os.getenv("DOWNLOAD_ACCEL_REDIRECT", "")
+# Shown in the browser rather than downloaded, unless ?download=1
+INLINE_TYPES = {
+    "image/png", "image/jpeg", "image/gif", "image/webp", "image/avif", "image/bmp",
+    "application/pdf", "text/plain",
+}
+
+# OpenAPI description of the body, which the endpoint reads itself instead of declaring a File parameter
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
+
+_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+_bytes_written = metrics.counter("uploads.bytes_written")
+_rejected = metrics.counter("uploads.rejected_too_large")
+_dedup_hits = metrics.counter("uploads.dedup_hits")
+_blobs_removed = metrics.counter("uploads.blobs_removed")
+_downloads = metrics.counter("uploads.downloads")
+_EXTENSION = re.compile(r"\.[A-Za-z0-9]{1,16}$")
+
+@dataclass
+class StoredUpload:
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+    blob: str
+    temp_path: str
+
+def _too_large(limit: int, what: str) -> HTTPException:
+    _rejected.inc()
+    return HTTPException(
+        status_code=413,
+        detail=f"{what} exceeds the maximum of {limit} bytes"
+    )
+
+async def _off_loop(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+class _FileSink:
+    """Temp file next to its final location, hashed as it is written (runs on the upload threads)"""
+    def __init__(self, directory: str):
+        fd, self.temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+        self._sha256 = hashlib.sha256()
+
+    def write(self, blocks: List[bytes]):
+        for block in blocks:
+            self._sha256.update(block)
+            self._file.write(block)
+
+    def finish(self) -> str:
+        self._file.close()
+        return self._sha256.hexdigest()
+
+    def discard(self):
+        self._file.close()
+        try:
+            os.unlink(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+class _UploadParser:
+    """Multipart callbacks that keep only the bytes of the file field, counting them against the limit"""
+    def __init__(self, field: str, charset: str, max_file_bytes: int):
+        self.field = field
+        self.charset = charset
+        self.max_file_bytes = max_file_bytes
+        self.filename: str | None = None
+        self.content_type = "application/octet-stream"
+        self.size = 0
+        self.pending: List[bytes] = []
+        self.pending_bytes = 0
+        self.done = False
+        self._in_file = False
+        self._headers: dict = {}
+        self._header_name = b""
+        self._header_value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode(self.charset, errors="replace")
+        # Only the first file in the expected field is stored; anything else is read past
+        self._in_file = name == self.field and b"filename" in options and self.filename is None
+        if self._in_file:
+            self.filename = options[b"filename"].decode(self.charset, errors="replace")
+            content_type = self._headers.get(b"content-type", b"").decode("latin-1").strip()
+            if content_type:
+                self.content_type = content_type
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if not self._in_file:
+            return
+        self.size += end - start
+        if self.size > self.max_file_bytes:
+            raise _too_large(self.max_file_bytes, "File")
+        self.pending.append(data[start:end])
+        self.pending_bytes += end - start
+
+    def on_part_end(self):
+        if self._in_file:
+            self._in_file = False
+            self.done = True
+
+    def take(self) -> List[bytes]:
+        blocks, self.pending, self.pending_bytes = self.pending, [], 0
+        return blocks
+
+async def receive_upload(
+    request: Request,
+    field: str = "file",
+    max_file_bytes: int = UPLOAD_MAX_FILE_BYTES,
+    max_request_bytes: int = UPLOAD_MAX_REQUEST_BYTES
+) -> StoredUpload:
+    """
+    Stream the file in multipart field `field` of the request body to a temp
+    file in the upload directory; returns it with its size and SHA-256. The
+    caller stores it with commit_upload (after inserting the attachment
+    document) or drops it with discard_upload.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_request_bytes:
+        raise _too_large(max_request_bytes, "Request")
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a multipart/form-data upload")
+    charset = params.get(b"charset", b"utf-8").decode("latin-1")
+    try:
+        charset = codecs.lookup(charset).name
+    except LookupError:
+        charset = "latin-1"
+
+    upload = _UploadParser(field, charset, max_file_bytes)
+    parser = MultipartParser(params[b"boundary"], upload.callbacks())
+    sink: _FileSink | None = None
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_request_bytes:
+                raise _too_large(max_request_bytes, "Request")
+            parser.write(chunk)
+            if upload.pending and sink is None:
+                sink = await _off_loop(_FileSink, UPLOAD_DIR)
+            # Batch small network chunks so each hop to the writer thread carries a useful amount
+            if upload.pending_bytes >= UPLOAD_CHUNK_BYTES or (upload.done and upload.pending):
+                await _off_loop(sink.write, upload.take())
+        parser.finalize()
+        if upload.filename is None or not upload.done:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"No file in field '{field}'")
+        if sink is None:
+            # Empty file: no data callbacks ran
+            sink = await _off_loop(_FileSink, UPLOAD_DIR)
+        if upload.pending:
+            await _off_loop(sink.write, upload.take())
+        sha256 = await _off_loop(sink.finish)
+    except BaseException as exc:
+        if sink is not None:
+            await asyncio.shield(_off_loop(sink.discard))
+        if isinstance(exc, FormParserError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid multipart data") from exc
+        raise
+    _bytes_written.inc(upload.size)
+    return StoredUpload(
+        filename=upload.filename,
+        content_type=upload.content_type,
+        size=upload.size,
+        sha256=sha256,
+        blob=blob_name(sha256, upload.filename),
+        temp_path=sink.temp_path
+    )
+
+# -----------------------
+# Content-addressed store
+# -----------------------
+def blob_name(sha256: str, filename: str) -> str:
+    """Store-relative path of a content hash (the extension is kept for proxies and people browsing the volume)"""
+    match = _EXTENSION.search(filename or "")
+    return f"{sha256[:2]}/{sha256}{match.group(0).lower() if match else ''}"
+
+def blob_path(blob: str) -> str:
+    return os.path.join(UPLOAD_DIR, blob)
+
+def _commit(temp_path: str, path: str) -> bool:
+    if os.path.exists(path):
+        os.unlink(temp_path)
+        return False
+    while True:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.replace(temp_path, path)
+            return True
+        except FileNotFoundError:
+            # release_blob removed the emptied directory in between
+            if not os.path.exists(temp_path):
+                raise
+
+async def commit_upload(upload: StoredUpload) -> bool:
+    """
+    Move a received upload into the store; False if the content was already
+    there (the temp file is dropped). Call after the attachment document
+    referencing the blob is inserted, so a concurrent release_blob sees it.
+    """
+    stored = await _off_loop(_commit, upload.temp_path, blob_path(upload.blob))
+    if not stored:
+        _dedup_hits.inc()
+    return stored
+
+async def discard_upload(upload: StoredUpload):
+    try:
+        await _off_loop(os.unlink, upload.temp_path)
+    except FileNotFoundError:
+        pass
+
+async def release_blob(blob: str) -> bool:
+    """Remove a blob if no attachment references it any more; True if it was removed"""
+    if await attachments_collection.count_documents({"blob": blob}):
+        return False
+    path = blob_path(blob)
+    # Move the file aside before the final check: an upload of the same content
+    # inserts its document first, then finds the blob missing and writes it
+    # again, or is seen by the recount below and gets the file moved back.
+    grave = f"{path}.gc-{uuid.uuid4().hex}"
+    try:
+        await _off_loop(os.replace, path, grave)
+    except FileNotFoundError:
+        return False
+    if await attachments_collection.count_documents({"blob": blob}):
+        await _off_loop(os.replace, grave, path)
+        return False
+    await _off_loop(os.unlink, grave)
+    await _off_loop(_remove_empty_dir, os.path.dirname(path))
+    await _off_loop(_remove_thumbnails, blob)
+    _blobs_removed.inc()
+    return True
+
+def _legacy_path(attachment: Dict[str, Any]) -> str:
+    """File of an attachment stored before the content-addressed store (file_path was its static URL)"""
+    return os.path.join(UPLOAD_DIR, os.path.basename(attachment.get("file_path", "")))
+
+def _unlink_quietly(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+def _remove_empty_dir(path: str):
+    try:
+        os.rmdir(path)
+    except OSError:
+        # Not empty (other blobs share the prefix) or already gone
+        pass
+
+def _remove_thumbnails(blob: str):
+    # Every size ever rendered, not just the configured ones
+    for name in glob.glob(os.path.join(glob.escape(UPLOAD_DIR), "thumbs", glob.escape(blob) + "-*.webp")):
+        _unlink_quietly(name)
+
+async def delete_attachments(flt: Dict[str, Any]) -> int:
+    """Delete the matching attachment documents and every file no longer referenced; returns how many"""
+    attachments = await attachments_collection.find(flt, {"blob": 1, "file_path": 1}).to_list(None)
+    if not attachments:
+        return 0
+    await attachments_collection.delete_many({"_id": {"$in": [a["_id"] for a in attachments]}})
+    for blob in {a["blob"] for a in attachments if a.get("blob")}:
+        await release_blob(blob)
+    # Files from before the store had exactly one attachment each
+    for attachment in attachments:
+        if not attachment.get("blob") and attachment.get("file_path"):
+            await _off_loop(_unlink_quietly, _legacy_path(attachment))
+    return len(attachments)
+
+# -----------------------
+# Downloads
+# -----------------------
+class _AttachmentFile(FileResponse):
+    # Fewer, larger reads on the thread pool than Starlette's 64 KiB default
+    chunk_size = DOWNLOAD_CHUNK_BYTES
+
+def _inline_safe(content_type: str) -> bool:
+    """Types a browser may render in place without running anything (no HTML or SVG)"""
+    major = content_type.split("/", 1)[0]
+    return content_type in INLINE_TYPES or major in ("video", "audio")
+
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    return bool(if_none_match) and etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+async def _file_response(
+    request: Request,
+    name: str,
+    content_type: str,
+    filename: str,
+    etag: str | None,
+    inline: bool
+) -> Response:
+    """
+    A file of the upload directory (`name` relative to it). Content-addressed
+    files never change, so they get a strong ETag and may be cached forever;
+    Range and If-Range requests are answered with 206. Without
+    DOWNLOAD_ACCEL_REDIRECT the body is sent by the ASGI server: zero-copy if
+    it supports the pathsend extension, otherwise in DOWNLOAD_CHUNK_BYTES
+    reads off the loop.
+    """
+    path = os.path.join(UPLOAD_DIR, name)
+    try:
+        stat_result = await _off_loop(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Attachment file not found")
+
+    headers = {"X-Content-Type-Options": "nosniff"}
+    if etag:
+        headers["ETag"] = etag
+        headers["Cache-Control"] = "private, max-age=31536000, immutable"
+        if _not_modified(request, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    else:
+        headers["Cache-Control"] = "private, no-cache"
+    _downloads.inc()
+
+    disposition = "inline" if inline else "attachment"
+    if DOWNLOAD_ACCEL_REDIRECT:
+        # The front proxy (an `internal` location over UPLOAD_DIR) streams the file, with sendfile and ranges
+        return Response(media_type=content_type, headers={
+            **headers,
+            "Content-Disposition": f"{disposition}; filename*=utf-8''{quote(filename)}",
+            "X-Accel-Redirect": DOWNLOAD_ACCEL_REDIRECT + name,
+        })
+    return _AttachmentFile(
+        path,
+        headers=headers,
+        media_type=content_type,
+        filename=filename,
+        stat_result=stat_result,
+        content_disposition_type=disposition
+    )
+
+async def attachment_file_response(attachment: Dict[str, Any], request: Request, as_download: bool = False) -> Response:
+    """The file of an attachment document (ETag: its SHA-256)"""
+    blob = attachment.get("blob")
+    name = blob or os.path.basename(_legacy_path(attachment))
+    content_type = attachment.get("file_type") or "application/octet-stream"
+    return await _file_response(
+        request, name, content_type,
+        filename=attachment.get("filename") or os.path.basename(name),
+        etag=f'"{attachment["sha256"]}"' if blob else None,
+        inline=not as_download and _inline_safe(content_type)
+    )
+
+async def thumbnail_file_response(attachment: Dict[str, Any], request: Request, size: int) -> Response:
+    """The smallest thumbnail of an attachment at least `size` pixels wide/high (else the largest)"""
+    thumbnails = attachment.get("thumbnails")
+    if not thumbnails:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Attachment has no thumbnail")
+    sizes = sorted(int(s) for s in thumbnails)
+    chosen = next((s for s in sizes if s >= size), sizes[-1])
+    stem = os.path.splitext(attachment.get("filename") or "thumbnail")[0]
+    return await _file_response(
+        request, thumbnails[str(chosen)], "image/webp",
+        filename=f"{stem}-{chosen}.webp",
+        etag=f'"{attachment["sha256"]}-{chosen}"',
+        inline=True
+    )
+
+# -----------------------
+# Thumbnails
+# -----------------------
+_thumbnail_jobs: Set[asyncio.Task] = set()
+_thumbnail_failures = metrics.counter("thumbnails.failures")
+
+async def render_thumbnails(blob: str) -> Dict[str, str] | None:
+    """
+    Render (or find) the thumbnails of a stored image and record them on
+    every attachment of it. Returns None if the pool was full or every try
+    failed; `python -m backend.uploads thumbnails` catches up on those.
+    """
+    for attempt in range(THUMBNAIL_RETRIES):
+        try:
+            thumbnails = await thumbnail_pool.render(UPLOAD_DIR, blob)
+        except ThumbnailPoolFull:
+            return None
+        except Exception as e:
+            # Worker crash or I/O error: rendering is idempotent, so just try again
+            _thumbnail_failures.inc()
+            print(f"Thumbnail rendering failed for {blob} (attempt {attempt + 1}): {e}")
+            await asyncio.sleep(2 ** attempt)
+            continue
+        await attachments_collection.update_many({"blob": blob}, {"$set": {"thumbnails": thumbnails}})
+        return thumbnails
+    return None
+
+def schedule_thumbnails(upload: StoredUpload):
+    """Render thumbnails of an image upload in the background, off the request path"""
+    if not thumbnail_pool.available or upload.content_type not in THUMBNAIL_TYPES:
+        return
+    job = asyncio.create_task(render_thumbnails(upload.blob))
+    _thumbnail_jobs.add(job)
+    job.add_done_callback(_thumbnail_jobs.discard)
+
+# -----------------------
+# Command line
+# -----------------------
+def _hash_file(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(UPLOAD_CHUNK_BYTES):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def _link_or_copy(src: str, dst: str):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst + ".part")
+        os.replace(dst + ".part", dst)
+
+def _fan_out(directory: str, prefix: str = ""):
+    for entry in os.scandir(directory):
+        if entry.is_dir() and re.fullmatch(r"[0-9a-f]{2}", entry.name):
+            for blob in os.scandir(entry.path):
+                if blob.is_file():
+                    yield f"{prefix}{entry.name}/{blob.name}", blob
+
+def _stored_files():
+    """
+    Files the store owns: legacy files at the top level, blobs in the
+    two-hex-digit fan-out directories and thumbnails under thumbs/
+    """
+    for entry in os.scandir(UPLOAD_DIR):
+        if entry.is_file():
+            yield entry.name, entry
+    yield from _fan_out(UPLOAD_DIR)
+    thumbs = os.path.join(UPLOAD_DIR, "thumbs")
+    if os.path.isdir(thumbs):
+        yield from _fan_out(thumbs, "thumbs/")
+
+async def compact(dry_run: bool = False) -> Dict[str, int]:
+    """
+    Move pre-store attachments into the content-addressed store, then remove
+    files no attachment references (including temp files left by interrupted
+    uploads and thumbnails of deleted blobs). Meant to run while the API is
+    stopped; safe to re-run.
+    """
+    report = {"migrated": 0, "duplicates": 0, "missing": 0, "orphans": 0, "bytes_freed": 0}
+    for attachment in await attachments_collection.find({"blob": None}).to_list(None):
+        legacy = _legacy_path(attachment)
+        if not os.path.isfile(legacy):
+            report["missing"] += 1
+            print(f"{attachment['_id']}: {legacy} is missing, left as is")
+            continue
+        sha256 = _hash_file(legacy)
+        blob = blob_name(sha256, attachment.get("filename") or legacy)
+        exists = os.path.exists(blob_path(blob))
+        report["migrated"] += 1
+        if exists:
+            report["duplicates"] += 1
+            report["bytes_freed"] += os.path.getsize(legacy)
+        if dry_run:
+            continue
+        # Link first, repoint the document, then drop the old name: an
+        # interruption leaves at worst an orphan for the next run
+        if not exists:
+            _link_or_copy(legacy, blob_path(blob))
+        await attachments_collection.update_one(
+            {"_id": attachment["_id"]},
+            {"$set": {"blob": blob, "sha256": sha256}, "$unset": {"file_path": ""}}
+        )
+        os.unlink(legacy)
+
+    referenced = set()
+    for attachment in await attachments_collection.find({}, {"blob": 1, "file_path": 1}).to_list(None):
+        referenced.add(attachment.get("blob") or os.path.basename(attachment.get("file_path", "")))
+    stale_before = time.time() - 3600
+    for name, entry in list(_stored_files()):
+        if name in referenced:
+            continue
+        source = re.fullmatch(r"thumbs/(.+)-\d+\.webp", name)
+        if source and source.group(1) in referenced:
+            continue
+        leftover = name.endswith(".part") or ".gc-" in name
+        if leftover and entry.stat().st_mtime > stale_before:
+            continue  # may belong to an upload still in progress
+        report["orphans"] += 1
+        report["bytes_freed"] += entry.stat().st_size
+        if not dry_run:
+            os.unlink(entry.path)
+    return report
+
+async def backfill_thumbnails() -> Dict[str, int]:
+    """Render thumbnails of every stored image that has none recorded yet"""
+    report = {"rendered": 0, "not_images": 0, "failed": 0}
+    pending = await attachments_collection.find(
+        {"thumbnails": None, "blob": {"$ne": None}, "file_type": {"$in": sorted(THUMBNAIL_TYPES)}}, {"blob": 1}
+    ).to_list(None)
+    blobs = {attachment["blob"] for attachment in pending}
+    semaphore = asyncio.Semaphore(thumbnail_pool.workers * 2)
+    async def one(blob):
+        async with semaphore:
+            thumbnails = await render_thumbnails(blob)
+        report["failed" if thumbnails is None else "rendered" if thumbnails else "not_images"] += 1
+    thumbnail_pool.start()
+    try:
+        await asyncio.gather(*(one(blob) for blob in blobs))
+    finally:
+        thumbnail_pool.shutdown()
+    return report
+
+async def _main(argv: List[str]) -> int:
+    if argv == ["thumbnails"]:
+        if not thumbnail_pool.available:
+            print("Pillow is not installed")
+            return 1
+        report = await backfill_thumbnails()
+        print(", ".join(f"{k}={v}" for k, v in report.items()))
+        return 0
+    if not argv or argv[0] != "compact" or set(argv[1:]) - {"--dry-run"}:
+        print("Usage: python -m backend.uploads compact [--dry-run] | thumbnails")
+        return 2
+    dry_run = "--dry-run" in argv
+    report = await compact(dry_run)
+    print(("Would have: " if dry_run else "") + ", ".join(f"{k}={v}" for k, v in report.items()))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
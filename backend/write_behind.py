@@ -0,0 +1,156 @@
+# backend/write_behind.py
+"""
+Write-behind batch inserts into one collection.
+
+Documents are queued in memory and inserted by a background flusher, in
+batches of up to ``batch_size``, every ``flush_interval_ms`` or as soon as a
+full batch is waiting. Every document gets its ``_id`` when it is queued, so a
+retried insert cannot write it twice: after a failed ``insert_many`` only the
+documents that were not written go back to the front of the queue, and one
+that fails ``max_retries`` times in a row is dropped.
+
+The queue holds at most ``max_pending`` documents. ``add`` makes room by
+dropping the oldest; ``put`` waits up to ``backpressure_ms`` for the flusher
+and otherwise drops the new document. Metrics are reported under
+``<name>.written``, ``.dropped``, ``.flush_failures``, ``.backpressure_waits``,
+``.pending`` and ``.batch_size``.
+"""
+import asyncio
+from typing import Any, Dict, Iterable, List
+
+from bson import ObjectId
+
+from backend import metrics
+from backend.database import unwritten
+
+class BatchWriter:
+    def __init__(
+        self, collection, name: str, batch_size: int, flush_interval_ms: int,
+        max_pending: int, max_retries: int, backpressure_ms: int = 0
+    ):
+        self.collection = collection
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval_ms = flush_interval_ms
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.backpressure_ms = backpressure_ms
+        self._pending: List[Dict[str, Any]] = []
+        # Failed insert attempts per pending document id
+        self._attempts: Dict[ObjectId, int] = {}
+        self._wakeup = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher: asyncio.Task | None = None
+        self.written = metrics.counter(f"{name}.written")
+        self.dropped = metrics.counter(f"{name}.dropped")
+        self.flush_failures = metrics.counter(f"{name}.flush_failures")
+        self.backpressure_waits = metrics.counter(f"{name}.backpressure_waits")
+        self.pending = metrics.gauge(f"{name}.pending")
+        self.batch_sizes = metrics.summary(f"{name}.batch_size")
+
+    # -----------------------
+    # Lifecycle
+    # -----------------------
+    def start(self):
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    # -----------------------
+    # Queueing
+    # -----------------------
+    def _append(self, doc: Dict[str, Any]):
+        doc.setdefault("_id", ObjectId())
+        self._pending.append(doc)
+
+    def _queued(self):
+        self.pending.set(len(self._pending))
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def add(self, doc: Dict[str, Any]):
+        """Queue a document, dropping the oldest queued one if the queue is full"""
+        if len(self._pending) >= self.max_pending:
+            self._attempts.pop(self._pending.pop(0)["_id"], None)
+            self.dropped.inc()
+        self._append(doc)
+        self._queued()
+
+    async def put(self, docs: Iterable[Dict[str, Any]]):
+        """Queue documents, waiting for the flusher (then dropping) while the queue is full"""
+        for doc in docs:
+            if len(self._pending) >= self.max_pending:
+                self.backpressure_waits.inc()
+                self._drained.clear()
+                self._wakeup.set()
+                try:
+                    await asyncio.wait_for(self._drained.wait(), timeout=self.backpressure_ms / 1000)
+                except asyncio.TimeoutError:
+                    pass
+                if len(self._pending) >= self.max_pending:
+                    self.dropped.inc()
+                    continue
+            self._append(doc)
+        self._queued()
+
+    # -----------------------
+    # Flushing
+    # -----------------------
+    async def flush(self):
+        """Write everything queued so far (also used by readers that must see recent documents)"""
+        async with self._flush_lock:
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                del self._pending[:len(batch)]
+                try:
+                    await self.collection.insert_many(batch, ordered=False)
+                except Exception as e:
+                    self.flush_failures.inc()
+                    print(f"[ERROR] {self.name} flush failed, will retry: {e}")
+                    self._pending[:0] = self._retry(batch, unwritten(batch, e))
+                    return
+                finally:
+                    self.pending.set(len(self._pending))
+                if self._attempts:
+                    for doc in batch:
+                        self._attempts.pop(doc["_id"], None)
+                self.written.inc(len(batch))
+                self.batch_sizes.observe(len(batch))
+                self._drained.set()
+
+    def _retry(self, batch: List[Dict[str, Any]], failed: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """The failed documents of a batch that have retries left"""
+        failed_ids = {doc["_id"] for doc in failed}
+        self.written.inc(len(batch) - len(failed))
+        retry = []
+        for doc in batch:
+            if doc["_id"] not in failed_ids:
+                self._attempts.pop(doc["_id"], None)
+                continue
+            attempts = self._attempts.get(doc["_id"], 0) + 1
+            if attempts > self.max_retries:
+                self._attempts.pop(doc["_id"], None)
+                self.dropped.inc()
+            else:
+                self._attempts[doc["_id"]] = attempts
+                retry.append(doc)
+        return retry
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
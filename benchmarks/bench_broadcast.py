@@ -0,0 +1,95 @@
+"""
+Benchmark: chat broadcast delivery latency with many sockets on one board.
+
+Usage: python -m benchmarks.bench_broadcast [sockets] [messages] [slow_fraction]
+
+Connects `sockets` fake WebSockets to a single board through the real
+ConnectionManager (in-process bus), makes `slow_fraction` of them stall for
+50 ms on every send, then broadcasts `messages` chat messages interleaved
+with typing events. Reports p50/p99 delivery latency seen by the fast sockets
+and the time each broadcast() call held the event loop, next to a serial
+send_json loop (the previous implementation) as a baseline.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+os.environ["MONGO_URI"] = ""  # the chat router imports the database layer
+
+from backend import metrics
+from backend.pubsub import InProcessBus
+from backend.routers.chat import ConnectionManager
+
+SLOW_SEND_SECONDS = 0.05
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+class FakeWebSocket:
+    def __init__(self, slow: bool, latencies: list):
+        self.slow = slow
+        self.latencies = latencies
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000, reason: str | None = None):
+        pass
+
+    async def send_text(self, text: str):
+        if self.slow:
+            await asyncio.sleep(SLOW_SEND_SECONDS)
+        message = json.loads(text)
+        if not self.slow and message.get("type") == "chat":
+            self.latencies.append((time.perf_counter() - message["sent"]) * 1000)
+
+    async def send_json(self, message: dict):
+        await self.send_text(json.dumps(message))
+
+async def run_outbox(sockets, messages, slow_every):
+    manager = ConnectionManager(InProcessBus())
+    latencies, call_ms = [], []
+    for i in range(sockets):
+        await manager.connect(FakeWebSocket(slow_every and i % slow_every == 0, latencies), "board", f"user{i}")
+    fast = sockets - (len(range(0, sockets, slow_every)) if slow_every else 0)
+
+    for n in range(messages):
+        await manager.broadcast("board", {"type": "typing", "user_id": "user1", "is_typing": n % 2 == 0})
+        started = time.perf_counter()
+        await manager.broadcast("board", {"type": "chat", "user_id": "user0", "message": f"m{n}", "sent": started})
+        call_ms.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.005)
+    while len(latencies) < fast * messages:
+        await asyncio.sleep(0.01)
+    return latencies, call_ms
+
+async def run_serial(sockets, messages, slow_every):
+    latencies, call_ms = [], []
+    connections = [FakeWebSocket(slow_every and i % slow_every == 0, latencies) for i in range(sockets)]
+    for n in range(messages):
+        started = time.perf_counter()
+        message = {"type": "chat", "user_id": "user0", "message": f"m{n}", "sent": started}
+        for connection in connections:
+            await connection.send_json(message)
+        call_ms.append((time.perf_counter() - started) * 1000)
+    return latencies, call_ms
+
+def report(label, latencies, call_ms):
+    print(f"{label:>8}: delivery ms p50={percentile(latencies, 0.5):8.2f} p99={percentile(latencies, 0.99):8.2f} | "
+          f"broadcast() ms p50={percentile(call_ms, 0.5):8.2f} max={max(call_ms, default=0):8.2f}")
+
+def main():
+    sockets = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    messages = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    slow_fraction = float(sys.argv[3]) if len(sys.argv) > 3 else 0.01
+    slow_every = int(1 / slow_fraction) if slow_fraction > 0 else 0
+    print(f"sockets={sockets} messages={messages} slow_fraction={slow_fraction}")
+    report("outbox", *asyncio.run(run_outbox(sockets, messages, slow_every)))
+    report("serial", *asyncio.run(run_serial(sockets, min(messages, 5), slow_every)))
+    print({k: v for k, v in metrics.snapshot().items() if k.startswith("chat.outbox")})
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark: attachment download throughput for 1 MiB and 1 GiB files.
+
+Usage: python -m benchmarks.bench_download [requests] [concurrency] [chunk_kib]
+
+Starts the API under uvicorn in a subprocess (mock database, temporary
+upload directory, DOWNLOAD_CHUNK_BYTES = `chunk_kib` KiB, default 1024; pass
+64 for Starlette's default), uploads a 1 MiB and a 1 GiB attachment and then
+measures, over real HTTP (httpx for setup, a minimal client for the
+downloads so the client is not the bottleneck):
+
+* `requests` downloads of the 1 MiB file, `concurrency` at a time
+* full downloads of the 1 GiB file
+* 1 MiB Range requests at random offsets of the 1 GiB file
+"""
+import asyncio
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+MIB = 1024 * 1024
+PIECE = os.urandom(MIB)
+BOUNDARY = "benchboundary7MA4YWxkTrZu0gW"
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(port: int, workdir: str, chunk_kib: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "MONGO_URI": "",
+        "PYTHONPATH": os.getcwd(),
+        "UPLOAD_MAX_FILE_BYTES": str(2 * 1024 * MIB),
+        "UPLOAD_MAX_REQUEST_BYTES": str(2 * 1024 * MIB),
+        "DOWNLOAD_CHUNK_BYTES": str(chunk_kib * 1024),
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL
+    )
+
+async def wait_until_up(client: httpx.AsyncClient):
+    for _ in range(100):
+        try:
+            await client.get("/docs")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+async def multipart_body(mebibytes: int):
+    yield (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"f{mebibytes}.bin\"\r\n"
+           "Content-Type: application/octet-stream\r\n\r\n").encode()
+    for _ in range(mebibytes):
+        yield PIECE
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+async def upload(client, task_id, headers, mebibytes) -> str:
+    response = await client.post(
+        f"/tasks/{task_id}/attachments", content=multipart_body(mebibytes),
+        headers={**headers, "Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+    )
+    response.raise_for_status()
+    return response.json()["file_path"]
+
+async def fetch(host: str, port: int, url: str, headers: dict) -> int:
+    """Minimal HTTP/1.1 GET that discards the body (httpx itself tops out below the server)"""
+    reader, writer = await asyncio.open_connection(host, port, limit=MIB)
+    lines = [f"GET {url} HTTP/1.1", f"Host: {host}", "Connection: close", *(f"{k}: {v}" for k, v in headers.items())]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    assert status in (200, 206), head
+    length = int(next(line.split(b":", 1)[1] for line in head.split(b"\r\n") if line.lower().startswith(b"content-length:")))
+    received = 0
+    while received < length:
+        chunk = await reader.read(4 * MIB)
+        if not chunk:
+            break
+        received += len(chunk)
+    writer.close()
+    return received
+
+def report(name: str, count: int, received: int, elapsed: float):
+    print(f"{name:<28} {count:6d} req  {count / elapsed:9.1f} req/s  {received / MIB / elapsed:9.1f} MiB/s")
+
+async def run(requests, concurrency, chunk_kib, port):
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+        await wait_until_up(client)
+        credentials = {"email": "bench@example.com", "password": "benchmark"}
+        response = await client.post("/auth/signup", json={"username": "bench", "role": "admin", **credentials})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        team = (await client.post("/admin/teams", json={"name": "Bench team"}, headers=headers)).json()
+        board = (await client.post("/admin/boards", json={"name": "Bench board", "team_id": team["id"]}, headers=headers)).json()
+        task = (await client.post("/manager/tasks", json={"title": "Bench task", "board_id": board["id"]}, headers=headers)).json()
+        small = await upload(client, task["id"], headers, 1)
+        large = await upload(client, task["id"], headers, 1024)
+        print(f"DOWNLOAD_CHUNK_BYTES={chunk_kib} KiB")
+
+        semaphore = asyncio.Semaphore(concurrency)
+        async def limited(url, extra=None):
+            async with semaphore:
+                return await fetch("127.0.0.1", port, url, {**headers, **(extra or {})})
+
+        started = time.perf_counter()
+        received = sum(await asyncio.gather(*(limited(small) for _ in range(requests))))
+        report(f"1 MiB x{concurrency} concurrent", requests, received, time.perf_counter() - started)
+
+        rounds = 3
+        started = time.perf_counter()
+        received = sum([await fetch("127.0.0.1", port, large, headers) for _ in range(rounds)])
+        report("1 GiB full", rounds, received, time.perf_counter() - started)
+
+        offsets = [random.randrange(0, 1023) * MIB for _ in range(requests)]
+        started = time.perf_counter()
+        received = sum(await asyncio.gather(*(
+            limited(large, {"Range": f"bytes={offset}-{offset + MIB - 1}"}) for offset in offsets
+        )))
+        report(f"1 MiB ranges of 1 GiB x{concurrency}", requests, received, time.perf_counter() - started)
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    chunk_kib = int(sys.argv[3]) if len(sys.argv) > 3 else 1024
+    workdir = tempfile.mkdtemp(prefix="bench_download-")
+    port = free_port()
+    server = start_server(port, workdir, chunk_kib)
+    try:
+        asyncio.run(run(requests, concurrency, chunk_kib, port))
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
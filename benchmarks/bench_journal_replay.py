@@ -0,0 +1,90 @@
+"""
+Benchmark: mock database startup replay time vs. write-ahead log size.
+
+Usage: python -m benchmarks.bench_journal_replay [max_records]
+
+For each log size the script appends N task-shaped mutations (inserts plus
+~20% updates and ~5% deletes) to a fresh journal, then times a cold load
+from the raw log and a cold load after compaction into a snapshot.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from backend.journal import CollectionJournal
+
+STATUSES = ["todo", "in_progress", "review", "completed"]
+PRIORITIES = ["low", "medium", "high", "urgent"]
+
+def make_task(board_ids):
+    now = datetime.utcnow()
+    return {
+        "_id": ObjectId(),
+        "title": f"Task {random.randint(0, 10**6)}",
+        "description": "Lorem ipsum dolor sit amet " * random.randint(1, 6),
+        "board_id": random.choice(board_ids),
+        "assigned_to": str(ObjectId()),
+        "status": random.choice(STATUSES),
+        "priority": random.choice(PRIORITIES),
+        "due_date": now + timedelta(days=random.randint(-10, 30)),
+        "created_by": str(ObjectId()),
+        "created_at": now,
+        "updated_at": now,
+    }
+
+def write_log(directory, records):
+    journal = CollectionJournal(directory, "tasks", snapshot_every=records + 1)
+    journal.load()
+    board_ids = [str(ObjectId()) for _ in range(50)]
+    live = []
+    for _ in range(records):
+        roll = random.random()
+        if live and roll < 0.05:
+            doc = live.pop(random.randrange(len(live)))
+            journal.record_delete(doc["_id"])
+        elif live and roll < 0.25:
+            doc = random.choice(live)
+            doc["status"] = random.choice(STATUSES)
+            doc["updated_at"] = datetime.utcnow()
+            journal.record_put(doc)
+        else:
+            doc = make_task(board_ids)
+            live.append(doc)
+            journal.record_put(doc)
+    journal.close()
+    return len(live)
+
+def timed_load(directory):
+    journal = CollectionJournal(directory, "tasks")
+    start = time.perf_counter()
+    docs = journal.load()
+    elapsed = time.perf_counter() - start
+    return journal, docs, elapsed
+
+def main():
+    max_records = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    sizes = [n for n in (1_000, 10_000, 100_000, 1_000_000) if n <= max_records]
+    print(f"{'records':>10} {'live docs':>10} {'wal MB':>8} {'replay s':>9} {'rec/s':>10} {'snap MB':>8} {'snap load s':>11}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            live = write_log(directory, n)
+            wal_mb = os.path.getsize(os.path.join(directory, "tasks.wal")) / 2**20
+
+            journal, docs, replay_s = timed_load(directory)
+            assert len(docs) == live
+            journal.snapshot(docs.values())
+            journal.close()
+            snap_mb = os.path.getsize(os.path.join(directory, "tasks.snap")) / 2**20
+
+            journal, docs, snap_s = timed_load(directory)
+            journal.close()
+            assert len(docs) == live
+            print(f"{n:>10} {live:>10} {wal_mb:>8.1f} {replay_s:>9.3f} {n / replay_s:>10.0f} {snap_mb:>8.1f} {snap_s:>11.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: login storm against the bounded bcrypt pool.
+
+Usage: python -m benchmarks.bench_login [logins] [concurrency]
+
+Runs the FastAPI app in-process on the mock database (requires httpx),
+fires `logins` concurrent POST /auth/login requests and reports login
+throughput, latency percentiles, 429 rejections, and how late a 10 ms
+event-loop heartbeat ran while the storm was in progress (a proxy for how
+much the storm stalls other requests and chat sockets).
+"""
+import asyncio
+import os
+import sys
+import time
+
+os.environ["MONGO_URI"] = ""  # always benchmark against the in-memory mock
+
+import httpx
+
+from backend.main import app
+from backend.password_pool import password_pool
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+async def heartbeat(lags, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append((time.perf_counter() - started - 0.01) * 1000)
+
+async def run(logins, concurrency):
+    password_pool.start()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        credentials = {"email": "bench@example.com", "password": "benchmark"}
+        await client.post("/auth/signup", json={"username": "bench", **credentials})
+        await client.post("/auth/login", json=credentials)  # warm up the pool
+
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, statuses = [], {}
+
+        async def login():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/auth/login", json=credentials)
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        lags, stop = [], asyncio.Event()
+        beat = asyncio.create_task(heartbeat(lags, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await beat
+
+    password_pool.shutdown()
+    ok = statuses.get(200, 0)
+    print(f"workers={password_pool.workers} max_pending={password_pool.max_pending} "
+          f"logins={logins} concurrency={concurrency}")
+    print(f"statuses: {statuses}")
+    print(f"throughput: {ok / elapsed:.1f} successful logins/s over {elapsed:.2f}s")
+    print(f"latency ms: p50={percentile(latencies, 0.5):.0f} p95={percentile(latencies, 0.95):.0f} "
+          f"p99={percentile(latencies, 0.99):.0f}")
+    print(f"event-loop lag ms: p50={percentile(lags, 0.5):.1f} p99={percentile(lags, 0.99):.1f} max={max(lags, default=0):.1f}")
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    asyncio.run(run(logins, concurrency))
+
+if __name__ == "__main__":
+    main()
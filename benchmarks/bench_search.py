@@ -0,0 +1,99 @@
+"""
+Benchmark: full-text search over 1M tasks and comments.
+
+Usage: python -m benchmarks.bench_search [documents] [queries]
+
+Builds one board index (backend.search.BoardIndex) of `documents`
+synthetic documents (70% tasks with a title and description, 30% comments)
+whose words follow a Zipf distribution, then reports build time, index
+memory, the rate of incremental updates, and query latency for rare,
+common, multi-word and prefix queries. For comparison it also times the
+substring scan the board view used to do (over the titles and descriptions
+of every task) for the same words.
+"""
+import itertools
+import os
+import random
+import string
+import sys
+import time
+import resource
+
+os.environ["MONGO_URI"] = ""  # backend.search imports the database module
+
+from backend.search import BoardIndex, parse_query
+
+VOCABULARY = 50000
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+def make_words(rng):
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))))
+    return sorted(words, key=lambda w: rng.random())
+
+def make_documents(count, words, rng):
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    def text(n):
+        return " ".join(rng.choices(words, cum_weights=cumulative, k=n))
+    documents = []
+    for i in range(count):
+        if i % 10 < 7:
+            documents.append((f"t:{i}", str(i), text(rng.randint(3, 8)), text(rng.randint(0, 40))))
+        else:
+            documents.append((f"c:{i}", str(rng.randrange(i)), None, text(rng.randint(5, 30))))
+    return documents
+
+def time_queries(name, run, queries):
+    latencies = []
+    for q in queries:
+        started = time.perf_counter()
+        run(q)
+        latencies.append((time.perf_counter() - started) * 1000)
+    print(f"{name:<34} p50={percentile(latencies, 0.5):8.2f} ms  p99={percentile(latencies, 0.99):8.2f} ms")
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = random.Random(42)
+    words = make_words(rng)
+    documents = make_documents(count, words, rng)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    index = BoardIndex()
+    for key, task_id, title, body in documents:
+        index.put(key, task_id, title, body)
+    elapsed = time.perf_counter() - started
+    # Peak RSS growth (KiB on Linux), an upper bound of what the index holds
+    memory = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) * 1024
+    print(f"build: {count} documents in {elapsed:.1f}s ({count / elapsed:,.0f} docs/s), "
+          f"index ~{memory / 2**20:,.0f} MiB, {len(index.postings):,} words")
+
+    updates = [documents[rng.randrange(count)] for _ in range(10000)]
+    started = time.perf_counter()
+    for key, task_id, title, body in updates:
+        index.apply({"put": [[key, task_id, title, body]]})
+    elapsed = time.perf_counter() - started
+    print(f"incremental updates: {len(updates) / elapsed:,.0f}/s")
+
+    rare = [words[rng.randrange(5000, VOCABULARY)] for _ in range(queries)]
+    common = [words[rng.randrange(0, 20)] for _ in range(queries)]
+    pairs = [f"{words[rng.randrange(0, 200)]} {words[rng.randrange(1000, 20000)]}" for _ in range(queries)]
+    prefixes = [words[rng.randrange(0, 2000)][:3] for _ in range(queries)]
+    search = lambda q: index.search(parse_query(q), 20)
+    time_queries("rare word", search, rare)
+    time_queries("common word", search, common)
+    time_queries("common + rarer word", search, pairs)
+    time_queries("3-letter prefix", search, prefixes)
+
+    # What the board view did before: substring match over every task
+    tasks = [(title.lower(), (body or "").lower()) for key, _, title, body in documents if key.startswith("t:")]
+    scan = lambda q: [i for i, (title, body) in enumerate(tasks) if q in title or q in body]
+    time_queries("substring scan (rare word)", scan, rare[:max(1, queries // 20)])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: encoding a large board task list.
+
+Usage: python -m benchmarks.bench_serialization [tasks] [rounds]
+
+Builds `tasks` task documents shaped like the ones in ``tasks_collection`` and
+encodes them the previous way (a TaskResponse per row, then FastAPI's
+response_model validation and serialization and the default JSON encoder) and
+through ``backend.serializers`` (one dict per row, one orjson call). Reports
+rows/sec for both, and first checks that every fast row parses back into a
+TaskResponse and matches the Pydantic output field for field.
+"""
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from backend.models import TaskResponse
+from backend.serializers import dumps, orjson, task_row
+
+def make_tasks(count: int) -> List[dict]:
+    now = datetime.utcnow().replace(microsecond=123456)
+    statuses = ["todo", "in_progress", "completed"]
+    priorities = ["low", "medium", "high"]
+    board_id = str(ObjectId())
+    return [
+        {
+            "_id": ObjectId(),
+            "title": f"Task {i}: ship the thing",
+            "description": "Investigate the regression and write a fix" if i % 3 else None,
+            "board_id": board_id,
+            "assigned_to": str(ObjectId()) if i % 2 else None,
+            "status": statuses[i % 3],
+            "priority": priorities[i % 3],
+            "due_date": now + timedelta(days=i % 30) if i % 4 else None,
+            "created_by": str(ObjectId()),
+            "created_at": now - timedelta(seconds=i),
+            "updated_at": now,
+            "seq": i,
+        }
+        for i in range(count)
+    ]
+
+def pydantic_path(docs: List[dict], adapter: TypeAdapter) -> bytes:
+    """Row models -> response_model validation -> mode="json" dump -> json.dumps, as FastAPI does"""
+    models = [
+        TaskResponse(
+            id=str(t["_id"]),
+            title=t["title"],
+            description=t.get("description"),
+            board_id=t["board_id"],
+            assigned_to=t.get("assigned_to"),
+            status=t["status"],
+            priority=t["priority"],
+            due_date=t.get("due_date"),
+            created_by=t["created_by"],
+            created_at=t["created_at"],
+            updated_at=t["updated_at"]
+        )
+        for t in docs
+    ]
+    validated = adapter.validate_python(models)
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+def fast_path(docs: List[dict], adapter: TypeAdapter) -> bytes:
+    return dumps(task_row.many(docs))
+
+def check_equivalence(docs: List[dict], adapter: TypeAdapter):
+    slow = json.loads(pydantic_path(docs, adapter))
+    fast = json.loads(fast_path(docs, adapter))
+    assert len(slow) == len(fast)
+    for expected, row in zip(slow, fast):
+        assert row == expected, (row, expected)
+        TaskResponse.model_validate(row)
+
+def run(name: str, encode, docs: List[dict], adapter: TypeAdapter, rounds: int):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        body = encode(docs, adapter)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<10} {best * 1000:8.1f} ms  {len(docs) / best:12,.0f} rows/s  {len(body) / 1024:8.0f} KiB")
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    docs = make_tasks(count)
+    adapter = TypeAdapter(List[TaskResponse])
+    check_equivalence(docs, adapter)
+    print(f"{count} tasks, best of {rounds} (encoder: {'orjson' if orjson else 'json'})")
+    run("pydantic", pydantic_path, docs, adapter, rounds)
+    run("fast", fast_path, docs, adapter, rounds)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark: concurrent large attachment uploads next to live chat.
+
+Usage: python -m benchmarks.bench_upload [uploads] [megabytes] [legacy]
+
+Runs the FastAPI app in-process on the mock database (requires httpx) with
+uploads going to a temporary directory, and posts `uploads` concurrent
+attachments of `megabytes` MiB each (streamed to the app in 1 MiB pieces).
+Meanwhile a chat message is due every 10 ms, broadcast through a
+ConnectionManager to a connected socket. Reports upload throughput, chat
+delivery latency (from when each message was due) and how late a 10 ms
+event-loop heartbeat ran. Pass `legacy` to post to a copy of
+the previous endpoint (form-parsed UploadFile, blocking shutil.copyfileobj)
+instead of the streaming one.
+"""
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+os.environ["MONGO_URI"] = ""  # always benchmark against the in-memory mock
+os.chdir(tempfile.mkdtemp(prefix="bench_upload-"))  # the app writes to ./uploads
+
+import httpx
+from fastapi import File, UploadFile
+
+from backend.main import app
+from backend.pubsub import InProcessBus
+from backend.routers.chat import ConnectionManager
+
+PIECE = os.urandom(1024 * 1024)
+BOUNDARY = "benchboundary7MA4YWxkTrZu0gW"
+
+@app.post("/bench/legacy-upload")
+async def legacy_upload(file: UploadFile = File(...)):
+    """The previous upload path, for comparison"""
+    file_path = f"uploads/{uuid.uuid4()}{os.path.splitext(file.filename)[1]}"
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+    return {"file_size": os.path.getsize(file_path)}
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+async def multipart_body(megabytes: int):
+    yield (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.bin\"\r\n"
+           "Content-Type: application/octet-stream\r\n\r\n").encode()
+    for _ in range(megabytes):
+        yield PIECE
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+class ChatSocket:
+    """Fake WebSocket recording how long each chat message took to arrive"""
+    def __init__(self, latencies: list):
+        self.latencies = latencies
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000, reason: str | None = None):
+        pass
+
+    async def send_text(self, text: str):
+        message = json.loads(text)
+        if message.get("type") == "chat":
+            self.latencies.append((time.perf_counter() - message["sent"]) * 1000)
+
+    async def send_json(self, message: dict):
+        await self.send_text(json.dumps(message))
+
+async def chatter(manager, stop):
+    """A chat message due every 10 ms; latency is counted from when it was due, so loop stalls show up"""
+    due = time.perf_counter()
+    while not stop.is_set():
+        due += 0.01
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        await manager.broadcast("board", {"type": "chat", "message": "hi", "sent": due})
+
+async def heartbeat(lags, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append((time.perf_counter() - started - 0.01) * 1000)
+
+async def run(uploads, megabytes, legacy):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        credentials = {"email": "bench@example.com", "password": "benchmark"}
+        response = await client.post("/auth/signup", json={"username": "bench", "role": "admin", **credentials})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        team = (await client.post("/admin/teams", json={"name": "Bench team"}, headers=headers)).json()
+        board = (await client.post("/admin/boards", json={"name": "Bench board", "team_id": team["id"]}, headers=headers)).json()
+        task = (await client.post("/manager/tasks", json={"title": "Bench task", "board_id": board["id"]}, headers=headers)).json()
+        url = "/bench/legacy-upload" if legacy else f"/tasks/{task['id']}/attachments"
+        upload_headers = {**headers, "Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+
+        manager = ConnectionManager(InProcessBus())
+        chat_latencies, lags = [], []
+        await manager.connect(ChatSocket(chat_latencies), "board", "listener")
+
+        async def upload():
+            response = await client.post(url, content=multipart_body(megabytes), headers=upload_headers)
+            assert response.status_code == 200, response.text
+            assert response.json()["file_size"] == megabytes * len(PIECE)
+
+        stop = asyncio.Event()
+        background = [asyncio.create_task(chatter(manager, stop)), asyncio.create_task(heartbeat(lags, stop))]
+        started = time.perf_counter()
+        await asyncio.gather(*(upload() for _ in range(uploads)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*background)
+        await manager.disconnect("board", "listener")
+
+    print(f"{'legacy' if legacy else 'streaming'}: {uploads} uploads x {megabytes} MiB in {elapsed:.2f}s "
+          f"({uploads * megabytes / elapsed:.0f} MiB/s)")
+    print(f"chat delivery ms: p50={percentile(chat_latencies, 0.5):.1f} p99={percentile(chat_latencies, 0.99):.1f} "
+          f"max={max(chat_latencies, default=0):.1f} ({len(chat_latencies)} messages)")
+    print(f"event-loop lag ms: p50={percentile(lags, 0.5):.1f} p99={percentile(lags, 0.99):.1f} max={max(lags, default=0):.1f}")
+
+def main():
+    uploads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    megabytes = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    legacy = len(sys.argv) > 3 and sys.argv[3] == "legacy"
+    try:
+        asyncio.run(run(uploads, megabytes, legacy))
+    finally:
+        shutil.rmtree(os.getcwd(), ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
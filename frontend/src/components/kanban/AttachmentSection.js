@@ -1,16 +1,34 @@
 import React, { useState, useEffect, useRef } from 'react';
-import { tasksAPI, API_BASE_URL } from '../../services/api';
-import { Paperclip, File as FileIcon, Download, Image as ImageIcon } from 'lucide-react';
+import { tasksAPI } from '../../services/api';
+import { Paperclip, File as FileIcon, Download, Image as ImageIcon, Trash2 } from 'lucide-react';
 import { formatDistanceToNow } from 'date-fns';
 import toast from 'react-hot-toast';
 
-export const AttachmentSection = ({ taskId }) => {
-    const [attachments, setAttachments] = useState([]);
-    const [loading, setLoading] = useState(true);
+// Thumbnail <img> with a freshly issued link (links expire after a few minutes)
+const AttachmentThumbnail = ({ attachment }) => {
+    const [src, setSrc] = useState(null);
+
+    useEffect(() => {
+        let cancelled = false;
+        tasksAPI.getAttachmentLink(attachment.id)
+            .then(({ thumbnailUrl }) => { if (!cancelled) setSrc(thumbnailUrl); })
+            .catch((error) => console.error('Failed to load thumbnail link:', error));
+        return () => { cancelled = true; };
+    }, [attachment.id]);
+
+    if (!src) return <ImageIcon className="w-5 h-5" />;
+    return <img src={src} alt="" loading="lazy" className="w-full h-full object-cover" />;
+};
+
+export const AttachmentSection = ({ taskId, currentUserId, initialAttachments }) => {
+    const [attachments, setAttachments] = useState(initialAttachments || []);
+    const [loading, setLoading] = useState(!initialAttachments);
     const [uploading, setUploading] = useState(false);
     const fileInputRef = useRef(null);
 
     useEffect(() => {
+        // Already loaded by the parent (task detail request)
+        if (initialAttachments) return;
         loadAttachments();
         // eslint-disable-next-line react-hooks/exhaustive-deps
     }, [taskId]);
@@ -48,6 +66,19 @@ export const AttachmentSection = ({ taskId }) => {
         }
     };
 
+    const handleDelete = async (attachmentId) => {
+        if (!window.confirm('Are you sure you want to delete this attachment?')) return;
+
+        try {
+            await tasksAPI.deleteAttachment(taskId, attachmentId);
+            setAttachments(attachments.filter(a => a.id !== attachmentId));
+            toast.success('Attachment deleted');
+        } catch (error) {
+            console.error('Failed to delete attachment:', error);
+            toast.error('Failed to delete attachment');
+        }
+    };
+
     const formatFileSize = (bytes) => {
         if (bytes === 0) return '0 Bytes';
         const k = 1024;
@@ -58,6 +89,26 @@ export const AttachmentSection = ({ taskId }) => {
 
     const isImage = (fileType) => fileType.startsWith('image/');
 
+    const openAttachment = async (e, file, download = false) => {
+        e.preventDefault();
+        // Open the tab while still handling the click, or popup blockers stop it
+        const tab = download ? null : window.open('', '_blank');
+        try {
+            const { url } = await tasksAPI.getAttachmentLink(file.id, { download });
+            if (tab) {
+                tab.opener = null;
+                tab.location.href = url;
+            } else {
+                // Content-Disposition: attachment keeps this page in place
+                window.location.assign(url);
+            }
+        } catch (error) {
+            if (tab) tab.close();
+            console.error('Failed to open attachment:', error);
+            toast.error('Failed to open attachment');
+        }
+    };
+
     return (
         <div className="mt-6">
             <div className="flex items-center justify-between mb-4">
@@ -95,8 +146,10 @@ export const AttachmentSection = ({ taskId }) => {
                     attachments.map((file) => (
                         <div key={file.id} className="flex items-center justify-between p-3 bg-gray-50 dark:bg-gray-700/50 rounded-lg group">
                             <div className="flex items-center gap-3 overflow-hidden">
-                                <div className="flex-shrink-0 w-10 h-10 bg-gray-200 dark:bg-gray-600 rounded flex items-center justify-center text-gray-500 dark:text-gray-300">
-                                    {isImage(file.file_type) ? (
+                                <div className="flex-shrink-0 w-10 h-10 bg-gray-200 dark:bg-gray-600 rounded flex items-center justify-center text-gray-500 dark:text-gray-300 overflow-hidden">
+                                    {file.thumbnail_path ? (
+                                        <AttachmentThumbnail attachment={file} />
+                                    ) : isImage(file.file_type) ? (
                                         <ImageIcon className="w-5 h-5" />
                                     ) : (
                                         <FileIcon className="w-5 h-5" />
@@ -104,30 +157,37 @@ export const AttachmentSection = ({ taskId }) => {
                                 </div>
                                 <div className="min-w-0">
                                     <p className="text-sm font-medium text-gray-900 dark:text-white truncate">
-                                        <a
-                                            href={`${API_BASE_URL}${file.file_path}`}
-                                            target="_blank"
-                                            rel="noopener noreferrer"
-                                            className="hover:underline"
+                                        <button
+                                            type="button"
+                                            onClick={(e) => openAttachment(e, file)}
+                                            className="hover:underline truncate max-w-full text-left"
                                         >
                                             {file.filename}
-                                        </a>
+                                        </button>
                                     </p>
                                     <p className="text-xs text-gray-500 dark:text-gray-400">
                                         {formatFileSize(file.file_size)} • {formatDistanceToNow(new Date(file.created_at), { addSuffix: true })} • by {file.username}
                                     </p>
                                 </div>
                             </div>
-                            <div className="flex-shrink-0 ml-2">
-                                <a
-                                    href={`${API_BASE_URL}${file.file_path}`}
-                                    download={file.filename} // 'download' attribute only works for same-origin or if headers allow
-                                    target="_blank"
-                                    rel="noopener noreferrer"
+                            <div className="flex-shrink-0 ml-2 flex items-center gap-1">
+                                {currentUserId === file.user_id && (
+                                    <button
+                                        onClick={() => handleDelete(file.id)}
+                                        className="p-1.5 text-gray-400 hover:text-red-500 opacity-0 group-hover:opacity-100 transition-opacity rounded-full"
+                                        title="Delete attachment"
+                                    >
+                                        <Trash2 className="w-4 h-4" />
+                                    </button>
+                                )}
+                                <button
+                                    type="button"
+                                    onClick={(e) => openAttachment(e, file, true)}
+                                    title="Download"
                                     className="p-1.5 text-gray-400 hover:text-gray-600 dark:hover:text-gray-300 rounded-full hover:bg-gray-200 dark:hover:bg-gray-600 block"
                                 >
                                     <Download className="w-4 h-4" />
-                                </a>
+                                </button>
                             </div>
                         </div>
                     ))
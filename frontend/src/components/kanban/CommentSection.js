@@ -5,13 +5,15 @@ import { Send, MessageSquare, Trash2 } from 'lucide-react';
 import { formatDistanceToNow } from 'date-fns';
 import toast from 'react-hot-toast';
 
-export const CommentSection = ({ taskId, currentUserId }) => {
-    const [comments, setComments] = useState([]);
+export const CommentSection = ({ taskId, currentUserId, initialComments }) => {
+    const [comments, setComments] = useState(initialComments || []);
     const [newComment, setNewComment] = useState('');
-    const [loading, setLoading] = useState(true);
+    const [loading, setLoading] = useState(!initialComments);
     const [submitting, setSubmitting] = useState(false);
 
     useEffect(() => {
+        // Already loaded by the parent (task detail request)
+        if (initialComments) return;
         loadComments();
         // eslint-disable-next-line react-hooks/exhaustive-deps
     }, [taskId]);
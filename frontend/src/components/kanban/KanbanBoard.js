@@ -1,5 +1,5 @@
 // src/components/kanban/KanbanBoard.js
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import {
     DndContext,
     closestCorners,
@@ -15,21 +15,42 @@ import { KanbanColumn } from './KanbanColumn';
 import { SortableTask } from './SortableTask';
 import { TaskFilters } from './TaskFilters';
 import { TaskDetailModal } from './TaskDetailModal';
+import { tasksAPI } from '../../services/api';
 
 const COLUMNS = ['todo', 'in_progress', 'review', 'completed'];
 
-export const KanbanBoard = ({ tasks, onTaskDrop, currentUserId }) => {
+export const KanbanBoard = ({ tasks, boardId, onTaskDrop, currentUserId }) => {
     const [activeId, setActiveId] = useState(null);
     const [selectedTask, setSelectedTask] = useState(null);
     const [filterQuery, setFilterQuery] = useState('');
     const [filterPriority, setFilterPriority] = useState('all');
-
-    // Filter tasks
+    // Ids of the tasks the server search matched (titles, descriptions and comments); null = not available
+    const [searchMatches, setSearchMatches] = useState(null);
+
+    useEffect(() => {
+        setSearchMatches(null);
+        if (!boardId || !filterQuery.trim()) return;
+        let cancelled = false;
+        const timer = setTimeout(async () => {
+            try {
+                const response = await tasksAPI.search(filterQuery, boardId);
+                if (!cancelled) setSearchMatches(new Set(response.data.map(hit => hit.task_id)));
+            } catch (error) {
+                console.error('Search failed:', error);
+            }
+        }, 250);
+        return () => {
+            cancelled = true;
+            clearTimeout(timer);
+        };
+    }, [filterQuery, boardId]);
+
+    // Filter tasks (by title/description substring until the search results arrive)
     const filteredTasks = tasks.filter(task => {
-        const matchesQuery = (
+        const matchesQuery = !filterQuery.trim() || (searchMatches ? searchMatches.has(task.id) : (
             task.title.toLowerCase().includes(filterQuery.toLowerCase()) ||
             (task.description && task.description.toLowerCase().includes(filterQuery.toLowerCase()))
-        );
+        ));
         const matchesPriority = filterPriority === 'all' || task.priority === filterPriority;
         return matchesQuery && matchesPriority;
     });
@@ -1,14 +1,31 @@
-import React from 'react';
+import React, { useState, useEffect } from 'react';
 import { X, Calendar, Clock } from 'lucide-react';
 import { Avatar } from '../Avatar';
 import { format } from 'date-fns';
 import { CommentSection } from './CommentSection';
 import { AttachmentSection } from './AttachmentSection';
+import { tasksAPI } from '../../services/api';
 
 export const TaskDetailModal = ({ task, isOpen, onClose, currentUserId }) => {
-    if (!isOpen || !task) return null;
+    // Comments and attachments arrive together; null until loaded
+    const [detail, setDetail] = useState(null);
+    const taskId = isOpen && task ? task.id : null;
+
+    useEffect(() => {
+        setDetail(null);
+        if (!taskId) return;
+        let cancelled = false;
+        tasksAPI.getTaskDetail(taskId)
+            .then((response) => { if (!cancelled) setDetail(response.data); })
+            .catch((error) => {
+                console.error('Failed to load task detail:', error);
+                // Let the sections fall back to loading on their own
+                if (!cancelled) setDetail({ comments: undefined, attachments: undefined });
+            });
+        return () => { cancelled = true; };
+    }, [taskId]);
 
-    // We will add state for comments and attachments later
+    if (!isOpen || !task) return null;
 
     return (
         <div className="fixed inset-0 z-50 overflow-y-auto" aria-labelledby="modal-title" role="dialog" aria-modal="true">
@@ -101,8 +118,16 @@ export const TaskDetailModal = ({ task, isOpen, onClose, currentUserId }) => {
 
                         {/* Comments & Attachments */}
                         <div className="border-t border-gray-200 dark:border-gray-700 pt-6">
-                            <AttachmentSection taskId={task.id} />
-                            <CommentSection taskId={task.id} currentUserId={currentUserId} />
+                            {detail ? (
+                                <>
+                                    <AttachmentSection taskId={task.id} currentUserId={currentUserId} initialAttachments={detail.attachments} />
+                                    <CommentSection taskId={task.id} currentUserId={currentUserId} initialComments={detail.comments} />
+                                </>
+                            ) : (
+                                <div className="flex justify-center py-6">
+                                    <div className="animate-spin rounded-full h-6 w-6 border-b-2 border-indigo-600"></div>
+                                </div>
+                            )}
                         </div>
                     </div>
                 </div>
@@ -10,6 +10,8 @@ import {
 } from 'lucide-react';
 import { ThemeToggle } from '../components/ThemeToggle';
 
+const USERS_PAGE_SIZE = 100;
+
 const AdminPanel = () => {
   const { isAdmin } = useAuth();
   const navigate = useNavigate();
@@ -17,6 +19,7 @@ const AdminPanel = () => {
   const [teams, setTeams] = useState([]);
   const [boards, setBoards] = useState([]);
   const [users, setUsers] = useState([]);
+  const [usersCursor, setUsersCursor] = useState(null);
   const [loading, setLoading] = useState(true);
 
   // Modal states
@@ -45,11 +48,12 @@ const AdminPanel = () => {
       const [teamsRes, boardsRes, usersRes] = await Promise.all([
         adminAPI.getTeams(),
         adminAPI.getBoards(),
-        adminAPI.getUsers()
+        adminAPI.getUsers({ limit: USERS_PAGE_SIZE })
       ]);
       setTeams(teamsRes.data);
       setBoards(boardsRes.data);
       setUsers(usersRes.data);
+      setUsersCursor(usersRes.headers['x-next-cursor'] || null);
     } catch (error) {
       toast.error('Failed to load admin data');
     } finally {
@@ -57,6 +61,16 @@ const AdminPanel = () => {
     }
   };
 
+  const loadMoreUsers = async () => {
+    try {
+      const response = await adminAPI.getUsers({ limit: USERS_PAGE_SIZE, cursor: usersCursor });
+      setUsers(prev => [...prev, ...response.data]);
+      setUsersCursor(response.headers['x-next-cursor'] || null);
+    } catch (error) {
+      toast.error('Failed to load more users');
+    }
+  };
+
   const handleCreateTeam = async (e) => {
     e.preventDefault();
     try {
@@ -202,7 +216,7 @@ const AdminPanel = () => {
                 }`}
             >
               <Shield className="w-5 h-5" />
-              Users ({users.length})
+              Users ({users.length}{usersCursor ? '+' : ''})
             </button>
           </div>
         </div>
@@ -353,6 +367,16 @@ const AdminPanel = () => {
                 </tbody>
               </table>
             </div>
+            {usersCursor && (
+              <div className="flex justify-center mt-4">
+                <button
+                  onClick={loadMoreUsers}
+                  className="px-4 py-2 text-sm bg-gray-100 text-gray-700 rounded-lg hover:bg-gray-200 transition"
+                >
+                  Load more users
+                </button>
+              </div>
+            )}
           </div>
         )}
       </div>
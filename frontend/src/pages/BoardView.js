@@ -22,7 +22,10 @@ const BoardView = () => {
   const [newMessage, setNewMessage] = useState('');
   const [ws, setWs] = useState(null);
   const [onlineUsers, setOnlineUsers] = useState([]);
+  const [olderCursor, setOlderCursor] = useState(null);
   const messagesEndRef = useRef(null);
+  // Last board version reflected in `tasks`; task_event frames carry the next one
+  const boardVersionRef = useRef(0);
 
   useEffect(() => {
     loadBoards();
@@ -32,6 +35,8 @@ const BoardView = () => {
   useEffect(() => {
     if (boardId) {
       loadBoardData();
+      // The board socket carries task events as well as chat, so open it right away
+      connectToChat();
     }
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [boardId]);
@@ -67,6 +72,9 @@ const BoardView = () => {
         tasksAPI.getBoardDetails(boardId),
         tasksAPI.getBoardTasks(boardId)
       ]);
+      // The version the task list was read at (its first page; later pages can only be newer),
+      // not the details' version, which may already include changes the list is missing
+      boardVersionRef.current = Number(tasksRes.headers['x-board-version']) || 0;
       setBoard(boardRes.data);
       setTasks(tasksRes.data);
     } catch (error) {
@@ -80,13 +88,16 @@ const BoardView = () => {
 
     websocket.onopen = () => {
       console.log('Connected to chat');
-      toast.success('Connected to board chat');
     };
 
     websocket.onmessage = (event) => {
       const data = JSON.parse(event.data);
 
-      if (data.type === 'chat') {
+      if (data.type === 'history') {
+        // Sent on every (re)connect: replaces what we had, no extra request needed
+        setMessages(data.messages);
+        setOlderCursor(data.messages.length > 0 ? data.messages[0].id : null);
+      } else if (data.type === 'chat') {
         setMessages(prev => [...prev, data]);
       } else if (data.type === 'system') {
         setMessages(prev => [...prev, data]);
@@ -104,13 +115,25 @@ const BoardView = () => {
           timestamp: data.timestamp
         }]);
         loadOnlineUsers();
+      } else if (data.type === 'task_event') {
+        applyTaskEvent(data);
+        if (data.op === 'skipped') {
+          return;
+        }
+        setMessages(prev => [...prev, {
+          type: 'system',
+          message: data.op === 'bulk'
+            ? `${data.username} changed ${data.events.length} tasks`
+            : `${data.username} ${data.op} a task`,
+          timestamp: data.timestamp
+        }]);
       } else if (data.type === 'task_update') {
+        // Sent by older clients; the matching task_event already updated the board
         setMessages(prev => [...prev, {
           type: 'system',
           message: `${data.username} ${data.action} a task`,
           timestamp: data.timestamp
         }]);
-        loadBoardData();
       }
     };
 
@@ -127,6 +150,59 @@ const BoardView = () => {
     loadOnlineUsers();
   };
 
+  const applyTaskEvent = (event) => {
+    if (event.version <= boardVersionRef.current) {
+      return; // already part of the snapshot we loaded
+    }
+    if (event.version !== boardVersionRef.current + 1) {
+      // Missed an event (e.g. while reconnecting): fetch what changed since our version
+      syncTasks();
+      return;
+    }
+    boardVersionRef.current = event.version;
+    if (event.op === 'skipped') {
+      return; // the write that took this version failed
+    }
+    // A bulk event carries several changes under one version
+    const changes = event.op === 'bulk' ? event.events : [event];
+    setTasks(prev => changes.reduce(applyTaskChange, prev));
+  };
+
+  const applyTaskChange = (tasks, change) => {
+    if (change.op === 'deleted') {
+      return tasks.filter(t => t.id !== change.task_id);
+    }
+    if (change.op === 'created') {
+      return [...tasks.filter(t => t.id !== change.task_id), change.changes];
+    }
+    return tasks.map(t => (t.id === change.task_id ? { ...t, ...change.changes } : t));
+  };
+
+  const syncTasks = async () => {
+    try {
+      const { data: delta } = await tasksAPI.getBoardTasks(boardId, boardVersionRef.current);
+      boardVersionRef.current = delta.version;
+      if (delta.full) {
+        setTasks(delta.tasks);
+        return;
+      }
+      const replaced = new Set([...delta.deleted, ...delta.tasks.map(t => t.id)]);
+      setTasks(prev => [...prev.filter(t => !replaced.has(t.id)), ...delta.tasks]);
+    } catch (error) {
+      loadBoardData();
+    }
+  };
+
+  const loadOlderMessages = async () => {
+    try {
+      const response = await chatAPI.getMessages(boardId, olderCursor);
+      setMessages(prev => [...response.data.messages, ...prev]);
+      setOlderCursor(response.data.next_before);
+    } catch (error) {
+      toast.error('Failed to load older messages');
+    }
+  };
+
   const loadOnlineUsers = async () => {
     try {
       const response = await chatAPI.getOnlineUsers(boardId);
@@ -152,17 +228,7 @@ const BoardView = () => {
     try {
       await tasksAPI.updateTaskStatus(taskId, newStatus);
       toast.success('Task status updated');
-      loadBoardData();
-
-      // Notify via WebSocket
-      if (ws) {
-        ws.send(JSON.stringify({
-          type: 'task_update',
-          task_id: taskId,
-          action: 'updated',
-          details: { status: newStatus }
-        }));
-      }
+      // The server pushes a task_event to everyone on the board, including us
     } catch (error) {
       toast.error(error.response?.data?.detail || 'Failed to update task');
     }
@@ -207,9 +273,6 @@ const BoardView = () => {
                 <button
                   onClick={() => {
                     setShowChat(!showChat);
-                    if (!showChat && !ws) {
-                      connectToChat();
-                    }
                   }}
                   className={`flex items-center gap-2 px-4 py-2 rounded-lg transition ${showChat
                     ? 'bg-indigo-600 text-white'
@@ -248,6 +311,7 @@ const BoardView = () => {
         {/* Kanban Board */}
         <KanbanBoard
           tasks={tasks}
+          boardId={boardId}
           onTaskDrop={handleTaskStatusUpdate}
           currentUserId={user.id}
         />
@@ -264,6 +328,14 @@ const BoardView = () => {
           </div>
 
           <div className="flex-1 overflow-y-auto p-4 space-y-4">
+            {olderCursor && (
+              <button
+                onClick={loadOlderMessages}
+                className="w-full text-center text-xs text-indigo-600 dark:text-indigo-400 hover:underline"
+              >
+                Load older messages
+              </button>
+            )}
             {messages.map((msg, idx) => (
               <div key={idx}>
                 {msg.type === 'system' ? (
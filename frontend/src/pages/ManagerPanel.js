@@ -61,7 +61,7 @@ const ManagerPanel = () => {
 
   const loadUsers = async () => {
     try {
-      const response = await adminAPI.getUsers();
+      const response = await adminAPI.getAllUsers();
       setUsers(response.data);
     } catch (error) {
       console.error('Failed to load users');
@@ -41,6 +41,21 @@ api.interceptors.response.use(
   }
 );
 
+// List endpoints return one page (100 rows unless `limit` is given) and put the
+// next page's cursor in the X-Next-Cursor header. This follows the cursors and
+// resolves like a single response whose `data` holds every row.
+const getAllPages = async (url, params = {}) => {
+  const first = await api.get(url, { params });
+  const data = [...first.data];
+  let cursor = first.headers['x-next-cursor'];
+  while (cursor) {
+    const page = await api.get(url, { params: { ...params, cursor } });
+    data.push(...page.data);
+    cursor = page.headers['x-next-cursor'];
+  }
+  return { ...first, data };
+};
+
 // Auth API endpoints
 export const authAPI = {
   signup: (data) => api.post('/auth/signup', data),
@@ -51,18 +66,20 @@ export const authAPI = {
 // Admin API endpoints
 export const adminAPI = {
   // Teams
-  getTeams: () => api.get('/admin/teams'),
+  getTeams: (params) => getAllPages('/admin/teams', params),
   createTeam: (data) => api.post('/admin/teams', data),
   deleteTeam: (id) => api.delete(`/admin/teams/${id}`),
 
   // Boards
-  getBoards: () => api.get('/admin/boards'),
+  getBoards: (params) => getAllPages('/admin/boards', params),
   createBoard: (data) => api.post('/admin/boards', data),
   updateBoard: (id, data) => api.put(`/admin/boards/${id}`, data),
   deleteBoard: (id) => api.delete(`/admin/boards/${id}`),
 
   // Users
-  getUsers: () => api.get('/admin/users'),
+  // params: { limit, cursor, fields }; the next cursor comes back in the X-Next-Cursor header
+  getUsers: (params) => api.get('/admin/users', { params }),
+  getAllUsers: (params) => getAllPages('/admin/users', params),
   updateUserRole: (id, role) => api.put(`/admin/users/${id}/role`, { role }),
   deleteUser: (id) => api.delete(`/admin/users/${id}`),
 };
@@ -71,35 +88,54 @@ export const adminAPI = {
 export const managerAPI = {
   // Tasks
   createTask: (data) => api.post('/manager/tasks', data),
-  getBoardTasks: (boardId) => api.get(`/manager/boards/${boardId}/tasks`),
+  getBoardTasks: (boardId, since) => (since === undefined
+    ? getAllPages(`/manager/boards/${boardId}/tasks`)
+    : api.get(`/manager/boards/${boardId}/tasks`, { params: { since } })),
   updateTask: (id, data) => api.put(`/manager/tasks/${id}`, data),
   deleteTask: (id) => api.delete(`/manager/tasks/${id}`),
   assignTask: (taskId, userId) => api.put(`/manager/tasks/${taskId}/assign`, { user_id: userId }),
+  // items: [{ op: 'create' | 'update' | 'delete', task_id?, ...fields }]
+  bulkTasks: (boardId, items) => api.post('/manager/tasks/bulk', { board_id: boardId, items }),
 };
 
 // Tasks API endpoints
 export const tasksAPI = {
-  getMyTasks: () => api.get('/tasks/my-tasks'),
-  getBoardTasks: (boardId) => api.get(`/tasks/boards/${boardId}/tasks`),
+  getMyTasks: (params) => getAllPages('/tasks/my-tasks', params),
+  getBoardTasks: (boardId, since) => (since === undefined
+    ? getAllPages(`/tasks/boards/${boardId}/tasks`)
+    : api.get(`/tasks/boards/${boardId}/tasks`, { params: { since } })),
   getTask: (id) => api.get(`/tasks/${id}`),
+  // Task plus its comments/attachments/activity in one request
+  getTaskDetail: (id, include = 'comments,attachments') => api.get(`/tasks/${id}/detail`, { params: { include } }),
   updateTaskStatus: (taskId, status) => api.put(`/tasks/${taskId}/status`, { status }),
 
   // Comments
-  getComments: (taskId) => api.get(`/tasks/${taskId}/comments`),
+  getComments: (taskId) => getAllPages(`/tasks/${taskId}/comments`),
   createComment: (taskId, content) => api.post(`/tasks/${taskId}/comments`, { task_id: taskId, content }),
   deleteComment: (taskId, commentId) => api.delete(`/tasks/${taskId}/comments/${commentId}`),
 
   // Attachments
-  getAttachments: (taskId) => api.get(`/tasks/${taskId}/attachments`),
+  getAttachments: (taskId) => getAllPages(`/tasks/${taskId}/attachments`),
   uploadAttachment: (taskId, formData) => api.post(`/tasks/${taskId}/attachments`, formData),
+  deleteAttachment: (taskId, attachmentId) => api.delete(`/tasks/${taskId}/attachments/${attachmentId}`),
+  // URLs for <a>/<img>, which cannot send the Authorization header: they carry a
+  // short-lived token that only opens this attachment, so fetch them right before use
+  getAttachmentLink: async (attachmentId, { download = false, size = 160 } = {}) => {
+    const { data } = await api.get(`/tasks/attachments/${attachmentId}/link`);
+    return {
+      url: `${API_BASE_URL}${data.url}${download ? '&download=1' : ''}`,
+      thumbnailUrl: data.thumbnail_url ? `${API_BASE_URL}${data.thumbnail_url}&size=${size}` : null,
+    };
+  },
 
   getMyBoards: () => api.get('/tasks/my-boards'),
   getBoardDetails: (id) => api.get(`/tasks/boards/${id}`),
+  search: (q, boardId, limit = 100) => api.get('/tasks/search', { params: { q, board_id: boardId, limit } }),
 };
 
 // Users API endpoints
 export const usersAPI = {
-  getAll: () => api.get('/users'),
+  getAll: (params) => getAllPages('/users', params),
   getById: (id) => api.get(`/users/${id}`),
   update: (id, data) => api.put(`/users/${id}`, data),
   delete: (id) => api.delete(`/users/${id}`),
@@ -108,6 +144,7 @@ export const usersAPI = {
 // Chat API endpoints
 export const chatAPI = {
   getOnlineUsers: (boardId) => api.get(`/chat/boards/${boardId}/online-users`),
+  getMessages: (boardId, before) => api.get(`/chat/boards/${boardId}/messages`, { params: { before } }),
   connectToBoard: (boardId, token) => {
     const protocol = API_BASE_URL.startsWith('https') ? 'wss' : 'ws';
     const host = API_BASE_URL.replace(/^https?:\/\//, '');
@@ -118,7 +155,7 @@ export const chatAPI = {
 
 // Activity API endpoints
 export const activityAPI = {
-  getRecentActivity: () => api.get('/activity/'),
+  getRecentActivity: (params) => api.get('/activity/', { params }),
 };
 
 export default api;
\ No newline at end of file
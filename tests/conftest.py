@@ -0,0 +1,4 @@
+import os
+
+# Run against the in-memory mock database, never a configured MongoDB
+os.environ["MONGO_URI"] = ""
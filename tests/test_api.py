@@ -0,0 +1,173 @@
+"""
+End-to-end behaviour of the task endpoints that clients depend on for
+staying in sync: keyset pages that neither skip nor repeat rows while tasks
+are inserted, ``?since=`` deltas that report deletes, bulk requests whose
+items fail independently, and streamed uploads with Range downloads.
+"""
+import functools
+import os
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from backend.database import tasks_collection
+from backend import uploads
+
+@pytest.fixture(scope="module")
+def api(tmp_path_factory):
+    """A client signed in as an admin; runs in a temp dir, which holds the upload store"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(tmp_path_factory.mktemp("api"))
+        os.makedirs(uploads.UPLOAD_DIR, exist_ok=True)
+        from backend.main import app
+        with TestClient(app) as client:
+            r = client.post("/auth/signup", json={
+                "username": "api_admin", "email": "api_admin@example.com", "password": "secret123", "role": "admin"
+            })
+            assert r.status_code == 200, r.text
+            client.headers["Authorization"] = f"Bearer {r.json()['access_token']}"
+            client.user_id = r.json()["user"]["id"]
+            yield client
+
+@pytest.fixture
+def board_id(api):
+    team = api.post("/admin/teams", json={"name": f"team {ObjectId()}"}).json()
+    board = api.post("/admin/boards", json={"name": "board", "team_id": team["id"], "member_ids": [api.user_id]})
+    assert board.status_code == 200, board.text
+    return board.json()["id"]
+
+def create_task(api, board_id, title):
+    r = api.post("/manager/tasks", json={"title": title, "board_id": board_id})
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+def task_doc(api, board_id, title, created_at):
+    """A task as the create endpoint stores it, with a chosen creation time"""
+    return {
+        "board_id": board_id, "title": title, "description": None, "assigned_to": None, "status": "todo",
+        "priority": "medium", "due_date": None, "created_by": api.user_id, "created_at": created_at, "updated_at": created_at
+    }
+
+def titles(rows):
+    return [row["title"] for row in rows]
+
+# -----------------------
+# Pagination
+# -----------------------
+def test_pages_continue_across_inserts(api, board_id):
+    # Equal created_at values are ordered by _id, so ties cannot split or repeat across pages
+    same_time = datetime(2026, 1, 1, 12, 0)
+    tasks_collection.collection.insert_many([task_doc(api, board_id, f"tie {i}", same_time) for i in range(3)])
+    for i in range(3):
+        create_task(api, board_id, f"task {i}")
+
+    r = api.get(f"/tasks/boards/{board_id}/tasks", params={"limit": 2})
+    seen = titles(r.json())
+    assert seen == ["tie 0", "tie 1"]
+    # Rows inserted behind the cursor (older) and ahead of it (newer) while paging
+    tasks_collection.collection.insert_one(task_doc(api, board_id, "old", datetime(2025, 1, 1)))
+    create_task(api, board_id, "new")
+
+    cursor = r.headers["X-Next-Cursor"]
+    while cursor:
+        r = api.get(f"/tasks/boards/{board_id}/tasks", params={"limit": 2, "cursor": cursor})
+        assert r.status_code == 200, r.text
+        seen += titles(r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+    assert seen == ["tie 0", "tie 1", "tie 2", "task 0", "task 1", "task 2", "new"]
+
+def test_invalid_cursor_is_rejected(api, board_id):
+    assert api.get(f"/tasks/boards/{board_id}/tasks", params={"cursor": "not-a-cursor"}).status_code == 400
+
+# -----------------------
+# Delta sync
+# -----------------------
+def test_delta_after_a_delete_carries_a_tombstone(api, board_id):
+    kept = create_task(api, board_id, "kept")
+    gone = create_task(api, board_id, "gone")
+    r = api.get(f"/tasks/boards/{board_id}/tasks")
+    version = int(r.headers["X-Board-Version"])
+
+    assert api.delete(f"/manager/tasks/{gone}").status_code == 200
+    assert api.put(f"/manager/tasks/{kept}", json={"title": "kept renamed"}).status_code == 200
+
+    delta = api.get(f"/tasks/boards/{board_id}/tasks", params={"since": version}).json()
+    assert delta["version"] == version + 2 and not delta["full"]
+    assert delta["deleted"] == [gone]
+    assert titles(delta["tasks"]) == ["kept renamed"]
+
+    caught_up = api.get(f"/tasks/boards/{board_id}/tasks", params={"since": delta["version"]}).json()
+    assert caught_up == {"version": delta["version"], "full": False, "tasks": [], "deleted": []}
+
+def test_delta_from_the_future_returns_everything(api, board_id):
+    create_task(api, board_id, "only")
+    delta = api.get(f"/tasks/boards/{board_id}/tasks", params={"since": 1000}).json()
+    assert delta["full"] and titles(delta["tasks"]) == ["only"]
+
+# -----------------------
+# Bulk
+# -----------------------
+def test_bulk_items_fail_independently(api, board_id):
+    moved = create_task(api, board_id, "to move")
+    removed = create_task(api, board_id, "to remove")
+    version = int(api.get(f"/tasks/boards/{board_id}/tasks").headers["X-Board-Version"])
+
+    r = api.post("/manager/tasks/bulk", json={"board_id": board_id, "items": [
+        {"op": "create", "title": "bulk new"},
+        {"op": "update", "task_id": str(ObjectId()), "status": "completed"},
+        {"op": "update", "task_id": moved, "status": "in_progress"},
+        {"op": "delete", "task_id": removed},
+    ]})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert [result["ok"] for result in body["results"]] == [True, False, True, True]
+    assert body["results"][1]["error"] == "Task not found"
+    # Everything applied shares one version
+    assert body["version"] == version + 1
+
+    delta = api.get(f"/tasks/boards/{board_id}/tasks", params={"since": version}).json()
+    assert delta["deleted"] == [removed]
+    assert sorted(titles(delta["tasks"])) == ["bulk new", "to move"]
+    stats = api.get(f"/tasks/boards/{board_id}").json()["stats"]
+    assert stats["total_tasks"] == 2 and stats["by_status"] == {"todo": 1, "in_progress": 1}
+
+def test_bulk_with_only_failures_keeps_the_version(api, board_id):
+    version = int(api.get(f"/tasks/boards/{board_id}/tasks").headers["X-Board-Version"])
+    r = api.post("/manager/tasks/bulk", json={"board_id": board_id, "items": [
+        {"op": "delete", "task_id": str(ObjectId())},
+        {"op": "create", "title": "assigned away", "assigned_to": str(ObjectId())},
+    ]})
+    assert [result["ok"] for result in r.json()["results"]] == [False, False]
+    assert r.json()["version"] == version
+
+# -----------------------
+# Uploads and downloads
+# -----------------------
+def stored_files():
+    return [os.path.join(root, name) for root, _, names in os.walk(uploads.UPLOAD_DIR) for name in names]
+
+def test_upload_over_the_file_limit_is_rejected_and_cleaned_up(api, board_id, monkeypatch):
+    monkeypatch.setattr("backend.routers.tasks.receive_upload", functools.partial(uploads.receive_upload, max_file_bytes=1000))
+    task_id = create_task(api, board_id, "with file")
+    before = stored_files()
+    r = api.post(f"/tasks/{task_id}/attachments", files={"file": ("big.bin", b"x" * 5000, "application/octet-stream")})
+    assert r.status_code == 413
+    assert stored_files() == before
+    assert api.get(f"/tasks/{task_id}/attachments").json() == []
+
+def test_range_download(api, board_id):
+    task_id = create_task(api, board_id, "with file")
+    content = bytes(range(256)) * 4
+    r = api.post(f"/tasks/{task_id}/attachments", files={"file": ("data.bin", content, "application/octet-stream")})
+    assert r.status_code == 200, r.text
+    url = f"/tasks/attachments/{r.json()['id']}/download"
+
+    full = api.get(url)
+    assert full.status_code == 200 and full.content == content
+    part = api.get(url, headers={"Range": "bytes=100-199"})
+    assert part.status_code == 206
+    assert part.content == content[100:200]
+    assert part.headers["Content-Range"] == f"bytes 100-199/{len(content)}"
+    assert api.get(url, headers={"Range": f"bytes={len(content)}-"}).status_code == 416
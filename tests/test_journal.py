@@ -0,0 +1,77 @@
+"""
+A journaled mock collection comes back from a crash with every completed
+write, and with documents equal to the ones it held before.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+from backend.database import _MockCollection
+from backend.journal import CollectionJournal
+
+def open_collection(directory, snapshot_every=10000):
+    return _MockCollection(indexes=["board_id"], journal=CollectionJournal(str(directory), "tasks", snapshot_every))
+
+def contents(collection):
+    return sorted(collection.find({}), key=lambda doc: doc["_id"])
+
+def crash(collection):
+    """Drop the process's hold on the files without snapshotting, as a kill would"""
+    collection._journal.close()
+
+def write_some(collection):
+    ids = [ObjectId() for _ in range(5)]
+    for i, doc_id in enumerate(ids):
+        collection.insert_one({
+            "_id": doc_id, "board_id": "b1", "n": i, "tags": ["x", "y"],
+            "created_at": datetime(2026, 1, 2, 3, 4, 5, 123456) + timedelta(minutes=i),
+        })
+    collection.update_one({"_id": ids[1]}, {"$set": {"n": 10, "seen": {"at": datetime(2026, 1, 3, tzinfo=timezone.utc)}}})
+    collection.update_many({"board_id": "b1"}, {"$inc": {"n": 1}})
+    collection.delete_one({"_id": ids[2]})
+    return ids
+
+@pytest.mark.parametrize("snapshot_every", [10000, 3], ids=["log-only", "with-snapshots"])
+def test_replay_restores_what_was_written(tmp_path, snapshot_every):
+    collection = open_collection(tmp_path, snapshot_every)
+    write_some(collection)
+    before = contents(collection)
+    crash(collection)
+
+    restored = open_collection(tmp_path, snapshot_every)
+    assert contents(restored) == before
+    # Indexes are rebuilt from the replayed documents
+    assert len(list(restored.find({"board_id": "b1"}))) == 4
+
+def test_a_torn_last_record_is_dropped(tmp_path):
+    collection = open_collection(tmp_path)
+    write_some(collection)
+    before = contents(collection)
+    crash(collection)
+    with open(tmp_path / "tasks.wal", "ab") as wal:
+        wal.write(b"\x01\x02\x03\x04\x40\x00\x00\x00partial")
+
+    restored = open_collection(tmp_path)
+    assert contents(restored) == before
+    # The tail was cut, so new writes replay after a second restart
+    restored.insert_one({"_id": ObjectId(), "board_id": "b2", "n": 0})
+    crash(restored)
+    assert len(contents(open_collection(tmp_path))) == len(before) + 1
+
+def test_datetimes_are_stored_as_they_replay(tmp_path):
+    """Millisecond, naive UTC in memory too, so a restart changes no value or ordering"""
+    collection = open_collection(tmp_path)
+    ids = write_some(collection)
+    stored = collection.find_one({"_id": ids[1]})
+    assert stored["created_at"] == datetime(2026, 1, 2, 3, 5, 5, 123000)
+    assert stored["seen"]["at"] == datetime(2026, 1, 3)
+    crash(collection)
+    assert open_collection(tmp_path).find_one({"_id": ids[1]}) == stored
+
+def test_a_second_process_cannot_open_a_journal_in_use(tmp_path):
+    first = open_collection(tmp_path)
+    with pytest.raises(RuntimeError, match="in use"):
+        open_collection(tmp_path)
+    crash(first)
+    open_collection(tmp_path)
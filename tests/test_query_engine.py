@@ -0,0 +1,236 @@
+"""
+The compiled filters of the mock database agree with a plain, uncompiled
+reading of the Mongo rules, hash-index candidate selection returns what a
+full scan returns, and update operators change documents as Mongo would.
+"""
+import copy
+import operator
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from backend.database import _MockCollection
+from backend.query_engine import apply_update, compile_filter, upsert_seed
+
+# -----------------------
+# Reference matcher
+# -----------------------
+def resolve(doc, path):
+    """Every value a dotted path reaches; arrays contribute themselves and their elements"""
+    values = [doc]
+    for part in path.split("."):
+        reached = []
+        for value in values:
+            if isinstance(value, dict) and part in value:
+                reached.append(value[part])
+            elif isinstance(value, list):
+                reached.extend(item[part] for item in value if isinstance(item, dict) and part in item)
+        values = reached
+    expanded = []
+    for value in values:
+        expanded.append(value)
+        if isinstance(value, list):
+            expanded.extend(value)
+    return expanded
+
+def kind(value):
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return "number"
+    return type(value).__name__
+
+def equals(values, target):
+    if target is None:
+        return not values or any(value is None for value in values)
+    return any(value == target for value in values)
+
+COMPARISONS = {"$gt": operator.gt, "$gte": operator.ge, "$lt": operator.lt, "$lte": operator.le}
+
+def field_matches(values, spec):
+    if not (isinstance(spec, dict) and spec and all(key.startswith("$") for key in spec)):
+        return equals(values, spec)
+    for op, arg in spec.items():
+        if op == "$eq":
+            ok = equals(values, arg)
+        elif op == "$ne":
+            ok = not equals(values, arg)
+        elif op in COMPARISONS:
+            ok = any(kind(value) == kind(arg) and COMPARISONS[op](value, arg) for value in values)
+        elif op == "$in":
+            ok = any(equals(values, option) for option in arg)
+        elif op == "$nin":
+            ok = not any(equals(values, option) for option in arg)
+        elif op == "$exists":
+            ok = bool(values) == arg
+        else:
+            raise AssertionError(op)
+        if not ok:
+            return False
+    return True
+
+def matches(doc, flt):
+    for key, spec in flt.items():
+        if key == "$and":
+            ok = all(matches(doc, sub) for sub in spec)
+        elif key == "$or":
+            ok = any(matches(doc, sub) for sub in spec)
+        elif key == "$nor":
+            ok = not any(matches(doc, sub) for sub in spec)
+        else:
+            ok = field_matches(resolve(doc, key), spec)
+        if not ok:
+            return False
+    return True
+
+# -----------------------
+# Fixtures
+# -----------------------
+START = datetime(2026, 1, 1)
+
+def make_docs(count=300, seed=7):
+    rng = random.Random(seed)
+    docs = []
+    for _ in range(count):
+        doc = {"_id": ObjectId(), "board_id": rng.choice(["b1", "b2", "b3"])}
+        choice = rng.random()
+        if choice < 0.6:
+            doc["n"] = rng.randint(0, 9)
+        elif choice < 0.7:
+            doc["n"] = rng.randint(0, 9) + 0.5
+        elif choice < 0.8:
+            doc["n"] = None
+        elif choice < 0.9:
+            doc["n"] = str(rng.randint(0, 9))
+        if rng.random() < 0.7:
+            doc["tags"] = rng.sample(["a", "b", "c", "d"], rng.randint(0, 3))
+        if rng.random() < 0.6:
+            doc["meta"] = {"level": rng.randint(0, 3), "owner": rng.choice(["ann", "bob", None])}
+        if rng.random() < 0.5:
+            doc["items"] = [{"k": rng.randint(0, 4)} for _ in range(rng.randint(0, 3))]
+        doc["done"] = rng.random() < 0.3
+        doc["due"] = START + timedelta(days=rng.randint(0, 30)) if rng.random() < 0.7 else None
+        docs.append(doc)
+    return docs
+
+FILTERS = [
+    {},
+    {"board_id": "b1"},
+    {"board_id": {"$in": ["b1", "b3"]}},
+    {"board_id": {"$nin": ["b1", "b3"]}},
+    {"board_id": {"$ne": "b2"}},
+    {"n": 3},
+    {"n": None},
+    {"n": {"$ne": None}},
+    {"n": {"$exists": False}},
+    {"n": {"$gt": 4}},
+    {"n": {"$gte": 2, "$lt": 6}},
+    {"n": {"$lte": "5"}},
+    {"n": {"$in": [1, 2, None]}},
+    {"tags": "a"},
+    {"tags": {"$in": ["c", "d"]}},
+    {"tags": {"$nin": ["a"]}},
+    {"tags": []},
+    {"meta.level": {"$gte": 2}},
+    {"meta.owner": None},
+    {"meta.owner": {"$exists": True}},
+    {"items.k": 3},
+    {"items.k": {"$gt": 3}},
+    {"done": True},
+    {"due": {"$lt": START + timedelta(days=10)}},
+    {"due": None},
+    {"board_id": "b2", "tags": "b", "n": {"$lt": 5}},
+    {"$or": [{"board_id": "b1"}, {"tags": "d"}]},
+    {"$and": [{"board_id": {"$in": ["b1", "b2"]}}, {"$or": [{"n": 1}, {"meta.level": 0}]}]},
+    {"$nor": [{"done": True}, {"n": None}]},
+    {"$or": [{"board_id": "b3", "n": {"$gt": 7}}, {"board_id": "b1", "done": False}]},
+]
+
+def ids(docs):
+    return {doc["_id"] for doc in docs}
+
+# -----------------------
+# Filters
+# -----------------------
+@pytest.mark.parametrize("flt", FILTERS, ids=str)
+def test_compiled_filter_agrees_with_reference(flt):
+    docs = make_docs()
+    predicate = compile_filter(flt)
+    expected = ids(doc for doc in docs if matches(doc, flt))
+    assert ids(doc for doc in docs if predicate(doc)) == expected
+    # Most filters should select something, or the comparison proves little
+    assert expected or flt in ({"tags": []},)
+
+def test_compiled_filters_are_cached_by_content():
+    assert compile_filter({"board_id": "b1", "n": {"$gt": 1}}) is compile_filter({"board_id": "b1", "n": {"$gt": 1}})
+    assert compile_filter({"n": 1}) is not compile_filter({"n": 1.0})
+
+# -----------------------
+# Index candidate selection
+# -----------------------
+def collections(docs):
+    indexed = _MockCollection(indexes=["board_id", "tags", "n"])
+    scanned = _MockCollection()
+    for doc in docs:
+        indexed.insert_one(copy.deepcopy(doc))
+        scanned.insert_one(copy.deepcopy(doc))
+    return indexed, scanned
+
+def churn(collection, docs):
+    """The same updates and deletes, so indexes have to follow values that move"""
+    collection.update_many({"board_id": "b1", "done": True}, {"$set": {"board_id": "b2", "n": 4}})
+    collection.update_many({"tags": "a"}, {"$pull": {"tags": "a"}, "$push": {"tags": "e"}})
+    collection.update_one({"_id": docs[0]["_id"]}, {"$set": {"tags": {"not": "hashable"}}})
+    collection.delete_many({"board_id": "b3", "n": {"$lt": 3}})
+
+@pytest.mark.parametrize("flt", FILTERS + [{"tags": "e"}, {"_id": {"$in": []}}], ids=str)
+def test_index_candidates_match_a_full_scan(flt):
+    docs = make_docs()
+    indexed, scanned = collections(docs)
+    churn(indexed, docs)
+    churn(scanned, docs)
+    assert ids(indexed.find(flt)) == ids(scanned.find(flt))
+    assert ids(scanned.find(flt)) == ids(doc for doc in scanned._docs.values() if matches(doc, flt))
+
+def test_index_narrows_the_candidates():
+    docs = make_docs()
+    indexed, _ = collections(docs)
+    assert len(indexed._candidates({"board_id": "b1", "n": 3})) <= sum(doc.get("n") == 3 for doc in docs)
+    assert indexed._candidate_ids({"done": True}) is None
+    assert indexed._candidate_ids({"$or": [{"board_id": "b1"}, {"done": True}]}) is None
+
+# -----------------------
+# Updates
+# -----------------------
+@pytest.mark.parametrize("doc, update, after, changed", [
+    ({"a": 1}, {"$set": {"a": 1}}, {"a": 1}, False),
+    ({"a": 1}, {"$set": {"b.c": 2}}, {"a": 1, "b": {"c": 2}}, True),
+    ({"a": 1, "b": 2}, {"$unset": {"b": ""}}, {"a": 1}, True),
+    ({"a": 1}, {"$inc": {"a": 2, "n": 1}}, {"a": 3, "n": 1}, True),
+    ({"a": 1}, {"$inc": {"a": 0}}, {"a": 1}, False),
+    ({"a": 5}, {"$min": {"a": 3}}, {"a": 3}, True),
+    ({"a": 5}, {"$max": {"a": 3}}, {"a": 5}, False),
+    ({}, {"$push": {"l": {"$each": [1, 2]}}}, {"l": [1, 2]}, True),
+    ({"l": [1]}, {"$addToSet": {"l": {"$each": [1, 2]}}}, {"l": [1, 2]}, True),
+    ({"l": [1, 2, 3, 2]}, {"$pull": {"l": 2}}, {"l": [1, 3]}, True),
+    ({"l": [1, 5, 7]}, {"$pull": {"l": {"$gt": 4}}}, {"l": [1]}, True),
+    ({"l": [{"k": 1}, {"k": 2}]}, {"$pull": {"l": {"k": 2}}}, {"l": [{"k": 1}]}, True),
+    ({"l": [1, 2, 3]}, {"$pop": {"l": -1}}, {"l": [2, 3]}, True),
+    ({"a": 1}, {"$setOnInsert": {"b": 1}}, {"a": 1}, False),
+])
+def test_apply_update(doc, update, after, changed):
+    assert apply_update(doc, update) == changed
+    assert doc == after
+
+def test_upsert_seeds_plain_equalities():
+    assert upsert_seed({"_id": "x", "board_id": {"$eq": "b1"}, "n": {"$gt": 1}, "$or": [{"a": 1}]}) == {
+        "_id": "x", "board_id": "b1"
+    }
+
+def test_upsert_inserts_the_seed_and_set_on_insert():
+    collection = _MockCollection()
+    collection.update_one({"_id": "s", "board_id": "b1"}, {"$inc": {"n": 1}, "$setOnInsert": {"made": True}}, upsert=True)
+    collection.update_one({"_id": "s", "board_id": "b1"}, {"$inc": {"n": 1}, "$setOnInsert": {"made": False}}, upsert=True)
+    assert collection.find_one({"_id": "s"}) == {"_id": "s", "board_id": "b1", "n": 2, "made": True}
@@ -0,0 +1,104 @@
+"""
+BoardIndex ranking: BM25 over live documents only, every term required, the
+last one as a prefix, and scores that compare across boards.
+"""
+import asyncio
+
+import pytest
+
+from backend.search import BoardIndex, SearchIndex, parse_query
+
+def build(docs):
+    index = BoardIndex()
+    for key, task_id, title, body in docs:
+        index.put(key, task_id, title, body)
+    return index
+
+DOCS = [
+    ("t:1", "1", "Fix login page", "The login form rejects valid passwords"),
+    ("t:2", "2", "Deploy pipeline", "Speed up the deploy step"),
+    ("t:3", "3", "Login with SSO", None),
+    ("c:10", "2", None, "deploy failed again on login"),
+    ("t:4", "4", "Unrelated", "nothing to see"),
+]
+
+def keys(results):
+    return [key for _, key, _ in results]
+
+def test_every_word_must_match():
+    index = build(DOCS)
+    assert set(keys(index.search(parse_query("login "), 10))) == {"t:1", "t:3", "c:10"}
+    assert keys(index.search(parse_query("deploy login "), 10)) == ["c:10"]
+    assert index.search(parse_query("login missing "), 10) == []
+
+def test_last_word_matches_as_prefix_unless_followed_by_space():
+    index = build(DOCS)
+    assert set(keys(index.search(parse_query("depl"), 10))) == {"t:2", "c:10"}
+    assert index.search(parse_query("depl "), 10) == []
+
+def test_title_words_rank_above_body_words():
+    index = build(DOCS)
+    assert keys(index.search(parse_query("login "), 10))[0] in ("t:1", "t:3")
+    assert keys(index.search(parse_query("login "), 10))[-1] == "c:10"
+
+def test_removed_documents_do_not_affect_scores():
+    """An index with updates and deletes scores like one built from the surviving documents"""
+    churned = build(DOCS + [("t:5", "5", "Login login login", "login"), ("t:6", "6", "filler", "words " * 50)])
+    churned.remove("t:5")
+    churned.remove("t:6")
+    churned.put("t:2", "2", "Deploy pipeline", "Speed up the deploy step")
+    assert churned.dead == 3
+    fresh = build(DOCS)
+    query = parse_query("login ")
+    assert churned.search(query, 10) == pytest.approx(fresh.search(query, 10))
+    assert churned.statistics(query)[:2] == fresh.statistics(query)[:2]
+
+def test_remove_tasks_drops_their_comments():
+    index = build(DOCS)
+    index.remove_tasks({"2"})
+    assert index.search(parse_query("deploy "), 10) == []
+    assert "2" not in index.task_keys
+    assert len(index) == 3
+
+def test_compaction_keeps_results():
+    index = build(DOCS + [(f"t:x{i}", f"x{i}", "filler login", None) for i in range(100)])
+    for i in range(100):
+        index.remove(f"t:x{i}")
+    before = index.search(parse_query("login "), 10)
+    index.compact()
+    assert index.search(parse_query("login "), 10) == pytest.approx(before)
+
+def test_scores_compare_across_boards():
+    """The same document on a small and a large board scores the same in one query"""
+    boards = {
+        "small": build([("t:a", "a", "deploy pipeline", None), ("t:b", "b", "other", None)]),
+        "large": build([("t:c", "c", "deploy pipeline", None)] + [
+            (f"t:l{i}", f"l{i}", "deploy notes", "more words here") for i in range(50)
+        ]),
+    }
+    search_index = SearchIndex()
+
+    async def load(board_id):
+        return boards[board_id]
+    search_index._load = load
+    hits, pending = asyncio.run(search_index.query("pipeline", ["small", "large"], 10))
+    assert not pending
+    scores = {key: score for score, _, key, _ in hits}
+    assert scores["t:a"] == pytest.approx(scores["t:c"])
+
+def test_a_query_loads_a_bounded_number_of_boards(monkeypatch):
+    monkeypatch.setattr("backend.search.SEARCH_MAX_LOADS_PER_QUERY", 2)
+    search_index = SearchIndex()
+
+    async def load(board_id):
+        return build([(f"t:{board_id}", board_id, "deploy", None)])
+    search_index._load = load
+
+    async def run():
+        first = await search_index.query("deploy", ["b1", "b2", "b3", "b4"], 10)
+        await search_index._warmer
+        second = await search_index.query("deploy", ["b1", "b2", "b3", "b4"], 10)
+        return first, second
+    (hits, pending), (all_hits, none_pending) = asyncio.run(run())
+    assert len(hits) == 2 and pending == ["b3", "b4"]
+    assert len(all_hits) == 4 and none_pending == []
@@ -0,0 +1,243 @@
+"""
+The list endpoints encode rows with RowSerializer + json_response, which
+skips response_model validation. These check that the bytes they send are
+what the response model itself would have produced for the same document.
+"""
+import json
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from backend import serializers
+from backend.models import (
+    ActivityLogResponse, AttachmentResponse, BoardResponse, CommentResponse, TaskPriority, TaskResponse, TaskStatus,
+    TeamResponse, UserResponse
+)
+from backend.serializers import activity_row, attachment_row, board_row, comment_row, task_row, team_row, user_row
+from backend.thumbnails import thumbnail_name
+from backend.uploads import blob_name
+
+CREATED = datetime(2026, 3, 4, 5, 6, 7, 123000)
+UPDATED = datetime(2026, 3, 5, 0, 0)
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def encode(request, monkeypatch):
+    """What json_response sends, decoded again; with and without the optional orjson"""
+    if request.param == "stdlib":
+        monkeypatch.setattr(serializers, "orjson", None)
+    elif serializers.orjson is None:
+        pytest.skip("orjson is not installed")
+    return lambda content: json.loads(serializers.json_response(content).body)
+
+def expected(model, **fields):
+    return model(**fields).model_dump(mode="json")
+
+# -----------------------
+# Tasks
+# -----------------------
+def task_response(doc):
+    # How the endpoints built TaskResponse before rows were serialized directly
+    return expected(
+        TaskResponse,
+        id=str(doc["_id"]),
+        title=doc["title"],
+        description=doc.get("description"),
+        board_id=doc["board_id"],
+        assigned_to=doc.get("assigned_to"),
+        status=doc["status"],
+        priority=doc["priority"],
+        due_date=doc.get("due_date"),
+        created_by=doc["created_by"],
+        created_at=doc["created_at"],
+        updated_at=doc["updated_at"],
+    )
+
+FULL_TASK = {
+    "_id": ObjectId(),
+    "title": "Write release notes",
+    "description": "Cover the new search",
+    "board_id": str(ObjectId()),
+    "assigned_to": str(ObjectId()),
+    "status": "in_progress",
+    "priority": "high",
+    "due_date": datetime(2026, 4, 1),
+    "created_by": str(ObjectId()),
+    "created_at": CREATED,
+    "updated_at": UPDATED,
+    "seq": 7,
+}
+
+@pytest.mark.parametrize("doc", [
+    FULL_TASK,
+    # Enums as stored by the mock database, which keeps the Python objects
+    {**FULL_TASK, "status": TaskStatus.REVIEW, "priority": TaskPriority.URGENT},
+    # Optional fields missing altogether
+    {k: v for k, v in FULL_TASK.items() if k not in ("description", "assigned_to", "due_date")},
+    # ...or stored as null
+    {**FULL_TASK, "description": None, "assigned_to": None, "due_date": None},
+], ids=["full", "enums", "missing-optional", "null-optional"])
+def test_task_row_matches_model(doc, encode):
+    assert encode(task_row(doc)) == task_response(doc)
+    assert encode(task_row.many([doc, doc])) == [task_response(doc)] * 2
+
+# -----------------------
+# Boards, teams, users
+# -----------------------
+BOARD = {
+    "_id": ObjectId(),
+    "name": "Platform",
+    "description": "Infra work",
+    "team_id": str(ObjectId()),
+    "member_ids": [str(ObjectId()), str(ObjectId())],
+    "created_by": str(ObjectId()),
+    "created_at": CREATED,
+    "version": 12,
+}
+
+@pytest.mark.parametrize("doc", [
+    BOARD,
+    {k: v for k, v in BOARD.items() if k not in ("description", "member_ids")},
+], ids=["full", "missing-optional"])
+def test_board_row_matches_model(doc, encode):
+    assert encode(board_row(doc)) == expected(
+        BoardResponse,
+        id=str(doc["_id"]),
+        name=doc["name"],
+        description=doc.get("description"),
+        team_id=doc["team_id"],
+        member_ids=doc.get("member_ids", []),
+        created_by=doc["created_by"],
+        created_at=doc["created_at"],
+    )
+
+TEAM = {"_id": ObjectId(), "name": "Core", "description": "Core team", "created_by": str(ObjectId()), "created_at": CREATED}
+
+@pytest.mark.parametrize("doc", [TEAM, {k: v for k, v in TEAM.items() if k != "description"}], ids=["full", "missing-optional"])
+def test_team_row_matches_model(doc, encode):
+    assert encode(team_row(doc)) == expected(
+        TeamResponse,
+        id=str(doc["_id"]),
+        name=doc["name"],
+        description=doc.get("description"),
+        created_by=doc["created_by"],
+        created_at=doc["created_at"],
+    )
+
+USER = {
+    "_id": ObjectId(),
+    "username": "dana",
+    "email": "dana@example.com",
+    "password": "$2b$12$not-a-real-hash",
+    "role": "team_manager",
+    "avatar_url": "https://example.com/a.png",
+    "created_at": CREATED,
+}
+
+@pytest.mark.parametrize("doc", [
+    USER,
+    {k: v for k, v in USER.items() if k not in ("role", "avatar_url")},
+], ids=["full", "missing-optional"])
+def test_user_row_matches_model(doc, encode):
+    row = encode(user_row(doc))
+    assert row == expected(
+        UserResponse,
+        id=str(doc["_id"]),
+        username=doc["username"],
+        email=doc["email"],
+        role=doc.get("role", "team_member"),
+        avatar_url=doc.get("avatar_url"),
+        created_at=doc["created_at"],
+    )
+    assert "password" not in row
+
+def test_user_row_without_created_at_is_still_valid(encode):
+    row = encode(user_row({k: v for k, v in USER.items() if k != "created_at"}))
+    assert UserResponse(**row).model_dump(mode="json") == row
+
+# -----------------------
+# Comments, attachments, activity
+# -----------------------
+COMMENT = {
+    "_id": ObjectId(),
+    "task_id": str(ObjectId()),
+    "user_id": str(ObjectId()),
+    "username": "dana",
+    "avatar_url": "https://example.com/a.png",
+    "content": "Looks good — ship it",
+    "created_at": CREATED,
+}
+
+@pytest.mark.parametrize("doc", [COMMENT, {k: v for k, v in COMMENT.items() if k != "avatar_url"}], ids=["full", "missing-optional"])
+def test_comment_row_matches_model(doc, encode):
+    assert encode(comment_row(doc)) == expected(
+        CommentResponse,
+        id=str(doc["_id"]),
+        task_id=doc["task_id"],
+        user_id=doc["user_id"],
+        username=doc["username"],
+        avatar_url=doc.get("avatar_url"),
+        content=doc["content"],
+        created_at=doc["created_at"],
+    )
+
+BLOB = blob_name("ab" * 32, "diagram.png")
+
+ATTACHMENT = {
+    "_id": ObjectId(),
+    "task_id": str(ObjectId()),
+    "user_id": str(ObjectId()),
+    "username": "dana",
+    "filename": "diagram.png",
+    "file_type": "image/png",
+    "file_size": 48213,
+    "blob": BLOB,
+    # As render_thumbnails stores them: {size: name}, {} when the image could not be decoded
+    "thumbnails": {str(size): thumbnail_name(BLOB, size) for size in (160, 480)},
+    "created_at": CREATED,
+}
+
+@pytest.mark.parametrize("doc", [
+    ATTACHMENT,
+    {**ATTACHMENT, "thumbnails": {}},
+    {k: v for k, v in ATTACHMENT.items() if k != "thumbnails"},
+], ids=["thumbnails", "undecodable", "no-thumbnails"])
+def test_attachment_row_matches_model(doc, encode):
+    assert encode(attachment_row(doc)) == expected(
+        AttachmentResponse,
+        id=str(doc["_id"]),
+        task_id=doc["task_id"],
+        user_id=doc["user_id"],
+        username=doc["username"],
+        filename=doc["filename"],
+        file_path=f"/tasks/attachments/{doc['_id']}/download",
+        file_type=doc["file_type"],
+        file_size=doc["file_size"],
+        thumbnail_path=f"/tasks/attachments/{doc['_id']}/thumbnail" if doc.get("thumbnails") else None,
+        created_at=doc["created_at"],
+    )
+
+ACTIVITY = {
+    "_id": ObjectId(),
+    "user_id": str(ObjectId()),
+    "username": "dana",
+    "action": "created_task",
+    "entity_type": "task",
+    "entity_id": str(ObjectId()),
+    "details": "Created task 'Write release notes' in board",
+    "created_at": CREATED,
+}
+
+@pytest.mark.parametrize("doc", [ACTIVITY, {**ACTIVITY, "details": None}], ids=["full", "null-optional"])
+def test_activity_row_matches_model(doc, encode):
+    assert encode(activity_row(doc)) == expected(
+        ActivityLogResponse,
+        id=str(doc["_id"]),
+        **{k: doc[k] for k in ("user_id", "username", "action", "entity_type", "entity_id", "details", "created_at")},
+    )
+
+def test_partial_rows_are_subsets_of_full_rows(encode):
+    full = encode(task_row(FULL_TASK))
+    assert encode(task_row.partial(FULL_TASK, ["id", "status", "due_date"])) == {
+        k: full[k] for k in ("id", "status", "due_date")
+    }
@@ -0,0 +1,86 @@
+"""
+BatchWriter requeues only what a failed insert did not write, gives up on a
+document after max_retries, and bounds its queue.
+"""
+import asyncio
+
+from pymongo.errors import BulkWriteError
+
+from backend.database import DUPLICATE_KEY
+from backend.write_behind import BatchWriter
+
+class FlakyCollection:
+    """insert_many that fails for the documents `fail(doc)` picks, keeping the rest"""
+    def __init__(self, fail=lambda doc: False, duplicate=lambda doc: False):
+        self.fail = fail
+        self.duplicate = duplicate
+        self.docs = {}
+        self.calls = 0
+
+    async def insert_many(self, docs, ordered=False):
+        self.calls += 1
+        errors = []
+        for index, doc in enumerate(docs):
+            if self.fail(doc):
+                errors.append({"index": index, "code": 121})
+            elif doc["_id"] in self.docs or self.duplicate(doc):
+                errors.append({"index": index, "code": DUPLICATE_KEY})
+            else:
+                self.docs[doc["_id"]] = doc
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(docs) - len(errors)})
+
+def writer(collection, **limits):
+    return BatchWriter(collection, "test.writer", **{
+        "batch_size": 10, "flush_interval_ms": 1000, "max_pending": 100, "max_retries": 3, **limits
+    })
+
+def test_documents_get_ids_and_are_written():
+    collection = FlakyCollection()
+    w = writer(collection)
+    docs = [{"n": i} for i in range(25)]
+    asyncio.run(w.put(docs))
+    asyncio.run(w.flush())
+    assert len(collection.docs) == 25
+    assert all("_id" in doc for doc in docs)
+    assert collection.calls == 3
+
+def test_only_unwritten_documents_are_retried():
+    failing = {3}
+    collection = FlakyCollection(fail=lambda doc: doc["n"] in failing)
+    w = writer(collection)
+    asyncio.run(w.put([{"n": i} for i in range(5)]))
+    asyncio.run(w.flush())
+    assert [doc["n"] for doc in w._pending] == [3]
+    failing.clear()
+    asyncio.run(w.flush())
+    assert sorted(doc["n"] for doc in collection.docs.values()) == [0, 1, 2, 3, 4]
+    assert not w._pending and not w._attempts
+
+def test_duplicates_count_as_written():
+    collection = FlakyCollection(duplicate=lambda doc: doc["n"] == 1)
+    w = writer(collection)
+    asyncio.run(w.put([{"n": i} for i in range(3)]))
+    asyncio.run(w.flush())
+    assert not w._pending
+
+def test_a_document_is_dropped_after_max_retries():
+    collection = FlakyCollection(fail=lambda doc: doc["n"] == 0)
+    w = writer(collection, max_retries=3)
+    asyncio.run(w.put([{"n": 0}, {"n": 1}]))
+    for _ in range(10):
+        asyncio.run(w.flush())
+    assert collection.calls == 4  # the first attempt and three retries
+    assert not w._pending and not w._attempts
+    assert [doc["n"] for doc in collection.docs.values()] == [1]
+
+def test_add_drops_the_oldest_when_full():
+    w = writer(FlakyCollection(), max_pending=3)
+    for i in range(5):
+        w.add({"n": i})
+    assert [doc["n"] for doc in w._pending] == [2, 3, 4]
+
+def test_put_drops_new_documents_when_full_and_not_drained():
+    w = writer(FlakyCollection(), max_pending=3, backpressure_ms=10)
+    asyncio.run(w.put([{"n": i} for i in range(5)]))
+    assert [doc["n"] for doc in w._pending] == [0, 1, 2]